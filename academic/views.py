@@ -12,24 +12,58 @@ from portalaccount.models import StudentProfile, TeacherProfile
 from .serializers import ClassroomSerializer, SubjectSerializer, ClassroomSubjectSerializer, StudentSubjectSerializer
 
 
+def _insert_missing_student_subjects(classroom, student_ids, subject_ids=None):
+    """
+    Set-difference sync: work out which (student, subject) pairs of this classroom
+    are not yet StudentSubject rows and insert them all with one bulk_create.
+    Query count stays the same however many students / subjects there are.
+    """
+    student_ids = list(student_ids)
+    if not student_ids:
+        return 0
+    classroom_id = getattr(classroom, "pk", classroom)
+
+    subjects_qs = ClassroomSubject.objects.filter(classroom_id=classroom_id)
+    if subject_ids is not None:
+        subjects_qs = subjects_qs.filter(subject_id__in=subject_ids)
+    wanted_subjects = set(subjects_qs.values_list("subject_id", flat=True))
+    if not wanted_subjects:
+        return 0
+
+    existing = set(
+        StudentSubject.objects.filter(
+            classroom_id=classroom_id,
+            student_id__in=student_ids,
+            subject_id__in=wanted_subjects,
+        ).values_list("student_id", "subject_id")
+    )
+
+    missing = [
+        StudentSubject(student_id=sid, subject_id=subj_id, classroom_id=classroom_id)
+        for sid in student_ids
+        for subj_id in wanted_subjects
+        if (sid, subj_id) not in existing
+    ]
+    # ignore_conflicts – a concurrent sync may have inserted some rows meanwhile
+    StudentSubject.objects.bulk_create(missing, ignore_conflicts=True)
+    return len(missing)
+
+
 def sync_student_subjects(student):
     """
     Ensure that all classroom subjects are assigned explicitly as StudentSubject to the given student.
     """
-    if not student.classroom:
+    if not student.classroom_id:
         return 0
+    return _insert_missing_student_subjects(student.classroom_id, [student.pk])
 
-    classroom_subjects = ClassroomSubject.objects.filter(classroom=student.classroom)
-    created_count = 0
-    for cs in classroom_subjects:
-        obj, created = StudentSubject.objects.get_or_create(
-            student=student,
-            subject=cs.subject,
-            classroom=student.classroom,
-        )
-        if created:
-            created_count += 1
-    return created_count
+
+def sync_classroom_subjects(classroom, subject_ids=None):
+    """
+    Fan classroom subjects (optionally only `subject_ids`) out to every student already in the classroom.
+    """
+    student_ids = StudentProfile.objects.filter(classroom=classroom).values_list("pk", flat=True)
+    return _insert_missing_student_subjects(classroom, student_ids, subject_ids)
 
 
 class ClassroomListCreate(APIView):
@@ -106,12 +140,16 @@ class AssignClassroomSubject(APIView):
             cs.teacher = teacher
             cs.save()
 
+        # Give the subject to students who are already in the classroom
+        created_count = sync_classroom_subjects(classroom, subject_ids=[subject.id])
+
         return Response(
             {
                 "message": "Assignment successful.",
                 "classroom": classroom.name,
                 "subject": subject.name,
                 "teacher": teacher.user.get_full_name() or teacher.user.username,
+                "subjects_assigned": created_count,
             },
             status=status.HTTP_201_CREATED,
         )
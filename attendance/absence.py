@@ -0,0 +1,113 @@
+"""
+Streaming chronic-absence detector.
+
+Each attendance write is fed through `feed()`, which advances the user's
+AbsenceStreakState in O(1) and raises an AbsenceAlert when
+- the run of consecutive absences reaches ABSENCE_STREAK_THRESHOLD, or
+- the absences among the last ABSENCE_WINDOW_DAYS recorded days reach
+  ABSENCE_WINDOW_THRESHOLD.
+
+'excused' days neither extend nor break a streak. Writes for a day before the
+user's last processed day are not replayed here; run
+`manage.py backfill_absence_alerts` to rebuild the state from history.
+"""
+from django.conf import settings
+from django.utils import timezone
+
+from .models import AbsenceAlert, AbsenceStreakState
+
+ABSENCE_STREAK_THRESHOLD = getattr(settings, 'ABSENCE_STREAK_THRESHOLD', 5)
+ABSENCE_WINDOW_DAYS = getattr(settings, 'ABSENCE_WINDOW_DAYS', 20)
+ABSENCE_WINDOW_THRESHOLD = getattr(settings, 'ABSENCE_WINDOW_THRESHOLD', 8)
+
+_WINDOW_MASK = (1 << ABSENCE_WINDOW_DAYS) - 1
+_STORED_MASK = (1 << (ABSENCE_WINDOW_DAYS + 1)) - 1     # + 1 bit for same-day undo
+
+
+def _window_count(state):
+    return (state.window & _WINDOW_MASK).bit_count()
+
+
+def _undo_last(state):
+    """Roll back the user's last processed day (it is being re-recorded)."""
+    state.window >>= 1
+    state.streak = state.streak_before_last
+
+
+def _advance(state, day, status):
+    """Apply one recorded day. Returns the alerts it raises (unsaved)."""
+    if state.last_date and day < state.last_date:
+        return []                           # out of order – left to the backfill
+    if state.last_date == day:
+        _undo_last(state)
+
+    streak_before = state.streak
+    count_before = _window_count(state)
+
+    absent = status == 'absent'
+    state.streak_before_last = state.streak
+    if absent:
+        state.streak += 1
+    elif status != 'excused':
+        state.streak = 0
+    state.window = ((state.window << 1) | absent) & _STORED_MASK
+    state.last_date = day
+    state.last_status = status
+
+    alerts = []
+    if streak_before < ABSENCE_STREAK_THRESHOLD <= state.streak:
+        alerts.append(('consecutive', state.streak))
+    count = _window_count(state)
+    if count_before < ABSENCE_WINDOW_THRESHOLD <= count:
+        alerts.append(('rolling', count))
+    return alerts
+
+
+def _locked_states(user_ids):
+    """{user_id: AbsenceStreakState} for `user_ids`, row-locked in user order."""
+    locked = AbsenceStreakState.objects.select_for_update().order_by('user_id')
+    states = {s.user_id: s for s in locked.filter(user_id__in=user_ids)}
+    missing = sorted(set(user_ids) - states.keys())
+    if missing:
+        # a concurrent first write for the same user may insert the row first
+        AbsenceStreakState.objects.bulk_create(
+            [AbsenceStreakState(user_id=user_id) for user_id in missing], ignore_conflicts=True
+        )
+        states.update((s.user_id, s) for s in locked.filter(user_id__in=missing))
+    return states
+
+
+def feed(records, raise_alerts=True):
+    """
+    Advance the detector with attendance records (anything with user_id,
+    date, status and classroom_id – usually Attendance instances).
+    Call inside a transaction: the users' states stay locked until it ends,
+    so concurrent writes for the same student apply one after the other.
+    At most five queries per call, however many records are fed.
+    """
+    records = sorted(records, key=lambda r: (r.date, r.user_id))
+    if not records:
+        return []
+
+    states = _locked_states({r.user_id for r in records})
+    alerts = []
+    for record in records:
+        for kind, value in _advance(states[record.user_id], record.date, record.status):
+            alerts.append(AbsenceAlert(
+                user_id=record.user_id,
+                classroom_id=record.classroom_id,
+                kind=kind,
+                triggered_on=record.date,
+                value=value,
+            ))
+
+    now = timezone.now()
+    for state in states.values():
+        state.updated_at = now              # bulk_update skips auto_now
+    AbsenceStreakState.objects.bulk_update(
+        states.values(),
+        ['last_date', 'last_status', 'streak', 'streak_before_last', 'window', 'updated_at'],
+    )
+    if raise_alerts and alerts:
+        AbsenceAlert.objects.bulk_create(alerts, ignore_conflicts=True)
+    return alerts
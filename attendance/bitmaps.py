@@ -0,0 +1,153 @@
+"""
+Packed-bitmap view of attendance history.
+
+A closed term is stored per user as one bitmap per status in
+AttendanceTermArchive (bit i = term_start + i days). `load_history()` stitches
+archived terms and live Attendance rows into a single AttendanceBitmap so
+"days absent", "longest absence streak" and "status on date X" are answered
+with integer bit operations instead of row scans.
+"""
+from datetime import timedelta
+
+from .models import Attendance, AttendanceTermArchive
+
+STATUSES = [choice for choice, _ in Attendance.STATUS_CHOICES]
+
+
+def _from_bytes(data):
+    return int.from_bytes(bytes(data or b''), 'little')
+
+
+class AttendanceBitmap:
+    """Attendance of one user between `start` and `end` (inclusive)."""
+
+    def __init__(self, start, end, bits=None):
+        self.start = start
+        self.end = end
+        self.length = (end - start).days + 1
+        self.mask = (1 << self.length) - 1
+        self.bits = {status: 0 for status in STATUSES}
+        if bits:
+            for status, value in bits.items():
+                self.bits[status] = value & self.mask
+
+    # ── building ──────────────────────────────────────────────────────
+    @classmethod
+    def from_archive(cls, archive):
+        return cls(archive.term_start, archive.term_end, {
+            status: _from_bytes(getattr(archive, status)) for status in STATUSES
+        })
+
+    def _offset(self, day):
+        offset = (day - self.start).days
+        if not 0 <= offset < self.length:
+            raise ValueError(f"{day} is outside {self.start} – {self.end}")
+        return offset
+
+    def set(self, day, status):
+        bit = 1 << self._offset(day)
+        for key in STATUSES:
+            self.bits[key] &= ~bit          # one status per day
+        self.bits[status] |= bit
+
+    def merge(self, other):
+        """Overlay another bitmap (e.g. an archived term) onto this window."""
+        shift = (other.start - self.start).days
+        for status in STATUSES:
+            value = other.bits[status]
+            value = value << shift if shift >= 0 else value >> -shift
+            self.bits[status] |= value & self.mask
+
+    def to_bytes(self, status):
+        return self.bits[status].to_bytes((self.length + 7) // 8, 'little')
+
+    # ── queries ───────────────────────────────────────────────────────
+    @property
+    def recorded(self):
+        value = 0
+        for status in STATUSES:
+            value |= self.bits[status]
+        return value
+
+    def days(self, status):
+        return self.bits[status].bit_count()
+
+    def status_on(self, day):
+        try:
+            bit = 1 << self._offset(day)
+        except ValueError:
+            return None
+        for status in STATUSES:
+            if self.bits[status] & bit:
+                return status
+        return None
+
+    def dates(self, status):
+        value = self.bits[status]
+        while value:
+            low = value & -value
+            yield self.start + timedelta(days=low.bit_length() - 1)
+            value ^= low
+
+    def longest_streak(self, status='absent'):
+        """
+        Longest run of `status` over *recorded* days – days with no record
+        at all (weekends, holidays) neither break nor extend a streak.
+        """
+        hits = self.bits[status]
+        # treat unrecorded days as part of the run, then count only real hits
+        runs = (hits | (~self.recorded & self.mask))
+        best = 0
+        while runs:
+            low = runs & -runs
+            rest = runs & (runs + low)      # clears the lowest run
+            best = max(best, ((runs ^ rest) & hits).bit_count())
+            runs = rest
+        return best
+
+    def summary(self):
+        return {status: self.days(status) for status in STATUSES}
+
+
+def load_history(user_id, date_from, date_to):
+    """
+    AttendanceBitmap for one user over a date range, combining archived
+    terms and live rows. Two queries, whatever the length of the range.
+    """
+    history = AttendanceBitmap(date_from, date_to)
+
+    archives = AttendanceTermArchive.objects.filter(
+        user_id=user_id, term_start__lte=date_to, term_end__gte=date_from
+    ).only('term_start', 'term_end', *STATUSES)
+    for archive in archives:
+        history.merge(AttendanceBitmap.from_archive(archive))
+
+    rows = Attendance.objects.filter(
+        user_id=user_id, date__gte=date_from, date__lte=date_to
+    ).values_list('date', 'status').order_by()
+    for day, status in rows:
+        history.set(day, status)
+    return history
+
+
+def iter_archived_days(date_from=None, date_to=None, user_ids=None):
+    """
+    Expand archived terms back into (user_id, classroom_id, date, status)
+    tuples, one archive at a time. Used when refreshing / rebuilding rollups.
+    """
+    archives = AttendanceTermArchive.objects.prefetch_related('exceptions').order_by('pk')
+    if user_ids is not None:
+        archives = archives.filter(user_id__in=user_ids)
+    if date_from:
+        archives = archives.filter(term_end__gte=date_from)
+    if date_to:
+        archives = archives.filter(term_start__lte=date_to)
+
+    for archive in archives.iterator(chunk_size=500):
+        bitmap = AttendanceBitmap.from_archive(archive)
+        moved = {e.date: e.classroom_id for e in archive.exceptions.all()}
+        for status in STATUSES:
+            for day in bitmap.dates(status):
+                if (date_from and day < date_from) or (date_to and day > date_to):
+                    continue
+                yield archive.user_id, moved.get(day, archive.classroom_id), day, status
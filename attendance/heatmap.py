@@ -0,0 +1,73 @@
+"""
+Classroom-by-day attendance heatmap.
+
+Status counts are read from AttendanceDailyRollup, which covers live rows
+and compacted terms alike, and are cached per (classroom, month).
+attendance.writes drops the cached months a write touches.
+"""
+from datetime import timedelta
+
+from django.core.cache import cache
+
+from .models import AttendanceDailyRollup
+from .rollups import STATUSES, month_start, next_month
+
+CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def cache_key(classroom_id, month):
+    return f"attendance:heatmap:{classroom_id}:{month:%Y-%m}"
+
+
+def months_between(date_from, date_to):
+    month = month_start(date_from)
+    while month <= date_to:
+        yield month
+        month = next_month(month)
+
+
+def _load_months(classroom_id, months):
+    """{month: {date: {status: count}}} for the given months, cached where possible."""
+    keys = {cache_key(classroom_id, m): m for m in months}
+    cached = cache.get_many(keys.keys())
+    result = {keys[k]: v for k, v in cached.items()}
+
+    missing = [m for m in months if m not in result]
+    if missing:
+        fresh = {m: {} for m in missing}
+        rows = (
+            AttendanceDailyRollup.objects.filter(
+                classroom_id=classroom_id,
+                date__gte=min(missing),
+                date__lt=next_month(max(missing)),
+            )
+            .values('date', *STATUSES)
+            .order_by()
+        )
+        for row in rows:
+            month = month_start(row['date'])
+            if month in fresh:
+                fresh[month][row['date']] = {status: row[status] for status in STATUSES}
+        cache.set_many({cache_key(classroom_id, m): v for m, v in fresh.items()}, CACHE_TIMEOUT)
+        result.update(fresh)
+    return result
+
+
+def classroom_heatmap(classroom_id, date_from, date_to):
+    """One entry per calendar day in the range, with status counts and totals."""
+    months = _load_months(classroom_id, list(months_between(date_from, date_to)))
+    totals = dict.fromkeys(STATUSES, 0)
+    days = []
+    day = date_from
+    while day <= date_to:
+        counts = months[month_start(day)].get(day) or dict.fromkeys(STATUSES, 0)
+        for status in STATUSES:
+            totals[status] += counts[status]
+        days.append({'date': day, **counts})
+        day += timedelta(days=1)
+    return {'days': days, 'totals': totals}
+
+
+def invalidate(pairs):
+    """Drop cached months for (classroom_id, date) pairs."""
+    cache.delete_many({cache_key(c, month_start(d)) for c, d in pairs if c is not None})
@@ -0,0 +1,107 @@
+from collections import Counter
+from itertools import groupby
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from attendance.bitmaps import STATUSES, AttendanceBitmap
+from attendance.models import Attendance, AttendanceArchiveException, AttendanceTermArchive
+
+
+class Command(BaseCommand):
+    help = (
+        "Move a closed term's Attendance rows into the packed AttendanceTermArchive "
+        "store (one bitmap per status per user). Rollups are left untouched: they count "
+        "archived days from the bitmaps."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--term-start', required=True, help='First day of the term (YYYY-MM-DD).')
+        parser.add_argument('--term-end', required=True, help='Last day of the term (YYYY-MM-DD).')
+        parser.add_argument('--batch-size', type=int, default=200, help='Users per transaction.')
+        parser.add_argument('--dry-run', action='store_true', help='Report what would be archived.')
+
+    def handle(self, *args, **options):
+        term_start = parse_date(options['term_start'] or '')
+        term_end = parse_date(options['term_end'] or '')
+        if not term_start or not term_end or term_end < term_start:
+            raise CommandError("Give a valid --term-start / --term-end range.")
+        if term_end >= timezone.now().date():
+            raise CommandError("Only closed terms can be compacted (term end must be in the past).")
+
+        overlapping = AttendanceTermArchive.objects.filter(
+            term_start__lte=term_end, term_end__gte=term_start
+        ).exclude(term_start=term_start, term_end=term_end)
+        if overlapping.exists():
+            raise CommandError("Another archived term overlaps this date range.")
+
+        in_term = Attendance.objects.filter(date__gte=term_start, date__lte=term_end)
+        user_ids = list(in_term.values_list('user_id', flat=True).distinct().order_by('user_id'))
+        if options['dry_run']:
+            self.stdout.write(f"Would archive {in_term.count()} rows for {len(user_ids)} users.")
+            return
+
+        batch_size = max(1, options['batch_size'])
+        archived_rows = 0
+        for i in range(0, len(user_ids), batch_size):
+            batch = user_ids[i:i + batch_size]
+            archived_rows += self._compact_batch(in_term, batch, term_start, term_end)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {archived_rows} attendance rows for {len(user_ids)} users "
+            f"({term_start} – {term_end})."
+        ))
+
+    @transaction.atomic
+    def _compact_batch(self, in_term, user_ids, term_start, term_end):
+        rows = (
+            in_term.filter(user_id__in=user_ids)
+            .order_by('user_id', 'date')
+            .values_list('user_id', 'date', 'status', 'classroom_id', 'remarks')
+        )
+        existing = {
+            a.user_id: a for a in AttendanceTermArchive.objects.select_for_update().filter(
+                user_id__in=user_ids, term_start=term_start
+            )
+        }
+
+        archives, pending_exceptions, count = [], [], 0
+        for user_id, user_rows in groupby(rows.iterator(chunk_size=2000), key=lambda r: r[0]):
+            user_rows = list(user_rows)
+            count += len(user_rows)
+
+            archive = existing.get(user_id)
+            if archive:
+                bitmap = AttendanceBitmap.from_archive(archive)
+            else:
+                bitmap = AttendanceBitmap(term_start, term_end)
+                classroom_id = Counter(r[3] for r in user_rows).most_common(1)[0][0]
+                archive = AttendanceTermArchive(
+                    user_id=user_id, classroom_id=classroom_id,
+                    term_start=term_start, term_end=term_end,
+                )
+
+            for _, day, status, classroom_id, remarks in user_rows:
+                bitmap.set(day, status)
+                if remarks or classroom_id != archive.classroom_id:
+                    pending_exceptions.append((archive, day, classroom_id, remarks))
+
+            for status in STATUSES:
+                setattr(archive, status, bitmap.to_bytes(status))
+            archives.append(archive)
+
+        AttendanceTermArchive.objects.bulk_create([a for a in archives if a.pk is None])
+        AttendanceTermArchive.objects.bulk_update([a for a in archives if a.pk], STATUSES)
+        AttendanceArchiveException.objects.bulk_create(
+            [
+                AttendanceArchiveException(archive=archive, date=day, classroom_id=classroom_id, remarks=remarks)
+                for archive, day, classroom_id, remarks in pending_exceptions
+            ],
+            update_conflicts=True,
+            unique_fields=['archive', 'date'],
+            update_fields=['classroom', 'remarks'],
+        )
+        in_term.filter(user_id__in=user_ids).delete()
+        return count
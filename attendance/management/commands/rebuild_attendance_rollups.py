@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from attendance.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = "Rebuild the daily / monthly attendance rollups from the Attendance table."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date-from', help='Only rebuild from this date (YYYY-MM-DD).')
+        parser.add_argument('--date-to', help='Only rebuild up to this date (YYYY-MM-DD).')
+
+    def handle(self, *args, **options):
+        dates = {}
+        for key in ('date_from', 'date_to'):
+            value = options.get(key)
+            if value:
+                try:
+                    dates[key] = parse_date(value)
+                except ValueError:              # well formed but impossible, e.g. 2024-02-30
+                    dates[key] = None
+                if not dates[key]:
+                    raise CommandError(f"Invalid {key.replace('_', '-')}: {value}")
+
+        daily, monthly = rebuild_rollups(**dates)
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {daily} daily and {monthly} monthly attendance rollup rows."
+        ))
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:26
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academic', '0003_studentsubject'),
+        ('attendance', '0004_attendance_rollups'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceTermArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term_start', models.DateField()),
+                ('term_end', models.DateField()),
+                ('present', models.BinaryField(default=b'')),
+                ('absent', models.BinaryField(default=b'')),
+                ('late', models.BinaryField(default=b'')),
+                ('excused', models.BinaryField(default=b'')),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('classroom', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='attendance_archives', to='academic.classroom')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_archives', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-term_start'],
+            },
+        ),
+        migrations.CreateModel(
+            name='AttendanceArchiveException',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('remarks', models.TextField(blank=True, null=True)),
+                ('classroom', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='academic.classroom')),
+                ('archive', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='exceptions', to='attendance.attendancetermarchive')),
+            ],
+            options={
+                'ordering': ['date'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='attendancetermarchive',
+            index=models.Index(fields=['term_start', 'term_end'], name='att_archive_term_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='attendancetermarchive',
+            unique_together={('user', 'term_start')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='attendancearchiveexception',
+            unique_together={('archive', 'date')},
+        ),
+    ]
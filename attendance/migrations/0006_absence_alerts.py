@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:27
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academic', '0003_studentsubject'),
+        ('attendance', '0005_attendance_term_archive'),
+        ('portalaccount', '0003_user_user_type_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AbsenceStreakState',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='absence_state', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('last_date', models.DateField(blank=True, null=True)),
+                ('last_status', models.CharField(blank=True, max_length=10)),
+                ('streak', models.PositiveIntegerField(default=0)),
+                ('streak_before_last', models.PositiveIntegerField(default=0)),
+                ('window', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='AbsenceAlert',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('consecutive', 'Consecutive absences'), ('rolling', 'Frequent absences')], max_length=20)),
+                ('triggered_on', models.DateField()),
+                ('value', models.PositiveIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('acknowledged', models.BooleanField(default=False)),
+                ('acknowledged_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('classroom', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='absence_alerts', to='academic.classroom')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='absence_alerts', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-triggered_on', '-id'],
+                'indexes': [models.Index(fields=['acknowledged', '-triggered_on'], name='absence_alert_open_idx')],
+                'unique_together': {('user', 'kind', 'triggered_on')},
+            },
+        ),
+    ]
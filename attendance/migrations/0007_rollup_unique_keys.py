@@ -0,0 +1,59 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:44
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def check_duplicate_rollups(apps, schema_editor):
+    """
+    Concurrent refreshes could write a rollup key twice. The rows are
+    derived data, so stop and ask for a rebuild rather than guess which
+    copy is right.
+    """
+    keys = {
+        'AttendanceDailyRollup': ('classroom_id', 'date'),
+        'AttendanceMonthlyRollup': ('user_id', 'classroom_id', 'month'),
+    }
+    for name, fields in keys.items():
+        model = apps.get_model('attendance', name)
+        duplicated = model.objects.values(*fields).annotate(n=Count('id')).filter(n__gt=1).order_by()
+        if duplicated.exists():
+            raise RuntimeError(
+                f"{name} holds {duplicated.count()} duplicated keys. Run "
+                "`manage.py rebuild_attendance_rollups` (it rewrites every rollup row), "
+                "then migrate again."
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academic', '0003_studentsubject'),
+        ('attendance', '0006_absence_alerts'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(check_duplicate_rollups, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='attendancedailyrollup',
+            name='att_daily_class_date_idx',
+        ),
+        migrations.AddConstraint(
+            model_name='attendancedailyrollup',
+            constraint=models.UniqueConstraint(fields=('classroom', 'date'), name='att_daily_class_date_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='attendancedailyrollup',
+            constraint=models.UniqueConstraint(condition=models.Q(('classroom__isnull', True)), fields=('date',), name='att_daily_noclass_date_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='attendancemonthlyrollup',
+            constraint=models.UniqueConstraint(fields=('user', 'classroom', 'month'), name='att_monthly_user_class_month_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='attendancemonthlyrollup',
+            constraint=models.UniqueConstraint(condition=models.Q(('classroom__isnull', True)), fields=('user', 'month'), name='att_monthly_user_noclass_month_uniq'),
+        ),
+    ]
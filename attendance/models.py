@@ -31,6 +31,220 @@ class Attendance(models.Model):
     class Meta:
         unique_together = ('user', 'date')
         ordering = ['-date']
+        indexes = [
+            # keyset pagination + date ranges, with and without a classroom
+            models.Index(fields=['-date', '-id'], name='attendance_date_id_idx'),
+            models.Index(fields=['classroom', '-date', '-id'], name='attendance_class_date_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.full_name} - {self.date} - {self.status}"
+
+
+class AttendanceDailyRollup(models.Model):
+    """
+    Status counts per classroom per day. Kept current by attendance.rollups
+    on every attendance write; rebuild with `manage.py rebuild_attendance_rollups`.
+    """
+    classroom = models.ForeignKey(
+        Classroom,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='attendance_daily_rollups'
+    )
+    date = models.DateField()
+    present = models.PositiveIntegerField(default=0)
+    absent = models.PositiveIntegerField(default=0)
+    late = models.PositiveIntegerField(default=0)
+    excused = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['-date']
+        indexes = [
+            models.Index(fields=['date', 'classroom'], name='att_daily_date_class_idx'),
+        ]
+        constraints = [
+            # one row per key (its index also serves classroom + date lookups);
+            # NULLs are distinct in a unique index, hence the second constraint
+            models.UniqueConstraint(fields=['classroom', 'date'], name='att_daily_class_date_uniq'),
+            models.UniqueConstraint(
+                fields=['date'], condition=models.Q(classroom__isnull=True), name='att_daily_noclass_date_uniq',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.classroom} - {self.date}"
+
+
+class AttendanceMonthlyRollup(models.Model):
+    """
+    Status counts per user per classroom per month (`month` is the 1st of the month).
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='attendance_monthly_rollups'
+    )
+    classroom = models.ForeignKey(
+        Classroom,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='attendance_monthly_rollups'
+    )
+    month = models.DateField()
+    present = models.PositiveIntegerField(default=0)
+    absent = models.PositiveIntegerField(default=0)
+    late = models.PositiveIntegerField(default=0)
+    excused = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['-month']
+        indexes = [
+            models.Index(fields=['user', 'month'], name='att_monthly_user_month_idx'),
+            models.Index(fields=['classroom', 'month'], name='att_monthly_class_month_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'classroom', 'month'], name='att_monthly_user_class_month_uniq'),
+            models.UniqueConstraint(
+                fields=['user', 'month'], condition=models.Q(classroom__isnull=True),
+                name='att_monthly_user_noclass_month_uniq',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user.full_name} - {self.month:%Y-%m}"
+
+
+class AttendanceTermArchive(models.Model):
+    """
+    One user's attendance for one closed term, packed as one bitmap per status
+    (bit i = term_start + i days). Written by `manage.py compact_attendance`,
+    which removes the matching Attendance rows; read through attendance.bitmaps.
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='attendance_archives'
+    )
+    classroom = models.ForeignKey(
+        Classroom,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='attendance_archives'
+    )
+    term_start = models.DateField()
+    term_end = models.DateField()
+    present = models.BinaryField(default=b'')
+    absent = models.BinaryField(default=b'')
+    late = models.BinaryField(default=b'')
+    excused = models.BinaryField(default=b'')
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('user', 'term_start')
+        ordering = ['-term_start']
+        indexes = [
+            models.Index(fields=['term_start', 'term_end'], name='att_archive_term_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.full_name} - {self.term_start} to {self.term_end}"
+
+
+class AttendanceArchiveException(models.Model):
+    """
+    Per-day details the bitmaps cannot hold: remarks, and days recorded
+    against a different classroom than the archive's.
+    """
+    archive = models.ForeignKey(
+        AttendanceTermArchive,
+        on_delete=models.CASCADE,
+        related_name='exceptions'
+    )
+    date = models.DateField()
+    classroom = models.ForeignKey(
+        Classroom,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+    remarks = models.TextField(blank=True, null=True)
+
+    class Meta:
+        unique_together = ('archive', 'date')
+        ordering = ['date']
+
+    def __str__(self):
+        return f"{self.archive.user.full_name} - {self.date}"
+
+
+class AbsenceStreakState(models.Model):
+    """
+    Running absence state per user, advanced by attendance.absence on every
+    write so detecting chronic absence never rescans history.
+
+    `window` holds the last ABSENCE_WINDOW_DAYS + 1 recorded days as bits
+    (bit 0 = most recent, 1 = absent); the extra bit lets a same-day
+    correction be undone exactly.
+    """
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='absence_state'
+    )
+    last_date = models.DateField(null=True, blank=True)
+    last_status = models.CharField(max_length=10, blank=True)
+    streak = models.PositiveIntegerField(default=0)
+    streak_before_last = models.PositiveIntegerField(default=0)
+    window = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.user_id} - streak {self.streak}"
+
+
+class AbsenceAlert(models.Model):
+    KIND_CHOICES = [
+        ('consecutive', 'Consecutive absences'),
+        ('rolling', 'Frequent absences'),
+    ]
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='absence_alerts'
+    )
+    classroom = models.ForeignKey(
+        Classroom,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='absence_alerts'
+    )
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    triggered_on = models.DateField()
+    value = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    acknowledged = models.BooleanField(default=False)
+    acknowledged_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+
+    class Meta:
+        unique_together = ('user', 'kind', 'triggered_on')
+        ordering = ['-triggered_on', '-id']
+        indexes = [
+            models.Index(fields=['acknowledged', '-triggered_on'], name='absence_alert_open_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.full_name} - {self.get_kind_display()} ({self.value}) on {self.triggered_on}"
@@ -0,0 +1,71 @@
+import base64
+from datetime import date as date_cls
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class AttendanceKeysetPagination(BasePagination):
+    """
+    Keyset (cursor) pagination over (date, id), newest first.
+
+    The cursor is the (date, id) of the last row on the page, so every page is
+    a single index range scan no matter how deep the client has scrolled.
+    """
+    page_size = 100
+    max_page_size = 500
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+
+    def _encode(self, row):
+        raw = f"{row.date.isoformat()}|{row.id}".encode()
+        return base64.urlsafe_b64encode(raw).decode()
+
+    def _decode(self, cursor):
+        try:
+            raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+            date_str, pk = raw.split('|')
+            return date_cls.fromisoformat(date_str), int(pk)
+        except (ValueError, UnicodeDecodeError):
+            raise NotFound('Invalid cursor.')
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+
+        queryset = queryset.order_by('-date', '-id')
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            last_date, last_id = self._decode(cursor)
+            queryset = queryset.filter(
+                Q(date__lt=last_date) | Q(date=last_date, id__lt=last_id)
+            )
+
+        rows = list(queryset[:page_size + 1])
+        self.has_next = len(rows) > page_size
+        rows = rows[:page_size]
+        self.next_cursor = self._encode(rows[-1]) if self.has_next else None
+        return rows
+
+    def get_next_link(self):
+        if not self.next_cursor:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'next_cursor': self.next_cursor,
+            'results': data,
+        })
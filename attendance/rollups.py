@@ -0,0 +1,251 @@
+"""
+Incrementally maintained attendance rollups.
+
+Every attendance write calls `refresh_rollups()` with the users, dates and
+classrooms it touched (old and new values). The affected rollup rows are
+re-aggregated from `Attendance` (plus the archived days of compacted terms
+in the same months) in a constant number of grouped queries, so the
+rollups always match the raw data without ever scanning it.
+
+Rollup rows are unique per key. A refresh first makes sure a row exists
+for every key it may write and locks the rows, then aggregates: a
+concurrent write to the same classroom / day or user / month waits for it
+and then counts its rows too.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncMonth
+
+from .bitmaps import iter_archived_days
+from .models import Attendance, AttendanceDailyRollup, AttendanceMonthlyRollup
+
+STATUSES = [choice for choice, _ in Attendance.STATUS_CHOICES]
+
+STATUS_COUNTS = {
+    status: Count('id', filter=Q(status=status)) for status in STATUSES
+}
+
+
+def month_start(value):
+    return value.replace(day=1)
+
+
+def next_month(value):
+    value = month_start(value)
+    return value.replace(year=value.year + 1, month=1) if value.month == 12 else value.replace(month=value.month + 1)
+
+
+def _classroom_q(classroom_ids):
+    # classroom is nullable – `IN (NULL)` never matches, so add IS NULL explicitly
+    q = Q(classroom_id__in=[c for c in classroom_ids if c is not None])
+    if None in classroom_ids:
+        q |= Q(classroom__isnull=True)
+    return q
+
+
+def _daily_rows(queryset):
+    rows = (
+        queryset.values('classroom_id', 'date')
+        .annotate(**STATUS_COUNTS)
+        .order_by()
+    )
+    for row in rows.iterator(chunk_size=2000):
+        yield AttendanceDailyRollup(**row)
+
+
+def _monthly_rows(queryset):
+    rows = (
+        queryset.annotate(month=TruncMonth('date'))
+        .values('user_id', 'classroom_id', 'month')
+        .annotate(**STATUS_COUNTS)
+        .order_by()
+    )
+    for row in rows.iterator(chunk_size=2000):
+        yield AttendanceMonthlyRollup(**row)
+
+
+def _count_day(counts, key, make, status):
+    if key not in counts:
+        counts[key] = make()
+    setattr(counts[key], status, getattr(counts[key], status) + 1)
+
+
+def _keys_q(key_fields, keys):
+    q = Q()
+    for k in keys:
+        match = {}
+        for field, value in zip(key_fields, k):
+            if value is None:
+                match[f'{field}__isnull'] = True
+            else:
+                match[field] = value
+        q |= Q(**match)
+    return q
+
+
+def _null_last(key):
+    return tuple((value is None, value) for value in key)
+
+
+def _store(model, key_fields, rows, placeholders, count):
+    """
+    Replace the counts of the rollup rows matched by `rows` with `count()`
+    ({key: unsaved rollup}), under row locks. `placeholders` are the keys
+    the refresh may write; they are inserted first (ignoring existing ones)
+    so that there is a row to lock even for a key seen for the first time.
+    """
+    def key(row):
+        return tuple(getattr(row, f) for f in key_fields)
+
+    def make(k):
+        return model(**dict(zip(key_fields, k)))
+
+    model.objects.bulk_create([make(k) for k in sorted(placeholders, key=_null_last)], ignore_conflicts=True)
+    locked = {key(r): r for r in rows.select_for_update().order_by('pk')}
+    counts = count()
+    extra = sorted(counts.keys() - locked.keys(), key=_null_last)
+    if extra:                               # e.g. another classroom of the user in an archived term
+        model.objects.bulk_create([make(k) for k in extra], ignore_conflicts=True)
+        locked.update(
+            (key(r), r) for r in model.objects.filter(_keys_q(key_fields, extra)).select_for_update().order_by('pk')
+        )
+
+    empty, kept = [], []
+    for k, row in locked.items():
+        fresh = counts.get(k)
+        for status in STATUSES:
+            setattr(row, status, getattr(fresh, status) if fresh else 0)
+        (kept if fresh else empty).append(row)
+    model.objects.filter(pk__in=[row.pk for row in empty]).delete()
+    model.objects.bulk_update(kept, STATUSES, batch_size=1000)
+
+
+@transaction.atomic
+def refresh_rollups(user_ids, dates, classroom_ids):
+    """
+    Re-aggregate the rollup rows covering these users / dates / classrooms.
+    Pass both the old and the new classroom when a row moves between classrooms.
+    Days of compacted terms in the same months are counted from their archives.
+    """
+    user_ids = set(user_ids)
+    dates = set(dates)
+    classroom_ids = set(classroom_ids)
+    if not user_ids or not dates:
+        return
+
+    # ── daily: (classroom, date) ───────────────────────────────────────
+    def count_daily():
+        counts = {
+            (r.classroom_id, r.date): r
+            for r in _daily_rows(Attendance.objects.filter(_classroom_q(classroom_ids), date__in=dates))
+        }
+        for _, classroom_id, day, status in iter_archived_days(min(dates), max(dates)):
+            if day in dates and classroom_id in classroom_ids:
+                _count_day(counts, (classroom_id, day), lambda: AttendanceDailyRollup(
+                    classroom_id=classroom_id, date=day), status)
+        return counts
+
+    _store(
+        AttendanceDailyRollup, ('classroom_id', 'date'),
+        AttendanceDailyRollup.objects.filter(_classroom_q(classroom_ids), date__in=dates),
+        {(c, d) for c in classroom_ids for d in dates},
+        count_daily,
+    )
+
+    # ── monthly: (user, classroom, month) ──────────────────────────────
+    months = {month_start(d) for d in dates}
+    month_q = Q()
+    for month in months:
+        month_q |= Q(date__gte=month, date__lt=next_month(month))
+
+    def count_monthly():
+        counts = {
+            (r.user_id, r.classroom_id, r.month): r
+            for r in _monthly_rows(Attendance.objects.filter(month_q, user_id__in=user_ids))
+        }
+        archived = iter_archived_days(min(months), next_month(max(months)) - timedelta(days=1), user_ids=user_ids)
+        for user_id, classroom_id, day, status in archived:
+            if month_start(day) in months:
+                _count_day(counts, (user_id, classroom_id, month_start(day)), lambda: AttendanceMonthlyRollup(
+                    user_id=user_id, classroom_id=classroom_id, month=month_start(day)), status)
+        return counts
+
+    _store(
+        AttendanceMonthlyRollup, ('user_id', 'classroom_id', 'month'),
+        AttendanceMonthlyRollup.objects.filter(user_id__in=user_ids, month__in=months),
+        {(u, c, m) for u in user_ids for c in classroom_ids for m in months},
+        count_monthly,
+    )
+
+
+@transaction.atomic
+def rebuild_rollups(date_from=None, date_to=None):
+    """
+    Rebuild rollups from scratch, optionally only for a date range
+    (the monthly range is widened to whole months). Terms already compacted
+    into AttendanceTermArchive are counted from their bitmaps. The heatmap
+    months of the rebuilt range are dropped from the cache on commit.
+    Returns (daily_rows, monthly_rows) written.
+    """
+    raw = Attendance.objects.all()
+    daily = AttendanceDailyRollup.objects.all()
+    monthly_raw = Attendance.objects.all()
+    monthly = AttendanceMonthlyRollup.objects.all()
+    archive_from = month_start(date_from) if date_from else None
+    archive_to = next_month(date_to) - timedelta(days=1) if date_to else None
+
+    if date_from:
+        raw = raw.filter(date__gte=date_from)
+        daily = daily.filter(date__gte=date_from)
+        monthly_raw = monthly_raw.filter(date__gte=archive_from)
+        monthly = monthly.filter(month__gte=archive_from)
+    if date_to:
+        raw = raw.filter(date__lte=date_to)
+        daily = daily.filter(date__lte=date_to)
+        monthly_raw = monthly_raw.filter(date__lte=archive_to)
+        monthly = monthly.filter(month__lte=month_start(date_to))
+
+    daily_counts = {(r.classroom_id, r.date): r for r in _daily_rows(raw)}
+    monthly_counts = {(r.user_id, r.classroom_id, r.month): r for r in _monthly_rows(monthly_raw)}
+
+    for user_id, classroom_id, day, status in iter_archived_days(archive_from, archive_to):
+        if (not date_from or day >= date_from) and (not date_to or day <= date_to):
+            _count_day(daily_counts, (classroom_id, day), lambda: AttendanceDailyRollup(
+                classroom_id=classroom_id, date=day), status)
+        _count_day(monthly_counts, (user_id, classroom_id, month_start(day)), lambda: AttendanceMonthlyRollup(
+            user_id=user_id, classroom_id=classroom_id, month=month_start(day)), status)
+
+    # heatmap months cached from the old rows or covered by the new ones
+    touched = set(daily.annotate(month=TruncMonth('date')).values_list('classroom_id', 'month').distinct())
+    touched.update((classroom_id, month_start(day)) for classroom_id, day in daily_counts)
+
+    daily.delete()
+    monthly.delete()
+    AttendanceDailyRollup.objects.bulk_create(daily_counts.values(), batch_size=1000)
+    AttendanceMonthlyRollup.objects.bulk_create(monthly_counts.values(), batch_size=1000)
+
+    from . import heatmap
+    transaction.on_commit(lambda: heatmap.invalidate(touched))
+    return len(daily_counts), len(monthly_counts)
+
+
+def summarize(rollups):
+    """Sum a rollup queryset into counts plus an attendance rate."""
+    sums = rollups.order_by().aggregate(**{status: Sum(status) for status in STATUSES})
+    return with_rate({status: sums[status] or 0 for status in STATUSES})
+
+
+def with_rate(totals):
+    """
+    attendance_rate = (present + late) / all recorded days, or None
+    when nothing has been recorded.
+    """
+    recorded = sum(totals[status] for status in STATUSES)
+    attended = totals['present'] + totals['late']
+    return {
+        **totals,
+        'recorded_days': recorded,
+        'attendance_rate': round(attended / recorded, 4) if recorded else None,
+    }
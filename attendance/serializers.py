@@ -1,8 +1,14 @@
 from rest_framework import serializers
 from rest_framework.validators import UniqueTogetherValidator
-from .models import Attendance
+from .models import AbsenceAlert, Attendance, today_date
+from .writes import attendance_written
+from academic.models import Classroom
+from django.contrib.auth import get_user_model
+from django.db import transaction
 from django.utils import timezone
 
+User = get_user_model()
+
 
 class AttendanceSerializer(serializers.ModelSerializer):
     full_name = serializers.CharField(source='user.full_name', read_only=True)
@@ -33,3 +39,128 @@ class AttendanceSerializer(serializers.ModelSerializer):
                 message='Attendance for this user on this date already exists.'
             )
         ]
+
+
+class RollCallEntrySerializer(serializers.Serializer):
+    # plain id – users are resolved for the whole roll call in one query
+    user = serializers.IntegerField()
+    status = serializers.ChoiceField(choices=Attendance.STATUS_CHOICES)
+    remarks = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+
+
+class RollCallSerializer(serializers.Serializer):
+    """
+    A whole classroom's attendance for one date.
+
+    Rows are validated one by one so a bad row is reported back instead of
+    rejecting the roll call; valid rows are upserted on (user, date).
+    """
+    classroom = serializers.PrimaryKeyRelatedField(queryset=Classroom.objects.all())
+    date = serializers.DateField(required=False, default=today_date)
+    entries = serializers.ListField(child=serializers.DictField(), allow_empty=False)
+
+    def validate(self, attrs):
+        row_errors = {}
+        valid = {}                              # index -> validated entry
+        seen_users = set()
+
+        for index, entry in enumerate(attrs["entries"]):
+            row = RollCallEntrySerializer(data=entry)
+            if not row.is_valid():
+                row_errors[index] = row.errors
+                continue
+            user_id = row.validated_data["user"]
+            if user_id in seen_users:
+                row_errors[index] = {"user": ["User listed more than once in this roll call."]}
+                continue
+            seen_users.add(user_id)
+            valid[index] = row.validated_data
+
+        known = set(
+            User.objects.filter(pk__in=seen_users).values_list("pk", flat=True)
+        )
+        for index, entry in list(valid.items()):
+            if entry["user"] not in known:
+                row_errors[index] = {"user": ["User not found."]}
+                del valid[index]
+
+        attrs["valid_rows"] = valid
+        attrs["row_errors"] = row_errors
+        return attrs
+
+    def create(self, validated_data):
+        classroom = validated_data["classroom"]
+        date = validated_data["date"]
+        valid = validated_data["valid_rows"]
+        row_errors = validated_data["row_errors"]
+
+        user_ids = [entry["user"] for entry in valid.values()]
+        with transaction.atomic():
+            # user_id -> classroom_id of rows this roll call overwrites
+            existing = dict(
+                Attendance.objects.filter(date=date, user_id__in=user_ids)
+                .values_list("user_id", "classroom_id")
+            )
+            if valid:
+                records = [
+                    Attendance(
+                        user_id=entry["user"],
+                        classroom=classroom,
+                        date=date,
+                        status=entry["status"],
+                        remarks=entry.get("remarks"),
+                    )
+                    for entry in valid.values()
+                ]
+                Attendance.objects.bulk_create(
+                    records,
+                    update_conflicts=True,
+                    unique_fields=["user", "date"],
+                    update_fields=["classroom", "status", "remarks"],
+                )
+                attendance_written(records, previous_classroom_ids=existing.values())
+
+        results = []
+        for index, entry in enumerate(validated_data["entries"]):
+            if index in row_errors:
+                results.append({
+                    "index": index,
+                    "user": entry.get("user"),
+                    "result": "error",
+                    "errors": row_errors[index],
+                })
+            else:
+                user_id = valid[index]["user"]
+                results.append({
+                    "index": index,
+                    "user": user_id,
+                    "result": "updated" if user_id in existing else "created",
+                })
+        return results
+
+
+class AbsenceAlertSerializer(serializers.ModelSerializer):
+    full_name = serializers.CharField(source='user.full_name', read_only=True)
+    classroom_name = serializers.SerializerMethodField()
+    kind_display = serializers.CharField(source='get_kind_display', read_only=True)
+
+    class Meta:
+        model = AbsenceAlert
+        fields = [
+            'id',
+            'user',
+            'full_name',
+            'classroom',
+            'classroom_name',
+            'kind',
+            'kind_display',
+            'triggered_on',
+            'value',
+            'created_at',
+            'acknowledged',
+            'acknowledged_by',
+        ]
+        read_only_fields = fields
+
+    def get_classroom_name(self, obj):
+        return str(obj.classroom) if obj.classroom else None
@@ -1,3 +1,171 @@
+from datetime import date
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import transaction
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from academic.models import Classroom
+from portalaccount.models import User
+from .models import Attendance, AttendanceDailyRollup, AttendanceMonthlyRollup
+from .heatmap import classroom_heatmap
+from .rollups import rebuild_rollups
+from .writes import attendance_written
+
+
+class CompactedTermRollupTests(TestCase):
+    """Writes in a month a compacted term partly covers must keep its archived days."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(email="rollup@example.com", password="x")
+        self.classroom = Classroom.objects.create(name="Form 1", section="A", academic_year="2025")
+        cache.clear()
+
+    def _write(self, day, status):
+        with transaction.atomic():
+            record = Attendance.objects.create(
+                user=self.user, classroom=self.classroom, date=day, status=status)
+            attendance_written([record])
+
+    def _rollups(self):
+        monthly = set(AttendanceMonthlyRollup.objects.values_list(
+            'user_id', 'classroom_id', 'month', 'present', 'absent', 'late', 'excused'))
+        daily = set(AttendanceDailyRollup.objects.values_list(
+            'classroom_id', 'date', 'present', 'absent', 'late', 'excused'))
+        return monthly, daily
+
+    def test_write_after_compaction_matches_rebuild(self):
+        for day in (3, 4, 5):
+            self._write(date(2025, 2, day), 'absent')
+        call_command('compact_attendance', '--term-start', '2025-01-06', '--term-end', '2025-02-14',
+                     stdout=StringIO())
+        self.assertFalse(Attendance.objects.exists())
+
+        self._write(date(2025, 2, 20), 'present')
+        refreshed = self._rollups()
+        rebuild_rollups()
+        self.assertEqual(refreshed, self._rollups())
+
+        month = AttendanceMonthlyRollup.objects.get(user=self.user, month=date(2025, 2, 1))
+        self.assertEqual((month.present, month.absent), (1, 3))
+
+    def test_heatmap_counts_compacted_days(self):
+        for day in (3, 4, 5):
+            self._write(date(2025, 2, day), 'absent')
+        before = classroom_heatmap(self.classroom.pk, date(2025, 2, 1), date(2025, 2, 28))
+        call_command('compact_attendance', '--term-start', '2025-01-06', '--term-end', '2025-02-14',
+                     stdout=StringIO())
+        cache.clear()
+        after = classroom_heatmap(self.classroom.pk, date(2025, 2, 1), date(2025, 2, 28))
+        self.assertEqual(before, after)
+        self.assertEqual(after['totals']['absent'], 3)
+
+    def test_rebuild_drops_cached_heatmap_months(self):
+        self._write(date(2025, 2, 3), 'absent')
+        Attendance.objects.create(                      # bypasses the rollups, as a bulk load would
+            user=User.objects.create_user(email="bulk@example.com", password="x"),
+            classroom=self.classroom, date=date(2025, 2, 4), status='present')
+        february = (self.classroom.pk, date(2025, 2, 1), date(2025, 2, 28))
+        self.assertEqual(classroom_heatmap(*february)['totals']['present'], 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('rebuild_attendance_rollups', stdout=StringIO())
+        self.assertEqual(classroom_heatmap(*february)['totals'], {'present': 1, 'absent': 1, 'late': 0, 'excused': 0})
+
+
+class RollupRefreshTests(TestCase):
+    """refresh_rollups keeps one row per key and the same counts as a rebuild."""
+
+    def setUp(self):
+        self.users = [User.objects.create_user(email=f"refresh{i}@example.com", password="x") for i in range(4)]
+        self.form_a = Classroom.objects.create(name="Form 2", section="A", academic_year="2025")
+        self.form_b = Classroom.objects.create(name="Form 2", section="B", academic_year="2025")
+        self.day = date(2025, 3, 10)
+
+    def _rollups(self):
+        monthly = sorted(AttendanceMonthlyRollup.objects.values_list(
+            'user_id', 'classroom_id', 'month', 'present', 'absent', 'late', 'excused'), key=repr)
+        daily = sorted(AttendanceDailyRollup.objects.values_list(
+            'classroom_id', 'date', 'present', 'absent', 'late', 'excused'), key=repr)
+        return monthly, daily
+
+    def test_rewrites_and_moves_match_rebuild(self):
+        with transaction.atomic():
+            records = [
+                Attendance.objects.create(user=user, classroom=self.form_a, date=self.day, status='present')
+                for user in self.users[:3]
+            ]
+            attendance_written(records)
+        with transaction.atomic():
+            moved = records[0]
+            moved.classroom, moved.status = self.form_b, 'late'
+            moved.save()
+            attendance_written([moved], previous_classroom_ids=[self.form_a.pk])
+        with transaction.atomic():
+            unassigned = Attendance.objects.create(user=self.users[3], classroom=None, date=self.day, status='absent')
+            attendance_written([unassigned])
+
+        refreshed = self._rollups()
+        self.assertEqual(len(refreshed[1]), len(set((c, d) for c, d, *_ in refreshed[1])))
+        rebuild_rollups()
+        self.assertEqual(refreshed, self._rollups())
+        self.assertEqual(
+            AttendanceDailyRollup.objects.get(classroom=self.form_a, date=self.day).present, 2)
+
+    def test_impossible_dates_are_rejected_cleanly(self):
+        client = APIClient()
+        client.force_authenticate(self.users[0])
+        response = client.get(f"/attendance/rates/students/{self.users[0].pk}/", {'date_from': '2024-02-30'})
+        self.assertEqual(response.status_code, 200)
+        response = client.get("/attendance/", {'date_from': '2024-02-30', 'date_to': '2024-13-01'})
+        self.assertEqual(response.status_code, 200)
+        with self.assertRaises(CommandError):
+            call_command('rebuild_attendance_rollups', '--date-from', '2024-02-30', stdout=StringIO())
+
+
+class RollCallTests(TestCase):
+    def setUp(self):
+        self.users = [User.objects.create_user(email=f"roll{i}@example.com", password="x") for i in range(3)]
+        self.classroom = Classroom.objects.create(name="Form 4", section="A", academic_year="2025")
+        self.day = date(2025, 5, 12)
+        self.client = APIClient()
+        self.client.force_authenticate(self.users[0])
+
+    def _roll_call(self, entries):
+        return self.client.post("/attendance/roll-call/", {
+            "classroom": self.classroom.pk, "date": self.day, "entries": entries,
+        }, format="json")
+
+    def test_bad_rows_are_reported_and_the_rest_upserted(self):
+        first, second, third = (user.pk for user in self.users)
+        response = self._roll_call([
+            {"user": first, "status": "present"},
+            {"user": second, "status": "absent", "remarks": "sick"},
+            {"user": first, "status": "late"},          # listed twice
+            {"user": 999999, "status": "present"},      # unknown
+            {"user": third, "status": "asleep"},        # not a status
+        ])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data["created"], response.data["updated"], response.data["error"]), (2, 0, 3))
+        self.assertEqual([row["result"] for row in response.data["results"]],
+                         ["created", "created", "error", "error", "error"])
+        self.assertIn("status", response.data["results"][4]["errors"])
+
+        response = self._roll_call([
+            {"user": second, "status": "excused"}, {"user": third, "status": "present"},
+        ])
+        self.assertEqual((response.data["created"], response.data["updated"]), (1, 1))
+        self.assertEqual(
+            dict(Attendance.objects.filter(date=self.day).values_list("user_id", "status")),
+            {first: "present", second: "excused", third: "present"},
+        )
+        daily = AttendanceDailyRollup.objects.get(classroom=self.classroom, date=self.day)
+        self.assertEqual((daily.present, daily.absent, daily.excused), (2, 0, 1))
 
-# Create your tests here.
+    def test_all_rows_invalid_is_a_bad_request(self):
+        response = self._roll_call([{"user": 999999, "status": "present"}])
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Attendance.objects.exists())
@@ -1,6 +1,24 @@
 from django.urls import path
-from .views import AttendanceListCreateView
+from .views import (
+    AttendanceListCreateView,
+    RollCallView,
+    StudentAttendanceRateView,
+    ClassroomAttendanceRateView,
+    SchoolAttendanceRateView,
+    AttendanceHistoryView,
+    AbsenceAlertListView,
+    AbsenceAlertAcknowledgeView,
+    ClassroomHeatmapView,
+)
 
 urlpatterns = [
     path('attendance/', AttendanceListCreateView.as_view(), name='attendance-list-create'),
+    path('attendance/roll-call/', RollCallView.as_view(), name='attendance-roll-call'),
+    path('attendance/rates/students/<int:user_id>/', StudentAttendanceRateView.as_view(), name='attendance-rate-student'),
+    path('attendance/rates/classrooms/<int:classroom_id>/', ClassroomAttendanceRateView.as_view(), name='attendance-rate-classroom'),
+    path('attendance/rates/school/', SchoolAttendanceRateView.as_view(), name='attendance-rate-school'),
+    path('attendance/heatmap/<int:classroom_id>/', ClassroomHeatmapView.as_view(), name='attendance-heatmap'),
+    path('attendance/history/<int:user_id>/', AttendanceHistoryView.as_view(), name='attendance-history'),
+    path('attendance/alerts/', AbsenceAlertListView.as_view(), name='absence-alert-list'),
+    path('attendance/alerts/<int:pk>/acknowledge/', AbsenceAlertAcknowledgeView.as_view(), name='absence-alert-acknowledge'),
 ]
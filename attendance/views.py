@@ -1,12 +1,21 @@
+from datetime import timedelta
+
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, permissions
+from django.shortcuts import get_object_or_404
 from django.utils import timezone
 from django.utils.dateparse import parse_date
-from django.db import IntegrityError
+from django.db import IntegrityError, transaction
+from django.db.models import Sum
 
-from .models import Attendance
-from .serializers import AttendanceSerializer
+from .bitmaps import load_history
+from .models import AbsenceAlert, Attendance, AttendanceDailyRollup, AttendanceMonthlyRollup
+from .pagination import AttendanceKeysetPagination
+from .heatmap import classroom_heatmap
+from .rollups import STATUSES, month_start, next_month, summarize, with_rate
+from .serializers import AbsenceAlertSerializer, AttendanceSerializer, RollCallSerializer
+from .writes import attendance_written
 
 
 class AttendanceListCreateView(APIView):
@@ -14,30 +23,45 @@ class AttendanceListCreateView(APIView):
 
     def get(self, request):
         """
-        List attendance records. Optional query params:
+        List attendance records, newest first, one page at a time. Optional query params:
         - user_type (e.g., student, teacher, staff)
-        - date
+        - date, or a date_from / date_to range (inclusive)
         - classroom (id)
+        - cursor / page_size (see AttendanceKeysetPagination)
         """
         user_type = request.query_params.get('user_type')
         date_str = request.query_params.get('date')
+        date_from = request.query_params.get('date_from')
+        date_to = request.query_params.get('date_to')
         classroom = request.query_params.get('classroom')
 
-        queryset = Attendance.objects.all()
+        queryset = Attendance.objects.select_related('user', 'classroom')
 
         if user_type:
             queryset = queryset.filter(user__user_type=user_type)
 
         if date_str:
-            parsed_date = parse_date(date_str)
+            parsed_date = _parse_date_param(date_str)
             if parsed_date:
                 queryset = queryset.filter(date=parsed_date)
 
+        if date_from:
+            parsed_date = _parse_date_param(date_from)
+            if parsed_date:
+                queryset = queryset.filter(date__gte=parsed_date)
+
+        if date_to:
+            parsed_date = _parse_date_param(date_to)
+            if parsed_date:
+                queryset = queryset.filter(date__lte=parsed_date)
+
         if classroom:
             queryset = queryset.filter(classroom_id=classroom)
 
-        serializer = AttendanceSerializer(queryset, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        paginator = AttendanceKeysetPagination()
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        serializer = AttendanceSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
 
     def post(self, request):
         """
@@ -47,7 +71,9 @@ class AttendanceListCreateView(APIView):
 
         if serializer.is_valid():
             try:
-                attendance = serializer.save()
+                with transaction.atomic():
+                    attendance = serializer.save()
+                    attendance_written([attendance])
                 return Response(AttendanceSerializer(attendance).data, status=status.HTTP_201_CREATED)
             except IntegrityError:
                 return Response(
@@ -64,3 +90,229 @@ class AttendanceListCreateView(APIView):
         # If serializer is not valid
         print("Validation errors:", serializer.errors)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class RollCallView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        """
+        Record a whole classroom's attendance in one request.
+        Body: classroom, optional date, entries=[{user, status, remarks}].
+        Returns one result per entry (created / updated / error).
+        """
+        serializer = RollCallSerializer(data=request.data)
+        if not serializer.is_valid():
+            print("Validation errors:", serializer.errors)
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        results = serializer.save()
+        counts = {"created": 0, "updated": 0, "error": 0}
+        for row in results:
+            counts[row["result"]] += 1
+
+        return Response(
+            {
+                "classroom": serializer.validated_data["classroom"].id,
+                "date": serializer.validated_data["date"],
+                **counts,
+                "results": results,
+            },
+            status=status.HTTP_200_OK if counts["error"] < len(results) else status.HTTP_400_BAD_REQUEST,
+        )
+
+
+def _parse_date_param(value):
+    """parse_date() that returns None for impossible dates such as 2025-02-30."""
+    try:
+        return parse_date(value or '')
+    except ValueError:
+        return None
+
+
+def _rollup_date_range(request):
+    """Parse optional date_from / date_to query params (None when missing/invalid)."""
+    date_from = _parse_date_param(request.query_params.get('date_from'))
+    date_to = _parse_date_param(request.query_params.get('date_to'))
+    return date_from, date_to
+
+
+class StudentAttendanceRateView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, user_id):
+        """
+        Attendance rate for one user, from the monthly rollup.
+        date_from / date_to are widened to whole months.
+        """
+        date_from, date_to = _rollup_date_range(request)
+        rollups = AttendanceMonthlyRollup.objects.filter(user_id=user_id)
+        if date_from:
+            rollups = rollups.filter(month__gte=month_start(date_from))
+        if date_to:
+            rollups = rollups.filter(month__lte=month_start(date_to))
+
+        months = (
+            rollups.values('month')
+            .annotate(**{s: Sum(s) for s in STATUSES})
+            .order_by('month')
+        )
+        return Response({
+            'user': user_id,
+            **summarize(rollups),
+            'months': [
+                {'month': row['month'], **with_rate({s: row[s] for s in STATUSES})}
+                for row in months
+            ],
+        })
+
+
+class ClassroomAttendanceRateView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, classroom_id):
+        """
+        Attendance rate for one classroom (daily rollup) with a per-student
+        breakdown (monthly rollup, widened to whole months).
+        """
+        date_from, date_to = _rollup_date_range(request)
+        daily = AttendanceDailyRollup.objects.filter(classroom_id=classroom_id)
+        monthly = AttendanceMonthlyRollup.objects.filter(classroom_id=classroom_id)
+        if date_from:
+            daily = daily.filter(date__gte=date_from)
+            monthly = monthly.filter(month__gte=month_start(date_from))
+        if date_to:
+            daily = daily.filter(date__lte=date_to)
+            monthly = monthly.filter(month__lte=month_start(date_to))
+
+        students = (
+            monthly.values('user_id', 'user__first_name', 'user__last_name')
+            .annotate(**{s: Sum(s) for s in STATUSES})
+            .order_by('user__first_name', 'user__last_name')
+        )
+        return Response({
+            'classroom': classroom_id,
+            **summarize(daily),
+            'students': [
+                {
+                    'user': row['user_id'],
+                    'full_name': f"{row['user__first_name'] or ''} {row['user__last_name'] or ''}".strip(),
+                    **with_rate({s: row[s] for s in STATUSES}),
+                }
+                for row in students
+            ],
+        })
+
+
+class SchoolAttendanceRateView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        """School-wide attendance rate, from the daily rollup."""
+        date_from, date_to = _rollup_date_range(request)
+        daily = AttendanceDailyRollup.objects.all()
+        if date_from:
+            daily = daily.filter(date__gte=date_from)
+        if date_to:
+            daily = daily.filter(date__lte=date_to)
+        return Response(summarize(daily))
+
+
+class AttendanceHistoryView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, user_id):
+        """
+        Day counts, longest absence streak and (optionally) the status on one
+        day for a user, over archived terms and live rows alike.
+        Query params: date_from, date_to (default: the last 365 days), on.
+        """
+        date_from, date_to = _rollup_date_range(request)
+        date_to = date_to or timezone.now().date()
+        date_from = date_from or date_to - timedelta(days=364)
+        if date_from > date_to:
+            return Response({"detail": "date_from must not be after date_to."}, status=status.HTTP_400_BAD_REQUEST)
+
+        history = load_history(user_id, date_from, date_to)
+        data = {
+            'user': user_id,
+            'date_from': date_from,
+            'date_to': date_to,
+            'days': history.summary(),
+            'longest_absence_streak': history.longest_streak('absent'),
+        }
+        on = _parse_date_param(request.query_params.get('on'))
+        if on:
+            data['on'] = {'date': on, 'status': history.status_on(on)}
+        return Response(data)
+
+
+class AbsenceAlertListView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        """
+        Chronic-absence alerts, newest first. Optional query params:
+        - acknowledged (true / false)
+        - kind (consecutive, rolling)
+        - classroom (id), user (id)
+        """
+        alerts = AbsenceAlert.objects.select_related('user', 'classroom')
+
+        acknowledged = request.query_params.get('acknowledged')
+        if acknowledged in ('true', 'false'):
+            alerts = alerts.filter(acknowledged=acknowledged == 'true')
+        for param in ('kind', 'classroom', 'user'):
+            value = request.query_params.get(param)
+            if value and param != 'kind' and not value.isdigit():
+                return Response({"detail": f"{param} must be an id."}, status=status.HTTP_400_BAD_REQUEST)
+            if value:
+                alerts = alerts.filter(**{param: value})
+
+        return Response(AbsenceAlertSerializer(alerts[:500], many=True).data)
+
+
+class AbsenceAlertAcknowledgeView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, pk):
+        alert = get_object_or_404(AbsenceAlert, pk=pk)
+        alert.acknowledged = True
+        alert.acknowledged_by = request.user
+        alert.save(update_fields=['acknowledged', 'acknowledged_by'])
+        return Response(AbsenceAlertSerializer(alert).data)
+
+
+class ClassroomHeatmapView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+    MAX_DAYS = 366
+
+    def get(self, request, classroom_id):
+        """
+        Day-by-day status counts for a classroom, for drawing calendars.
+        Query params: month (YYYY-MM), or a date_from / date_to range
+        (at most MAX_DAYS); defaults to the current month.
+        """
+        month = request.query_params.get('month')
+        date_from, date_to = _rollup_date_range(request)
+        if month:
+            date_from = _parse_date_param(f"{month}-01")
+            if not date_from:
+                return Response({"detail": "month must be YYYY-MM."}, status=status.HTTP_400_BAD_REQUEST)
+            date_to = next_month(date_from) - timedelta(days=1)
+        elif not (date_from and date_to):
+            date_from = month_start(timezone.now().date())
+            date_to = next_month(date_from) - timedelta(days=1)
+
+        if date_from > date_to or (date_to - date_from).days >= self.MAX_DAYS:
+            return Response(
+                {"detail": f"Give a date range of at most {self.MAX_DAYS} days."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        return Response({
+            'classroom': classroom_id,
+            'date_from': date_from,
+            'date_to': date_to,
+            **classroom_heatmap(classroom_id, date_from, date_to),
+        })
@@ -0,0 +1,30 @@
+"""
+Single entry point for keeping derived attendance data in step with writes.
+
+Every view that creates or changes Attendance rows calls
+`attendance_written()` inside its transaction.
+"""
+from django.db import transaction
+
+from . import absence, heatmap
+from .rollups import refresh_rollups
+
+
+def attendance_written(records, previous_classroom_ids=()):
+    """
+    `records` are the Attendance rows as written (instances or anything with
+    user_id, date, status and classroom_id); `previous_classroom_ids` are the
+    classrooms overwritten rows used to belong to.
+    """
+    records = list(records)
+    if not records:
+        return
+    dates = {r.date for r in records}
+    classroom_ids = {r.classroom_id for r in records} | set(previous_classroom_ids)
+
+    refresh_rollups([r.user_id for r in records], dates, classroom_ids)
+    absence.feed(records)
+
+    # after commit, so a concurrent read cannot re-cache the old counts
+    touched = {(c, d) for c in classroom_ids for d in dates}
+    transaction.on_commit(lambda: heatmap.invalidate(touched))
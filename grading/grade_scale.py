@@ -0,0 +1,95 @@
+# grading/grade_scale.py
+# ────────────────────────────────────────────────────────────────
+# Process‑wide, in‑memory index over the Grade scale.
+#
+# The Grade table is tiny (A, B+, …) but it is consulted for every
+# ManageExam row we grade or render.  Instead of one range query per
+# row we keep the whole scale sorted by `score_from` and bisect it.
+#
+# The index is rebuilt lazily after `invalidate()` (called by the
+# Grade write end‑points) or when it is older than INDEX_TTL_SECONDS,
+# so other worker processes pick up changes as well.
+# ────────────────────────────────────────────────────────────────
+from __future__ import annotations
+
+import threading
+import time
+from bisect import bisect_right
+from decimal import Decimal
+
+from .models import Grade
+
+INDEX_TTL_SECONDS = 60
+
+_lock  = threading.Lock()
+_index = None           # _GradeScaleIndex | None
+
+
+class _GradeScaleIndex:
+    """Immutable snapshot of the Grade table, sorted by score_from."""
+
+    def __init__(self, grades):
+        self.built_at = time.monotonic()
+        self.grades   = sorted(grades, key=lambda g: (g.score_from, g.id))
+        self.starts   = [g.score_from for g in self.grades]
+        self.by_id    = {g.id: g for g in self.grades}
+
+        # running max of score_to – lets the left walk stop early
+        self.max_to = []
+        running = None
+        for g in self.grades:
+            running = g.score_to if running is None else max(running, g.score_to)
+            self.max_to.append(running)
+
+    def lookup(self, score) -> Grade | None:
+        """
+        Same answer as
+            Grade.objects.filter(score_from__lte=score, score_to__gte=score).first()
+        i.e. the matching band with the highest `score_from`.
+        """
+        i = bisect_right(self.starts, score)
+        while i > 0:
+            i -= 1
+            if self.max_to[i] < score:      # nothing further left can match
+                break
+            grade = self.grades[i]
+            if grade.score_to >= score:
+                return grade
+        return None
+
+
+def _get_index() -> _GradeScaleIndex:
+    global _index
+    index = _index
+    if index is not None and time.monotonic() - index.built_at < INDEX_TTL_SECONDS:
+        return index
+
+    with _lock:
+        index = _index
+        if index is None or time.monotonic() - index.built_at >= INDEX_TTL_SECONDS:
+            index = _GradeScaleIndex(Grade.objects.all())
+            _index = index
+    return index
+
+
+def invalidate() -> None:
+    """Drop the cached scale – call after any Grade create / update / delete."""
+    global _index
+    with _lock:
+        _index = None
+
+
+def grade_for_score(score) -> Grade | None:
+    """Return the Grade that matches this score (or None)."""
+    if score is None:
+        return None
+    if isinstance(score, float):
+        score = Decimal(str(score))
+    return _get_index().lookup(score)
+
+
+def grade_by_id(grade_id) -> Grade | None:
+    """Return a Grade from the cached scale by primary key (or None)."""
+    if grade_id is None:
+        return None
+    return _get_index().by_id.get(grade_id)
@@ -58,9 +58,8 @@ class ManageExam(models.Model):
 
     # helper to calculate grade on the fly
     def get_grade(self):
-        if self.grade:                      # already stored?
-            return self.grade
-        return Grade.objects.filter(
-            score_from__lte=self.score,
-            score_to__gte=self.score
-        ).first()
+        from .grade_scale import grade_by_id, grade_for_score
+
+        if self.grade_id:                   # already stored?
+            return grade_by_id(self.grade_id) or self.grade
+        return grade_for_score(self.score)
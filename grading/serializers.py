@@ -4,10 +4,12 @@
 #   1. Exam Type
 #   2. Grade scale
 #   3. Exam records (ManageExam)
+#   4. Mark sheet (bulk ManageExam entry)
 # ────────────────────────────────────────────────────────────────
 from django.db import transaction
 from rest_framework import serializers
 
+from . import grade_scale
 from .models import ExamType, Grade, ManageExam
 from academic.models import Classroom, Subject          # (import kept – used by DRF browsable API)
 from portalaccount.models import StudentProfile
@@ -103,8 +105,8 @@ class ManageExamSerializer(serializers.ModelSerializer):
     # ──────────────────────────────────────────
     @staticmethod
     def _grade_for_score(score: int | float) -> Grade | None:
-        """Return the Grade that matches this score (or None)."""
-        return Grade.objects.filter(score_from__lte=score, score_to__gte=score).first()
+        """Return the Grade that matches this score (or None) – no query, uses the cached scale."""
+        return grade_scale.grade_for_score(score)
 
     def _auto_set_grade(self, instance: ManageExam) -> None:
         """
@@ -176,3 +178,114 @@ class ManageExamSerializer(serializers.ModelSerializer):
             rep["grade_name"]    = grade.name
             rep["grade_comment"] = grade.comment
         return rep
+
+
+# ╭────────────────────────────────────────────╮
+# │ 4. Mark sheet – bulk entry for one class   │
+# ╰────────────────────────────────────────────╯
+class MarkSheetEntrySerializer(serializers.Serializer):
+    # plain id – students are resolved for the whole sheet in one query
+    student = serializers.IntegerField()
+    score   = serializers.DecimalField(max_digits=5, decimal_places=2)
+    comment = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+
+    def validate_score(self, value):
+        if value < 0:
+            raise serializers.ValidationError("Score cannot be negative.")
+        return value
+
+
+class MarkSheetSerializer(serializers.Serializer):
+    """
+    One classroom + subject + exam type and a list of student scores.
+    Set `overwrite` to replace marks that were already captured.
+    """
+    classroom = serializers.PrimaryKeyRelatedField(queryset=Classroom.objects.all())
+    subject   = serializers.PrimaryKeyRelatedField(queryset=Subject.objects.all())
+    exam_type = serializers.PrimaryKeyRelatedField(queryset=ExamType.objects.all())
+    section   = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+    overwrite = serializers.BooleanField(required=False, default=False)
+    entries   = MarkSheetEntrySerializer(many=True, allow_empty=False)
+
+    def validate(self, attrs):
+        student_ids = [e["student"] for e in attrs["entries"]]
+
+        # same student twice on one sheet
+        seen, repeated = set(), set()
+        for sid in student_ids:
+            (repeated if sid in seen else seen).add(sid)
+        if repeated:
+            raise serializers.ValidationError(
+                {"entries": f"Student(s) listed more than once: {sorted(repeated)}"}
+            )
+
+        # unknown students – one query for the whole sheet
+        known = set(
+            StudentProfile.objects.filter(pk__in=seen).values_list("pk", flat=True)
+        )
+        unknown = seen - known
+        if unknown:
+            raise serializers.ValidationError(
+                {"entries": f"Unknown student id(s): {sorted(unknown)}"}
+            )
+
+        # marks already captured – one query for the whole sheet
+        existing = set(
+            ManageExam.objects.filter(
+                classroom=attrs["classroom"],
+                subject=attrs["subject"],
+                exam_type=attrs["exam_type"],
+                student_id__in=seen,
+            ).values_list("student_id", flat=True)
+        )
+        if existing and not attrs.get("overwrite"):
+            raise serializers.ValidationError(
+                {"entries": "An exam record for this subject / exam type already exists "
+                            f"for student(s): {sorted(existing)}"}
+            )
+        attrs["existing_students"] = existing
+        return attrs
+
+    @transaction.atomic
+    def create(self, validated_data):
+        classroom = validated_data["classroom"]
+        subject   = validated_data["subject"]
+        exam_type = validated_data["exam_type"]
+        section   = validated_data.get("section")
+
+        rows = []
+        for entry in validated_data["entries"]:
+            grade = grade_scale.grade_for_score(entry["score"])
+            rows.append(ManageExam(
+                classroom=classroom,
+                section=section,
+                subject=subject,
+                exam_type=exam_type,
+                student_id=entry["student"],
+                score=entry["score"],
+                comment=entry.get("comment"),
+                grade_id=grade.id if grade else None,
+            ))
+
+        if validated_data.get("overwrite"):
+            ManageExam.objects.bulk_create(
+                rows,
+                update_conflicts=True,
+                unique_fields=["student", "subject", "exam_type", "classroom"],
+                update_fields=["section", "score", "comment", "grade"],
+            )
+        else:
+            ManageExam.objects.bulk_create(rows)
+
+        return (
+            ManageExam.objects.select_related(
+                "classroom", "subject", "student__user", "exam_type"
+            )
+            .filter(
+                classroom=classroom,
+                subject=subject,
+                exam_type=exam_type,
+                student_id__in=[r.student_id for r in rows],
+            )
+            .order_by("student_id")
+        )
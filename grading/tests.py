@@ -1,3 +1,72 @@
+from contextlib import redirect_stdout
+from decimal import Decimal
+from io import StringIO
+
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from academic.models import Classroom, Subject
+from portalaccount.models import StudentProfile, User
+from . import grade_scale
+from .models import ExamType, Grade, ManageExam
+
+
+class MarkSheetTests(TestCase):
+    def setUp(self):
+        self.classroom = Classroom.objects.create(name="Form 3", section="A", academic_year="2025")
+        self.subject = Subject.objects.create(name="Chemistry", code="CHEM")
+        self.exam_type = ExamType.objects.create(name="Midterm")
+        self.a = Grade.objects.create(name="A", score_from=80, score_to=100)
+        self.c = Grade.objects.create(name="C", score_from=50, score_to=79.99)
+        grade_scale.invalidate()
+        users = [User.objects.create_user(email=f"sheet{i}@example.com", password="x") for i in range(3)]
+        self.students = [StudentProfile.objects.create(user=user) for user in users]
+
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(email="teacher@example.com", password="x"))
+
+    def _post(self, scores, **extra):
+        return self.client.post("/exams/mark-sheet/", {
+            "classroom": self.classroom.pk,
+            "subject": self.subject.pk,
+            "exam_type": self.exam_type.pk,
+            "entries": [{"student": s.pk, "score": score} for s, score in zip(self.students, scores)],
+            **extra,
+        }, format="json")
+
+    def _marks(self):
+        return list(ManageExam.objects.order_by("student_id").values_list("student_id", "score", "grade_id"))
+
+    def test_sheet_is_graded_and_stored(self):
+        response = self._post([85, 60, 20])
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.data["created"], response.data["updated"]), (3, 0))
+        self.assertEqual(self._marks(), [
+            (self.students[0].pk, Decimal("85.00"), self.a.pk),
+            (self.students[1].pk, Decimal("60.00"), self.c.pk),
+            (self.students[2].pk, Decimal("20.00"), None),
+        ])
+
+    def test_resubmission_needs_overwrite(self):
+        self._post([85, 60])
+        with redirect_stdout(StringIO()):
+            self.assertEqual(self._post([40, 90]).status_code, 400)
+        self.assertEqual([score for _, score, _ in self._marks()], [Decimal("85.00"), Decimal("60.00")])
+
+        response = self._post([40, 90, 55], overwrite=True)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.data["created"], response.data["updated"]), (1, 2))
+        self.assertEqual(self._marks(), [
+            (self.students[0].pk, Decimal("40.00"), None),
+            (self.students[1].pk, Decimal("90.00"), self.a.pk),
+            (self.students[2].pk, Decimal("55.00"), self.c.pk),
+        ])
 
-# Create your tests here.
+    def test_student_listed_twice_is_rejected(self):
+        self.students[1] = self.students[0]
+        with redirect_stdout(StringIO()):
+            response = self._post([85, 60])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("more than once", str(response.data["entries"]))
+        self.assertFalse(ManageExam.objects.exists())
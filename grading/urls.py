@@ -10,6 +10,7 @@ from .views import (
     # Exam records
     ManageExamListCreateAPIView,
     ManageExamDetailAPIView,
+    ManageExamMarkSheetAPIView,
     MyExamsAPIView,
 
     # 🔸 Helper endpoints
@@ -29,6 +30,9 @@ urlpatterns = [
     path("exams/", ManageExamListCreateAPIView.as_view(), name="manageexam-list-create"),
     path("exams/<int:pk>/", ManageExamDetailAPIView.as_view(), name="manageexam-detail"),
 
+    # 🔹 Bulk mark sheet (one classroom / subject / exam type)
+    path("exams/mark-sheet/", ManageExamMarkSheetAPIView.as_view(), name="manageexam-mark-sheet"),
+
     # 🔹 Exams for logged-in student
     path("exams/my/", MyExamsAPIView.as_view(), name="my-exams"),
 
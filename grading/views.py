@@ -8,8 +8,11 @@ from rest_framework import status, permissions
 from rest_framework.response import Response
 from rest_framework_simplejwt.authentication import JWTAuthentication
 
+from . import grade_scale
 from .models import ExamType, Grade, ManageExam
-from .serializers import ExamTypeSerializer, GradeSerializer, ManageExamSerializer
+from .serializers import (
+    ExamTypeSerializer, GradeSerializer, ManageExamSerializer, MarkSheetSerializer
+)
 
 from academic.models import (
     Classroom, StudentProfile, ClassroomSubject, StudentSubject
@@ -66,6 +69,7 @@ class GradeListCreateAPIView(APIView):
         ser = GradeSerializer(data=request.data)
         if ser.is_valid():
             obj = ser.save()
+            grade_scale.invalidate()
             return Response(GradeSerializer(obj).data, status=201)
         print("[Grade CREATE]", ser.errors)
         return Response(ser.errors, status=400)
@@ -88,6 +92,7 @@ class GradeDetailAPIView(APIView):
         ser = GradeSerializer(grade, data=request.data)
         if ser.is_valid():
             ser.save()
+            grade_scale.invalidate()
             return Response(ser.data)
         return Response(ser.errors, status=400)
 
@@ -97,6 +102,7 @@ class GradeDetailAPIView(APIView):
         ser = GradeSerializer(grade, data=request.data, partial=True)
         if ser.is_valid():
             ser.save()
+            grade_scale.invalidate()
             return Response(ser.data)
         return Response(ser.errors, status=400)
 
@@ -104,6 +110,7 @@ class GradeDetailAPIView(APIView):
         # Delete a grade
         grade = self.get_object(pk)
         grade.delete()
+        grade_scale.invalidate()
         return Response(status=204)
 
 
@@ -184,6 +191,29 @@ class ManageExamDetailAPIView(APIView):
         return Response(status=204)
 
 
+class ManageExamMarkSheetAPIView(APIView):
+    authentication_classes = [JWTAuthentication]
+    permission_classes     = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        # Capture a whole mark sheet (one classroom / subject / exam type)
+        ser = MarkSheetSerializer(data=request.data)
+        if not ser.is_valid():
+            print("[MarkSheet CREATE]", ser.errors)
+            return Response(ser.errors, status=400)
+
+        existing = ser.validated_data["existing_students"]
+        records  = ser.save()
+        return Response(
+            {
+                "created": len(ser.validated_data["entries"]) - len(existing),
+                "updated": len(existing),
+                "records": ManageExamSerializer(records, many=True).data,
+            },
+            status=201,
+        )
+
+
 class MyExamsAPIView(APIView):
     authentication_classes = [JWTAuthentication]
     permission_classes     = [permissions.IsAuthenticated]
@@ -192,7 +222,11 @@ class MyExamsAPIView(APIView):
         # Show exams for the currently logged-in student
         try:
             student = request.user.student_profile
-            qs = ManageExam.objects.filter(student=student).order_by("-date_recorded")
+            qs = (
+                ManageExam.objects.filter(student=student)
+                .select_related("classroom", "subject", "student__user", "exam_type")
+                .order_by("-date_recorded")
+            )
             return Response(ManageExamSerializer(qs, many=True).data)
         except AttributeError:
             return Response({"detail": "Only students can access this."}, status=403)
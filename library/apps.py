@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class LibraryConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'library'
+
+    def ready(self):
+        from . import catalog, fines, inventory
+        fines.connect_signals()
+        inventory.connect_signals()
+        catalog.connect_signals()
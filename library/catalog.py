@@ -0,0 +1,278 @@
+"""
+Catalog snapshots and deltas for library kiosks.
+
+Every catalog edit appends a CatalogChange row (kind, object id), and
+the row id serves as the catalog version. The rows are written once the
+edit's transaction commits, so ids follow commit order however long the
+transaction ran, and a rolled-back edit leaves none. Saves and deletes arrive
+through the signals below. Stock moves are queryset updates, which send
+no signals, so circulation, the importer and the inventory repair call
+books_changed() themselves.
+
+A snapshot is the whole catalog (categories, books, availability) as
+gzipped JSON, stored in the content-addressed media pool and served with
+its SHA-256 as ETag. A new snapshot is built from the previous one plus
+the books and categories changed since, so only those rows are read
+again. A full rebuild happens when there is no usable previous snapshot.
+The output is deterministic: an incremental build and a full rebuild of
+the same version produce the same blob.
+
+`changes_since(version)` gives kiosks the rows changed after their
+version, plus the ids deleted since. Versions only count changes at
+least SETTLE_SECONDS old: two change-log inserts racing each other can
+still commit out of id order, and the window covers that single insert.
+"""
+import gzip
+import json
+import os
+import tempfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.utils import timezone
+
+from mediastore.storage import TMP_DIR, media_storage
+
+from .models import Book, CatalogChange, CatalogSnapshot, Category
+
+BOOK_FIELDS = (
+    'id', 'title', 'author', 'isbn', 'publisher', 'edition', 'language', 'description',
+    'category_id', 'total_copies', 'available_copies',
+)
+CATEGORY_FIELDS = ('id', 'name', 'description')
+
+SETTLE_SECONDS = getattr(settings, 'CATALOG_CHANGE_SETTLE_SECONDS', 5)
+SNAPSHOT_MIN_INTERVAL = getattr(settings, 'CATALOG_SNAPSHOT_MIN_INTERVAL', 60)
+CHANGE_RETENTION_DAYS = getattr(settings, 'CATALOG_CHANGE_RETENTION_DAYS', 30)
+SNAPSHOT_KEEP = 2                           # the newest, plus one for downloads in flight
+DELTA_LIMIT = 5000                          # changed rows before a kiosk is sent to the snapshot
+_CHUNK = 1000                               # IN (...) size for re-reading changed rows
+
+
+class VersionTooOld(Exception):
+    """The change log no longer reaches back to this version."""
+
+
+# ------------------------------------------------------------------
+# CHANGE LOG
+# ------------------------------------------------------------------
+def changed(kind, ids):
+    """Log changed rows when the current transaction commits (at once outside one)."""
+    ids = list(ids)
+    if ids:
+        transaction.on_commit(lambda: CatalogChange.objects.bulk_create(
+            [CatalogChange(kind=kind, object_id=pk) for pk in ids]
+        ))
+
+
+def books_changed(book_ids):
+    changed(CatalogChange.BOOK, book_ids)
+
+
+def settled_version():
+    """The newest version that in-flight change-log inserts can no longer fall behind."""
+    cutoff = timezone.now() - timedelta(seconds=SETTLE_SECONDS)
+    return (
+        CatalogChange.objects.filter(created_at__lte=cutoff)
+        .order_by('-id').values_list('id', flat=True).first() or 0
+    )
+
+
+def _log_reaches(version):
+    """True when every change after `version` is still in the log."""
+    oldest = CatalogChange.objects.order_by('id').values_list('id', flat=True).first()
+    return oldest is None or version >= oldest - 1
+
+
+def _changed_ids(since, version):
+    ids = {CatalogChange.BOOK: set(), CatalogChange.CATEGORY: set()}
+    rows = (
+        CatalogChange.objects.filter(id__gt=since, id__lte=version)
+        .order_by().values_list('kind', 'object_id').distinct()
+    )
+    for kind, object_id in rows.iterator():
+        ids[kind].add(object_id)
+    return ids[CatalogChange.BOOK], ids[CatalogChange.CATEGORY]
+
+
+# ------------------------------------------------------------------
+# ROWS
+# ------------------------------------------------------------------
+def _book_row(row):
+    row['category'] = row.pop('category_id')
+    return row
+
+
+def _read(model, fields, ids=None):
+    """{pk: row dict} for `ids` (all rows when None)."""
+    if ids is None:
+        rows = model.objects.order_by('pk').values(*fields).iterator(chunk_size=2000)
+    else:
+        ids = sorted(ids)
+        rows = (
+            row for i in range(0, len(ids), _CHUNK)
+            for row in model.objects.filter(pk__in=ids[i:i + _CHUNK]).values(*fields)
+        )
+    convert = _book_row if model is Book else dict
+    return {row['id']: convert(row) for row in rows}
+
+
+def changes_since(since, limit=DELTA_LIMIT):
+    """
+    Catalog rows changed after version `since`:
+    {version, since, categories, books, deleted: {categories, books}}.
+    Raises VersionTooOld when the log was pruned past `since` or more than
+    `limit` rows changed (the kiosk should fetch the snapshot instead).
+    """
+    version = settled_version()
+    if not _log_reaches(since):
+        raise VersionTooOld()
+    book_ids, category_ids = _changed_ids(since, version) if since < version else (set(), set())
+    if len(book_ids) + len(category_ids) > limit:
+        raise VersionTooOld()
+
+    categories = _read(Category, CATEGORY_FIELDS, category_ids)
+    books = _read(Book, BOOK_FIELDS, book_ids)
+    return {
+        'version': max(version, since),
+        'since': since,
+        'categories': [categories[pk] for pk in sorted(categories)],
+        'books': [books[pk] for pk in sorted(books)],
+        'deleted': {
+            'categories': sorted(category_ids - categories.keys()),
+            'books': sorted(book_ids - books.keys()),
+        },
+    }
+
+
+# ------------------------------------------------------------------
+# SNAPSHOTS
+# ------------------------------------------------------------------
+def _load(snapshot):
+    path = media_storage().path(snapshot.file.name)
+    with gzip.open(path, 'rt', encoding='utf-8') as handle:
+        document = json.load(handle)
+    return (
+        {row['id']: row for row in document['categories']},
+        {row['id']: row for row in document['books']},
+    )
+
+
+def _write(version, categories, books):
+    """Write the snapshot document to a temp file under MEDIA_ROOT and return its path."""
+    storage = media_storage()
+    os.makedirs(storage.path(TMP_DIR), exist_ok=True)
+    fd, path = tempfile.mkstemp(dir=storage.path(TMP_DIR), prefix='catalog-')
+    document = {
+        'version': version,
+        'categories': [categories[pk] for pk in sorted(categories)],
+        'books': [books[pk] for pk in sorted(books)],
+    }
+    try:
+        # mtime=0 keeps the bytes, and so the blob and ETag, a function of the content
+        with os.fdopen(fd, 'wb') as raw, gzip.GzipFile(fileobj=raw, mode='wb', mtime=0) as out:
+            out.write(json.dumps(document, separators=(',', ':'), ensure_ascii=False).encode())
+    except BaseException:
+        os.remove(path)
+        raise
+    return path
+
+
+def build_snapshot(full=False):
+    """Write a snapshot of the current settled version (if there is none yet) and return it."""
+    version = settled_version()
+    previous = CatalogSnapshot.objects.order_by('-version').first()
+    if previous is not None and previous.version == version and not full:
+        return previous
+
+    state = None
+    if not full and previous is not None and previous.version < version and _log_reaches(previous.version):
+        try:
+            state = _load(previous)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"[ERROR] Catalog snapshot v{previous.version} unreadable, rebuilding: {e}")
+    if state is None:
+        categories = _read(Category, CATEGORY_FIELDS)
+        books = _read(Book, BOOK_FIELDS)
+    else:
+        categories, books = state
+        book_ids, category_ids = _changed_ids(previous.version, version)
+        for rows, model, fields, ids in (
+            (categories, Category, CATEGORY_FIELDS, category_ids),
+            (books, Book, BOOK_FIELDS, book_ids),
+        ):
+            fresh = _read(model, fields, ids)
+            for pk in ids:
+                rows.pop(pk, None)
+            rows.update(fresh)
+
+    path = _write(version, categories, books)
+    try:
+        name = media_storage().store_path(path, 'catalog.json.gz')
+    finally:
+        if os.path.exists(path):            # store_path leaves the file behind if the move fails
+            os.remove(path)
+    try:
+        with transaction.atomic():
+            snapshot, _ = CatalogSnapshot.objects.update_or_create(
+                version=version,
+                defaults={'file': name, 'books': len(books), 'categories': len(categories)},
+            )
+    except IntegrityError:                  # a concurrent build of the same version won
+        snapshot = CatalogSnapshot.objects.get(version=version)
+    return snapshot
+
+
+def current_snapshot():
+    """The newest snapshot, rebuilt first when it is behind and older than SNAPSHOT_MIN_INTERVAL."""
+    latest = CatalogSnapshot.objects.order_by('-version').first()
+    if latest is None:
+        return build_snapshot()
+    fresh_enough = latest.created_at > timezone.now() - timedelta(seconds=SNAPSHOT_MIN_INTERVAL)
+    if fresh_enough or latest.version >= settled_version():
+        return latest
+    return build_snapshot()
+
+
+def prune(retention_days=CHANGE_RETENTION_DAYS):
+    """
+    Drop old snapshots (their blobs go with sweep_media) and change-log rows
+    older than `retention_days`. The newest change always stays, so the log
+    still tells which versions deltas can serve. Returns (snapshots, changes) deleted.
+    """
+    keep = list(CatalogSnapshot.objects.order_by('-version').values_list('pk', flat=True)[:SNAPSHOT_KEEP])
+    snapshots = 0
+    for snapshot in CatalogSnapshot.objects.exclude(pk__in=keep):
+        snapshot.delete()                   # per row, so the blob reference counts follow
+        snapshots += 1
+
+    newest = CatalogChange.objects.order_by('-id').values_list('id', flat=True).first() or 0
+    cutoff = timezone.now() - timedelta(days=retention_days)
+    changes, _ = CatalogChange.objects.filter(created_at__lt=cutoff, id__lt=newest).delete()
+    return snapshots, changes
+
+
+# ------------------------------------------------------------------
+# SIGNALS
+# ------------------------------------------------------------------
+def _book_changed(sender, instance, **kwargs):
+    books_changed([instance.pk])
+
+
+def _category_changed(sender, instance, **kwargs):
+    changed(CatalogChange.CATEGORY, [instance.pk])
+
+
+def _category_deleting(sender, instance, **kwargs):
+    # its books lose their category through an UPDATE, which sends no signal
+    books_changed(list(instance.books.values_list('pk', flat=True)))
+
+
+def connect_signals():
+    post_save.connect(_book_changed, sender=Book, dispatch_uid='library:catalog:book:save')
+    post_delete.connect(_book_changed, sender=Book, dispatch_uid='library:catalog:book:delete')
+    post_save.connect(_category_changed, sender=Category, dispatch_uid='library:catalog:category:save')
+    post_delete.connect(_category_changed, sender=Category, dispatch_uid='library:catalog:category:delete')
+    pre_delete.connect(_category_deleting, sender=Category, dispatch_uid='library:catalog:category:books')
@@ -0,0 +1,439 @@
+# library/circulation.py
+# ------------------------------------------------------------------
+# Lock-safe circulation: every stock change is a single conditional
+# UPDATE, so two desks can never hand out the last copy twice and a
+# loan can never be returned (and restocked) twice.
+#
+# Holds: a returned copy goes to the oldest waiting BookHold (which
+# becomes "ready") rather than back on the shelf, so at all times
+#     available_copies = total_copies - open loans - ready holds
+# ------------------------------------------------------------------
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .catalog import books_changed
+from .inventory import stock_touched
+from .models import Book, BookHold, BorrowedBook
+
+HOLD_PICKUP_DAYS = getattr(settings, 'LIBRARY_HOLD_PICKUP_DAYS', 3)
+
+
+class CirculationError(Exception):
+    """A borrow / return that cannot go ahead; `status_code` is the HTTP status to answer with."""
+    status_code = 400
+
+    def __init__(self, detail):
+        super().__init__(detail)
+        self.detail = detail
+
+
+class NoCopiesAvailable(CirculationError):
+    def __init__(self, detail="No available copies of this book."):
+        super().__init__(detail)
+
+
+class AlreadyBorrowed(CirculationError):
+    status_code = 409
+
+    def __init__(self, detail="This book is already issued to the same student."):
+        super().__init__(detail)
+
+
+class AlreadyReturned(CirculationError):
+    def __init__(self, detail="Book already returned."):
+        super().__init__(detail)
+
+
+class HoldNotAllowed(CirculationError):
+    def __init__(self, detail="Copies of this book are available – borrow it instead."):
+        super().__init__(detail)
+
+
+class AlreadyOnHold(CirculationError):
+    status_code = 409
+
+    def __init__(self, detail="This student already has a hold on this book."):
+        super().__init__(detail)
+
+
+class HoldNotActive(CirculationError):
+    def __init__(self, detail="This hold is no longer active."):
+        super().__init__(detail)
+
+
+# ------------------------------------------------------------------
+# STOCK COUNTER
+# ------------------------------------------------------------------
+def take_copy(book_id):
+    """Decrement available_copies only if a copy is left. True on success."""
+    taken = Book.objects.filter(pk=book_id, available_copies__gt=0).update(
+        available_copies=F("available_copies") - 1
+    ) == 1
+    if taken:
+        books_changed([book_id])
+    return taken
+
+
+def put_back_copy(book_id):
+    """Increment available_copies, never above total_copies. True on success."""
+    put_back = Book.objects.filter(pk=book_id, available_copies__lt=F("total_copies")).update(
+        available_copies=F("available_copies") + 1
+    ) == 1
+    if put_back:
+        books_changed([book_id])
+    return put_back
+
+
+# ------------------------------------------------------------------
+# BORROW / RETURN
+# ------------------------------------------------------------------
+def checkout(student, book, issue_date, return_date):
+    """
+    Issue one copy of `book` to `student`.
+    Raises NoCopiesAvailable or AlreadyBorrowed; nothing is changed in that case.
+    """
+    with transaction.atomic():
+        # a ready hold already owns a copy; otherwise take one off the shelf
+        picked_up = BookHold.objects.filter(user=student, book=book, status=BookHold.READY).update(
+            status=BookHold.FULFILLED, closed_at=timezone.now()
+        )
+        if not picked_up and not take_copy(book.pk):
+            raise NoCopiesAvailable()
+        try:
+            # the open-loan unique constraint rejects a second open loan
+            with transaction.atomic():
+                borrow = BorrowedBook.objects.create(
+                    user=student,
+                    book=book,
+                    issue_date=issue_date,
+                    return_date=return_date,
+                    returned=False,
+                )
+        except IntegrityError:
+            raise AlreadyBorrowed()         # rolls the decrement back too
+    return borrow
+
+
+def return_loan(borrow, returned_on=None):
+    """
+    Close an open loan and hand the copy to the next hold, or the shelf.
+    Raises AlreadyReturned if another request closed it first.
+    """
+    returned_on = returned_on or timezone.now().date()
+    with transaction.atomic():
+        closed = BorrowedBook.objects.filter(pk=borrow.pk, returned=False).update(
+            returned=True, actual_return_date=returned_on
+        )
+        if not closed:
+            raise AlreadyReturned()
+        stock_touched([borrow.book_id])
+        release_copy(borrow.book_id)
+
+    borrow.returned = True
+    borrow.actual_return_date = returned_on
+    return borrow
+
+
+# ------------------------------------------------------------------
+# HOLD QUEUE
+# ------------------------------------------------------------------
+def _allocate_next_hold(book_id):
+    """
+    Mark the oldest waiting hold on `book_id` ready; the caller has a copy
+    in hand for it. Returns the hold, or None if nobody is waiting.
+    Must run inside a transaction.
+    """
+    now = timezone.now()
+    while True:
+        hold = (
+            BookHold.objects.select_for_update(skip_locked=True)
+            .filter(book_id=book_id, status=BookHold.WAITING)
+            .order_by("created_at", "id")
+            .first()
+        )
+        if hold is None:
+            return None
+        promoted = BookHold.objects.filter(pk=hold.pk, status=BookHold.WAITING).update(
+            status=BookHold.READY, ready_at=now, expires_at=now + timedelta(days=HOLD_PICKUP_DAYS)
+        )
+        if promoted:                        # else cancelled under us – try the next one
+            stock_touched([book_id])
+            hold.status = BookHold.READY
+            return hold
+
+
+def release_copy(book_id):
+    """A copy is free again: give it to the next hold, or put it back on the shelf."""
+    with transaction.atomic():
+        hold = _allocate_next_hold(book_id)
+        if hold is None:
+            put_back_copy(book_id)
+        return hold
+
+
+def place_hold(student, book):
+    """
+    Join the queue for a book with no copies on the shelf.
+    Raises HoldNotAllowed, AlreadyBorrowed or AlreadyOnHold.
+    """
+    if Book.objects.filter(pk=book.pk, available_copies__gt=0).exists():
+        raise HoldNotAllowed()
+    if BorrowedBook.objects.filter(user=student, book=book, returned=False).exists():
+        raise AlreadyBorrowed()
+    try:
+        with transaction.atomic():
+            return BookHold.objects.create(user=student, book=book)
+    except IntegrityError:
+        raise AlreadyOnHold()
+
+
+def cancel_hold(hold):
+    """Withdraw a waiting or ready hold; a ready hold's copy moves on to the next in line."""
+    now = timezone.now()
+    with transaction.atomic():
+        # a ready hold owns a copy, which has to move on
+        if BookHold.objects.filter(pk=hold.pk, status=BookHold.READY).update(
+            status=BookHold.CANCELLED, closed_at=now
+        ):
+            release_copy(hold.book_id)
+        elif not BookHold.objects.filter(pk=hold.pk, status=BookHold.WAITING).update(
+            status=BookHold.CANCELLED, closed_at=now
+        ):
+            raise HoldNotActive()
+        stock_touched([hold.book_id])
+    hold.status = BookHold.CANCELLED
+    hold.closed_at = now
+    return hold
+
+
+def expire_holds(now=None, book_ids=None):
+    """
+    Expire ready holds not picked up in time (their copies move on), then
+    hand any shelf copies of books with a queue to waiting holds.
+    Returns the number of holds expired.
+    """
+    now = now or timezone.now()
+    overdue = BookHold.objects.filter(status=BookHold.READY, expires_at__lt=now)
+    if book_ids is not None:
+        overdue = overdue.filter(book_id__in=book_ids)
+
+    expired = 0
+    for hold_id, book_id in overdue.values_list("id", "book_id").iterator():
+        with transaction.atomic():
+            if BookHold.objects.filter(pk=hold_id, status=BookHold.READY).update(
+                status=BookHold.EXPIRED, closed_at=now
+            ):
+                expired += 1
+                stock_touched([book_id])
+                release_copy(book_id)
+
+    # a copy may have reached the shelf while a hold was being placed
+    queued = Book.objects.filter(available_copies__gt=0, holds__status=BookHold.WAITING)
+    if book_ids is not None:
+        queued = queued.filter(pk__in=book_ids)
+    for book_id in queued.values_list("id", flat=True).distinct():
+        while True:
+            with transaction.atomic():
+                if not take_copy(book_id):
+                    break
+                if _allocate_next_hold(book_id) is None:
+                    put_back_copy(book_id)
+                    break
+    return expired
+
+
+# ------------------------------------------------------------------
+# DESK BATCHES  – a stack of scanned books for one student
+# ------------------------------------------------------------------
+MAX_BATCH_ITEMS = 100
+
+
+def _isbn_forms(value):
+    """The spellings a scanned ISBN may be stored under (as typed, compact, ISBN-13, ISBN-10)."""
+    from .importer import normalize_isbn
+
+    raw = str(value).strip()
+    forms = {raw, raw.replace('-', '').replace(' ', '')}
+    isbn13 = normalize_isbn(raw)
+    if isbn13:
+        forms.add(isbn13)
+        if isbn13.startswith('978'):
+            core = isbn13[3:12]
+            check = (11 - sum((10 - i) * int(d) for i, d in enumerate(core)) % 11) % 11
+            forms.add(core + ('X' if check == 10 else str(check)))
+    return forms
+
+
+def resolve_books(items):
+    """
+    {item: Book} for scanned items - book ids (ints / short digit strings)
+    or ISBNs in any common spelling - in one query. Unknown items are missing.
+    """
+    from .importer import normalize_isbn
+
+    ids, forms = {}, {}
+    for item in items:
+        text = str(item).strip()
+        if isinstance(item, int) or (text.isdigit() and len(text) < 10):
+            ids[item] = int(text)
+        else:
+            forms[item] = _isbn_forms(text)
+    all_forms = set().union(*forms.values()) if forms else set()
+    books = Book.objects.filter(
+        Q(pk__in=ids.values()) | Q(isbn__in=all_forms)
+    ).select_related('category')
+
+    by_id, by_isbn = {}, {}
+    for book in books:
+        by_id[book.pk] = book
+        by_isbn[book.isbn] = book
+        by_isbn.setdefault(normalize_isbn(book.isbn) or book.isbn, book)
+    resolved = {item: by_id[pk] for item, pk in ids.items() if pk in by_id}
+    for item, spellings in forms.items():
+        book = next((by_isbn[s] for s in spellings if s in by_isbn), None)
+        if book is not None:
+            resolved[item] = book
+    return resolved
+
+
+def _batch_plan(items, books):
+    """Per-item results (errors filled in) and {book_id: result} for the ones to process."""
+    results, pending = [], {}
+    for item in items:
+        book = books.get(item)
+        result = {'item': item, 'book': book.pk if book else None}
+        results.append(result)
+        if book is None:
+            result.update(status=404, detail="Unknown book.")
+        elif book.pk in pending:
+            result.update(status=400, detail="Scanned twice in this batch.")
+        else:
+            pending[book.pk] = result
+    return results, pending
+
+
+def checkout_many(student, items, issue_date, return_date):
+    """
+    Issue every scanned book to `student` in one transaction: titles are
+    resolved, locked and checked with one query each, ready holds and shelf
+    copies are taken with one UPDATE each and the loans bulk-created.
+    Returns (results, loans): one result dict per item, in order, with
+    `status` 201 and `loan` set, or an error `status` and `detail`.
+    """
+    books = resolve_books(items)
+    results, pending = _batch_plan(items, books)
+    if not pending:
+        return results, []
+    by_id = {book.pk: book for book in books.values()}
+    expire_holds(book_ids=list(pending))    # lapsed reservations free their copies
+
+    now = timezone.now()
+    try:
+        with transaction.atomic():
+            # lock the titles in id order, so two desks cannot deadlock
+            stock = dict(
+                Book.objects.select_for_update().filter(pk__in=pending).order_by('pk')
+                .values_list('pk', 'available_copies')
+            )
+            on_loan = set(
+                BorrowedBook.objects.filter(user=student, returned=False, book_id__in=pending)
+                .values_list('book_id', flat=True)
+            )
+            ready = dict(
+                BookHold.objects.select_for_update()
+                .filter(user=student, status=BookHold.READY, book_id__in=pending)
+                .values_list('book_id', 'pk')
+            )
+            from_hold, from_shelf = [], []
+            for book_id, result in pending.items():
+                if book_id in on_loan:
+                    result.update(status=AlreadyBorrowed.status_code, detail=AlreadyBorrowed().detail)
+                elif book_id in ready:
+                    from_hold.append(book_id)
+                elif stock.get(book_id, 0) > 0:
+                    from_shelf.append(book_id)
+                else:
+                    result.update(status=NoCopiesAvailable.status_code, detail=NoCopiesAvailable().detail)
+
+            if from_hold:
+                BookHold.objects.filter(pk__in=[ready[b] for b in from_hold]).update(
+                    status=BookHold.FULFILLED, closed_at=now
+                )
+            if from_shelf:
+                Book.objects.filter(pk__in=from_shelf, available_copies__gt=0).update(
+                    available_copies=F("available_copies") - 1
+                )
+                books_changed(from_shelf)
+            stock_touched(from_hold + from_shelf)
+            loans = BorrowedBook.objects.bulk_create([
+                BorrowedBook(user=student, book=by_id[book_id], issue_date=issue_date,
+                             return_date=return_date, returned=False)
+                for book_id in from_hold + from_shelf
+            ])
+    except IntegrityError:
+        # a concurrent desk opened one of these loans after our check:
+        # fall back to one checkout per title so the rest still go through
+        loans = []
+        for book_id, result in pending.items():
+            result.pop('status', None)
+            result.pop('detail', None)
+            try:
+                loans.append(checkout(student, by_id[book_id], issue_date, return_date))
+            except CirculationError as exc:
+                result.update(status=exc.status_code, detail=exc.detail)
+
+    for loan in loans:
+        pending[loan.book_id].update(status=201, loan=loan)
+    return results, loans
+
+
+def return_many(student, items, returned_on=None):
+    """
+    Close the student's open loans for every scanned book in one
+    transaction. Copies go to the next hold where a queue exists, the rest
+    back on the shelf with one UPDATE. Returns (results, loans) as
+    checkout_many does, with `status` 200 for returned items.
+    """
+    returned_on = returned_on or timezone.now().date()
+    books = resolve_books(items)
+    results, pending = _batch_plan(items, books)
+    if not pending:
+        return results, []
+
+    with transaction.atomic():
+        loans = list(
+            BorrowedBook.objects.select_for_update(of=('self',))
+            .filter(user=student, returned=False, book_id__in=pending)
+            .select_related('book__category')
+        )
+        BorrowedBook.objects.filter(pk__in=[loan.pk for loan in loans]).update(
+            returned=True, actual_return_date=returned_on
+        )
+        returned = [loan.book_id for loan in loans]
+        stock_touched(returned)
+        queued = set(
+            BookHold.objects.filter(book_id__in=returned, status=BookHold.WAITING)
+            .values_list('book_id', flat=True).distinct()
+        )
+        for book_id in queued:
+            release_copy(book_id)
+        shelf = [book_id for book_id in returned if book_id not in queued]
+        if shelf:
+            Book.objects.filter(pk__in=shelf, available_copies__lt=F("total_copies")).update(
+                available_copies=F("available_copies") + 1
+            )
+            books_changed(shelf)
+
+    for loan in loans:
+        loan.user = student
+        loan.returned = True
+        loan.actual_return_date = returned_on
+        pending[loan.book_id].update(status=200, loan=loan)
+    for result in pending.values():
+        if 'status' not in result:
+            result.update(status=404, detail="This student has no open loan for this book.")
+    return results, loans
@@ -0,0 +1,238 @@
+"""
+Fine policy evaluation.
+
+A loan is charged per overdue day at the rate of its book category's
+FinePolicy (or the school default, or FINE_PER_DAY when none is set up),
+skipping SchoolHoliday days and the policy's grace days, capped at max_fine.
+
+`price_loans()` prices any number of loans in one pass: policies and holidays
+are loaded once, holidays become a prefix-sum array so each loan costs O(1),
+and results are cached per loan. The cache key carries the policy version,
+the book's category and the loan's own dates, so an entry goes stale only
+when the loan, its book's category or a policy / holiday changes.
+
+`FineSchedule.fine_expression()` writes the same rules as SQL (a Case per
+category policy, one overlap term per holiday range), so reports can sort,
+page and total fines in the database (BorrowedBook.objects.with_fines()).
+
+The policy version itself is cached; saving or deleting a policy or holiday
+drops it (connect_signals), and VERSION_TIMEOUT bounds how long a version
+read just before such a commit can linger.
+"""
+from collections import namedtuple
+from datetime import timedelta
+from decimal import Decimal
+from itertools import accumulate
+
+from django.core.cache import cache
+from django.db import models, transaction
+from django.db.models import Count, Max, Value
+from django.db.models.functions import Greatest, Least
+from django.db.models.lookups import LessThan
+from django.db.models.signals import post_delete, post_save
+from django.utils import timezone
+
+from .models import FINE_PER_DAY, DaysBetween, FinePolicy, SchoolHoliday
+
+CACHE_TIMEOUT = 60 * 60 * 24
+VERSION_TIMEOUT = 60
+VERSION_KEY = "library:fine:version"
+_CENT = Decimal('0.01')
+
+Policy = namedtuple('Policy', 'rate grace cap')
+DEFAULT_POLICY = Policy(Decimal(FINE_PER_DAY), 0, None)
+
+_schedule = None                            # (version, FineSchedule) for this process
+
+
+def policy_version():
+    """Changes whenever a policy or holiday is added, edited or removed."""
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        parts = []
+        for model in (FinePolicy, SchoolHoliday):
+            agg = model.objects.aggregate(changed=Max('updated_at'), rows=Count('id'))
+            stamp = agg['changed'].timestamp() if agg['changed'] else 0
+            parts.append(f"{agg['rows']}.{stamp:.6f}")
+        version = '-'.join(parts)
+        cache.set(VERSION_KEY, version, VERSION_TIMEOUT)
+    return version
+
+
+class FineSchedule:
+    """Policies by category plus the holiday calendar, ready for bulk pricing."""
+
+    def __init__(self, policies, holidays):
+        self.policies = {
+            p.category_id: Policy(p.rate_per_day, p.grace_days, p.max_fine) for p in policies
+        }
+        self.default = self.policies.get(None, DEFAULT_POLICY)
+        self.holidays = sorted((h.start_date, h.end_date) for h in holidays)
+
+    @classmethod
+    def load(cls):
+        return cls(FinePolicy.objects.all(), SchoolHoliday.objects.all())
+
+    def policy_for(self, category_id):
+        return self.policies.get(category_id, self.default)
+
+    def _holiday_prefix(self, first, last):
+        """prefix[i] = holidays in (first, first + i days]."""
+        marks = bytearray((last - first).days + 1)
+        for start, end in self.holidays:
+            lo = max(start, first + timedelta(days=1))
+            hi = min(end, last)
+            for offset in range((lo - first).days, (hi - first).days + 1):
+                marks[offset] = 1
+        return list(accumulate(marks))
+
+    def price(self, rows):
+        """
+        rows: (key, category_id, due_date, end_date) tuples.
+        Returns {key: (fine, rate_per_day)}.
+        """
+        rows = [r for r in rows if r[2] and r[3]]
+        late_rows = [r for r in rows if r[3] > r[2]]
+        if late_rows:
+            first = min(r[2] for r in late_rows)
+            prefix = self._holiday_prefix(first, max(r[3] for r in late_rows))
+
+        result = {}
+        for key, category_id, due, end in rows:
+            policy = self.policy_for(category_id)
+            late = (end - due).days
+            fine = Decimal(0)
+            if late > 0:
+                off_days = prefix[(end - first).days] - prefix[(due - first).days]
+                charged = late - off_days - policy.grace
+                if charged > 0:
+                    fine = charged * policy.rate
+                    if policy.cap is not None:
+                        fine = min(fine, policy.cap)
+            result[key] = (fine.quantize(_CENT), policy.rate)
+        return result
+
+    # ------------------------------------------------------------------
+    # SQL
+    # ------------------------------------------------------------------
+    def _merged_holidays(self):
+        merged = []
+        for start, end in self.holidays:
+            if merged and start <= merged[-1][1] + timedelta(days=1):
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+        return merged
+
+    def _off_days(self, due, end):
+        """Holiday days in (due, end], one overlap term per merged holiday range."""
+        terms = []
+        for start, stop in self._merged_holidays():
+            start = Value(start, output_field=models.DateField())
+            stop = Value(stop, output_field=models.DateField())
+            # (due, end] ∩ [start, stop]; a range starting after `due` counts its first day too
+            overlap = DaysBetween(Least(stop, end), Greatest(start, due)) + models.Case(
+                models.When(LessThan(due, start), then=Value(1)), default=Value(0),
+            )
+            terms.append(Greatest(overlap, Value(0)))
+        total = Value(0)
+        for term in terms:
+            total = total + term
+        return total
+
+    @staticmethod
+    def _policy_fine(policy, charged_days):
+        money = models.DecimalField(max_digits=12, decimal_places=2)
+        fine = Greatest(charged_days - Value(policy.grace), Value(0)) * Value(policy.rate, output_field=money)
+        if policy.cap is not None:
+            fine = Least(fine, Value(policy.cap, output_field=money))
+        return models.ExpressionWrapper(fine, output_field=money)
+
+    def _by_category(self, value):
+        return models.Case(
+            *(
+                models.When(book__category_id=category_id, then=value(policy))
+                for category_id, policy in self.policies.items() if category_id is not None
+            ),
+            default=value(self.default),
+            output_field=models.DecimalField(max_digits=12, decimal_places=2),
+        )
+
+    def fine_expression(self, due, end, days):
+        """
+        SQL for a loan's fine, by the same rules as price(). `due` / `end` are
+        the loan's due date and the day charging stops, `days` the overdue days.
+        """
+        charged = days - self._off_days(due, end)
+        return self._by_category(lambda policy: self._policy_fine(policy, charged))
+
+    def rate_expression(self):
+        return self._by_category(
+            lambda policy: Value(policy.rate, output_field=models.DecimalField(max_digits=12, decimal_places=2))
+        )
+
+
+def current_schedule():
+    """The FineSchedule for the current policy version, reloaded only when it changes."""
+    global _schedule
+    version = policy_version()
+    if _schedule is None or _schedule[0] != version:
+        _schedule = (version, FineSchedule.load())
+    return _schedule
+
+
+def _cache_key(version, loan_id, category_id, due, end):
+    return f"library:fine:{version}:{loan_id}:{category_id}:{due}:{end}"
+
+
+def price_loans(loans, today=None):
+    """
+    Set `_fine` / `_fine_per_day` on each BorrowedBook and return {pk: fine}.
+    Loans should come with select_related('book') so the category is at hand.
+    """
+    loans = list(loans)
+    if not loans:
+        return {}
+    today = today or timezone.now().date()
+    version, schedule = current_schedule()
+
+    rows = {}
+    for loan in loans:
+        due = loan._parse_date(loan.return_date)
+        end = loan._parse_date(loan.actual_return_date) if loan.returned and loan.actual_return_date else today
+        rows[id(loan)] = (loan, due, end)
+
+    keys = {
+        _cache_key(version, loan.pk, loan.book.category_id, due, end): id(loan)
+        for loan, due, end in rows.values() if loan.pk
+    }
+    priced = {keys[k]: v for k, v in cache.get_many(keys.keys()).items()}
+
+    missing = [
+        (ref, loan.book.category_id, due, end)
+        for ref, (loan, due, end) in rows.items() if ref not in priced
+    ]
+    fresh = schedule.price(missing)
+    priced.update(fresh)
+    cache.set_many({k: fresh[ref] for k, ref in keys.items() if ref in fresh}, CACHE_TIMEOUT)
+
+    fines = {}
+    for ref, (loan, due, end) in rows.items():
+        loan._fine, loan._fine_per_day = priced.get(
+            ref, (Decimal(0), schedule.policy_for(loan.book.category_id).rate)
+        )
+        fines[loan.pk] = loan._fine
+    return fines
+
+
+# ------------------------------------------------------------------
+# SIGNALS
+# ------------------------------------------------------------------
+def _policies_changed(sender, **kwargs):
+    transaction.on_commit(lambda: cache.delete(VERSION_KEY))
+
+
+def connect_signals():
+    for model in (FinePolicy, SchoolHoliday):
+        post_save.connect(_policies_changed, sender=model, dispatch_uid=f'library:fines:{model.__name__}:save')
+        post_delete.connect(_policies_changed, sender=model, dispatch_uid=f'library:fines:{model.__name__}:delete')
@@ -0,0 +1,373 @@
+"""
+Bulk catalog import from CSV or MARC (ISO 2709).
+
+Records are streamed from the file and written in chunks of `batch_size`,
+one transaction per chunk, so memory stays bounded whatever the file size:
+
+- ISBNs are normalised to ISBN-13 (ISBN-10s are converted) and used as the
+  dedupe key, against the existing catalog and within the file;
+- a duplicate adds its copies to the existing Book (one UPDATE ... F() per
+  distinct copy count in the chunk);
+- unknown categories are created on the fly;
+- new books go in with bulk_create (search_document filled in here, since
+  bulk_create bypasses Book.save).
+
+CSV columns (header names are case-insensitive): title, isbn, author,
+publisher, edition, price, language, copies (or total_copies), category,
+description.
+"""
+import codecs
+import csv
+import re
+from dataclasses import dataclass, field
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.db.models import F, Q
+
+from .catalog import books_changed, changed
+from .circulation import expire_holds
+from .inventory import stock_touched
+from .models import Book, CatalogChange, Category, build_search_document
+from .search import index_books
+
+BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 100
+_PRICE_RE = re.compile(r"\d+(?:\.\d+)?")
+_CENT = Decimal('0.01')
+MAX_PRICE = Decimal('99999999.99')          # Book.price: max_digits=10, decimal_places=2
+
+
+class ImportFormatError(Exception):
+    """
+    The file could not be read in the requested format. Raised part-way
+    through an import, `result` is the ImportResult so far: its
+    committed_rows records were imported before the error.
+    """
+    result = None
+
+
+# ------------------------------------------------------------------
+# ISBN
+# ------------------------------------------------------------------
+def _isbn13_check(digits12):
+    total = sum(int(d) * (3 if i % 2 else 1) for i, d in enumerate(digits12))
+    return str((10 - total % 10) % 10)
+
+
+def normalize_isbn(value):
+    """Valid ISBN-10 / ISBN-13 -> ISBN-13 digits; anything else -> None."""
+    raw = ''.join(c for c in str(value or '') if c.isalnum()).upper()
+    if len(raw) == 10 and raw[:9].isdigit() and (raw[9].isdigit() or raw[9] == 'X'):
+        check = sum((10 - i) * int(d) for i, d in enumerate(raw[:9]))
+        check += 10 if raw[9] == 'X' else int(raw[9])
+        if check % 11:
+            return None
+        core = '978' + raw[:9]
+        return core + _isbn13_check(core)
+    if len(raw) == 13 and raw.isdigit() and raw[:3] in ('978', '979'):
+        return raw if _isbn13_check(raw[:12]) == raw[12] else None
+    return None
+
+
+# ------------------------------------------------------------------
+# READERS  – each yields (line_no, {field: value})
+# ------------------------------------------------------------------
+CSV_ALIASES = {'total_copies': 'copies', 'quantity': 'copies', 'isbn13': 'isbn', 'isbn10': 'isbn'}
+
+
+def read_csv(stream):
+    if isinstance(stream.read(0), bytes):  # uploaded files are binary
+        stream = codecs.iterdecode(stream, 'utf-8-sig')
+    reader = csv.DictReader(stream)
+    try:
+        if not reader.fieldnames:
+            raise ImportFormatError("CSV file has no header row.")
+        for row in reader:
+            record = {}
+            for key, value in row.items():
+                if key is None:
+                    continue
+                key = key.strip().lower()
+                record[CSV_ALIASES.get(key, key)] = (value or '').strip()
+            yield reader.line_num, record
+    except UnicodeDecodeError as exc:
+        raise ImportFormatError(f"Line {reader.line_num + 1}: the CSV file is not UTF-8 ({exc.reason}).")
+    except csv.Error as exc:
+        raise ImportFormatError(f"Line {reader.line_num}: {exc}")
+
+
+FIELD_TERMINATOR = b'\x1e'
+SUBFIELD_DELIMITER = b'\x1f'
+RECORD_TERMINATOR = b'\x1d'
+
+# MARC 21 tag / subfield -> Book field (first match wins)
+MARC_FIELDS = {
+    'isbn': [('020', 'a')],
+    'title': [('245', 'a')],
+    'subtitle': [('245', 'b')],
+    'author': [('100', 'a'), ('110', 'a'), ('700', 'a')],
+    'edition': [('250', 'a')],
+    'publisher': [('264', 'b'), ('260', 'b')],
+    'description': [('520', 'a')],
+    'category': [('650', 'a'), ('082', 'a')],
+    'language': [('041', 'a')],
+    'price': [('020', 'c'), ('365', 'b')],
+}
+
+
+def _marc_fields(record):
+    """{tag: [{code: value}]} for the data fields of one ISO 2709 record."""
+    base = int(record[12:17])
+    directory = record[24:base - 1]
+    fields = {}
+    for i in range(0, len(directory) - len(directory) % 12, 12):
+        tag = directory[i:i + 3].decode('ascii', 'replace')
+        length = int(directory[i + 3:i + 7])
+        start = int(directory[i + 7:i + 12])
+        data = record[base + start:base + start + length].rstrip(FIELD_TERMINATOR)
+        if tag < '010':
+            continue                        # control fields carry no subfields
+        subfields = {}
+        for chunk in data.split(SUBFIELD_DELIMITER)[1:]:
+            if chunk:
+                code = chunk[:1].decode('ascii', 'replace')
+                subfields.setdefault(code, chunk[1:].decode('utf-8', 'replace').strip())
+        fields.setdefault(tag, []).append(subfields)
+    return fields
+
+
+def read_marc(stream):
+    number = 0
+    while True:
+        leader = stream.read(5)
+        if not leader or not leader.strip(RECORD_TERMINATOR + b'\r\n '):
+            return
+        number += 1
+        try:
+            length = int(leader)
+            if length < 24:                 # shorter than the leader itself
+                raise ValueError(length)
+            record = leader + stream.read(length - 5)
+            fields = _marc_fields(record)
+        except (ValueError, IndexError):
+            raise ImportFormatError(f"Record {number} is not a valid MARC record.")
+
+        values = {}
+        for name, sources in MARC_FIELDS.items():
+            for tag, code in sources:
+                found = next((f[code] for f in fields.get(tag, []) if f.get(code)), None)
+                if found:
+                    values[name] = found
+                    break
+        title = values.pop('title', '').rstrip(' /:;,.')
+        subtitle = values.pop('subtitle', '').rstrip(' /:;,.')
+        values['title'] = f"{title}: {subtitle}" if subtitle else title
+        for name in ('author', 'publisher', 'category'):
+            if name in values:
+                values[name] = values[name].rstrip(' ,.:;')
+        if 'isbn' in values:
+            values['isbn'] = values['isbn'].split()[0]     # "0553380168 (pbk.)"
+        yield number, values
+
+
+READERS = {'csv': read_csv, 'marc': read_marc}
+
+
+def guess_format(filename):
+    name = (filename or '').lower()
+    if name.endswith(('.mrc', '.marc', '.dat')):
+        return 'marc'
+    return 'csv'
+
+
+# ------------------------------------------------------------------
+# IMPORT
+# ------------------------------------------------------------------
+@dataclass
+class ImportResult:
+    rows: int = 0
+    created: int = 0
+    merged: int = 0
+    categories_created: int = 0
+    copies_added: int = 0
+    committed_rows: int = 0                 # records read up to the last committed chunk
+    error_count: int = 0
+    errors: list = field(default_factory=list)
+
+    def error(self, line, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line, 'error': message})
+
+    def as_dict(self):
+        return {
+            'rows': self.rows,
+            'created': self.created,
+            'merged': self.merged,
+            'categories_created': self.categories_created,
+            'copies_added': self.copies_added,
+            'committed_rows': self.committed_rows,
+            'error_count': self.error_count,
+            'errors': self.errors,
+        }
+
+
+def _clean(line, record, result):
+    """Validated book fields for one record, or None (error recorded)."""
+    isbn = normalize_isbn(record.get('isbn'))
+    if not isbn:
+        result.error(line, f"Missing or invalid ISBN: {record.get('isbn')!r}")
+        return None
+    title = (record.get('title') or '')[:200]
+    if not title:
+        result.error(line, "Missing title.")
+        return None
+    try:
+        copies = int(record.get('copies') or 1)
+    except ValueError:
+        result.error(line, f"copies must be a whole number: {record.get('copies')!r}")
+        return None
+    price = _PRICE_RE.search((record.get('price') or '').replace(',', ''))
+    try:
+        price = Decimal(price.group()).quantize(_CENT) if price else Decimal(0)    # "$12.99", "USD 12.00"
+    except InvalidOperation:
+        price = Decimal(0)
+    if price > MAX_PRICE:
+        result.error(line, f"price is too large: {record.get('price')!r}")
+        return None
+    if copies < 1:
+        result.error(line, "copies must be at least 1.")
+        return None
+    return {
+        'isbn': isbn,
+        'title': title,
+        'author': (record.get('author') or 'Unknown Author')[:255],
+        'publisher': (record.get('publisher') or None) and record['publisher'][:100],
+        'edition': (record.get('edition') or None) and record['edition'][:50],
+        'language': (record.get('language') or 'English')[:50],
+        'description': record.get('description') or '',
+        'price': price,
+        'copies': copies,
+        'category': (record.get('category') or '').strip()[:100],
+    }
+
+
+class CatalogImporter:
+    def __init__(self, batch_size=BATCH_SIZE, dry_run=False):
+        self.batch_size = max(1, batch_size)
+        self.dry_run = dry_run
+        self.result = ImportResult()
+        # normalised ISBN -> book id, for the whole catalog (ints only)
+        self.isbn_index = {}
+        for book_id, isbn in Book.objects.values_list('id', 'isbn').iterator():
+            key = normalize_isbn(isbn) or isbn
+            self.isbn_index.setdefault(key, book_id)
+        self.categories = {name.lower(): (pk, name) for pk, name in Category.objects.values_list('id', 'name')}
+
+    def run(self, records):
+        batch = []
+        try:
+            for line, record in records:
+                self.result.rows += 1
+                cleaned = _clean(line, record, self.result)
+                if cleaned:
+                    batch.append(cleaned)
+                if len(batch) >= self.batch_size:
+                    self._write(batch)
+                    batch = []
+        except ImportFormatError as exc:
+            # earlier chunks stay committed (result.committed_rows); the pending one is dropped
+            exc.result = self.result
+            raise
+        if batch:
+            self._write(batch)
+        return self.result
+
+    def _load_categories(self, match):
+        for pk, name in Category.objects.filter(match).order_by('pk').values_list('id', 'name'):
+            self.categories.setdefault(name.lower(), (pk, name))
+
+    def _category_ids(self, names):
+        # one category per name ignoring case, spelled as first seen
+        missing = {}
+        for name in names:
+            if name and name.lower() not in self.categories:
+                missing.setdefault(name.lower(), name)
+        if missing and self.dry_run:
+            for key, name in missing.items():
+                self.categories[key] = (None, name)     # planned: counted once per run
+            self.result.categories_created += len(missing)
+        elif missing:
+            match = Q()
+            for name in missing.values():
+                match |= Q(name__iexact=name)
+            self._load_categories(match)            # created since the run started, in any case
+            new = [name for key, name in missing.items() if key not in self.categories]
+            Category.objects.bulk_create([Category(name=n) for n in new], ignore_conflicts=True)
+            self._load_categories(match)
+            changed(CatalogChange.CATEGORY, [self.categories[key][0] for key in missing])
+            self.result.categories_created += len(new)
+        return {n.lower(): self.categories.get(n.lower()) for n in names if n}
+
+    def _write(self, batch):
+        # merge duplicates inside the chunk first
+        merged = {}
+        for row in batch:
+            if row['isbn'] in merged:
+                merged[row['isbn']]['copies'] += row['copies']
+            else:
+                merged[row['isbn']] = row
+
+        existing = {isbn: row for isbn, row in merged.items() if isbn in self.isbn_index}
+        new = [row for isbn, row in merged.items() if isbn not in self.isbn_index]
+        self.result.merged += len(existing)
+        self.result.created += len(new)
+        self.result.copies_added += sum(row['copies'] for row in merged.values())
+        if self.dry_run:
+            self._category_ids({row['category'] for row in new})
+            for row in new:
+                self.isbn_index[row['isbn']] = None
+            return
+
+        with transaction.atomic():
+            categories = self._category_ids({row['category'] for row in new})
+            books = []
+            for row in new:
+                category_id, category_name = categories.get(row['category'].lower()) or (None, None)
+                book = Book(
+                    title=row['title'], isbn=row['isbn'], author=row['author'],
+                    publisher=row['publisher'], edition=row['edition'],
+                    language=row['language'], description=row['description'],
+                    price=row['price'], category_id=category_id,
+                    total_copies=row['copies'], available_copies=row['copies'],
+                )
+                book.search_document = build_search_document(book, category_name)
+                books.append(book)
+            Book.objects.bulk_create(books, batch_size=self.batch_size)
+            for book in books:
+                self.isbn_index[book.isbn] = book.pk
+
+            # one UPDATE per distinct copy count (almost always just "+1")
+            by_copies = {}
+            for isbn, row in existing.items():
+                by_copies.setdefault(row['copies'], []).append(self.isbn_index[isbn])
+            for copies, ids in by_copies.items():
+                Book.objects.filter(pk__in=ids).update(
+                    total_copies=F('total_copies') + copies,
+                    available_copies=F('available_copies') + copies,
+                )
+            if existing:
+                stock_touched([self.isbn_index[isbn] for isbn in existing])
+                # new copies of a queued title go to its waiting holds first
+                expire_holds(book_ids=[self.isbn_index[isbn] for isbn in existing])
+            books_changed([book.pk for book in books] + [self.isbn_index[isbn] for isbn in existing])
+        self.result.committed_rows = self.result.rows
+        index_books(books)
+
+
+def import_catalog(stream, fmt='csv', batch_size=BATCH_SIZE, dry_run=False):
+    """Import a CSV / MARC stream into the catalog. Returns an ImportResult."""
+    if fmt not in READERS:
+        raise ImportFormatError(f"Unknown format {fmt!r}; expected one of {', '.join(READERS)}.")
+    return CatalogImporter(batch_size=batch_size, dry_run=dry_run).run(READERS[fmt](stream))
@@ -0,0 +1,132 @@
+"""
+Reconciliation of the denormalised Book.available_copies counter.
+
+The expected value is
+
+    max(total_copies - open loans - ready holds, 0)
+
+(a ready hold keeps a copy off the shelf, see circulation.py). It is
+computed for the whole catalog, or a set of books, in one query, and
+only books that drifted come back. The two counts are correlated COUNT
+subqueries rather than one GROUP BY over a join: joining a book to both
+its loans and its holds multiplies the rows, and COUNT(DISTINCT ...)
+over that product costs more than two index lookups per book.
+
+Repair happens in a transaction that first locks the drifted Book rows.
+Checkouts and returns update the same row, so once the locks are held
+every in-flight one has committed. The counts are then read again and
+written with one bulk update. Books that gained copies go through
+expire_holds() so their waiting holds are served first.
+
+Incremental mode only re-checks books queued in BookStockTouch: by the
+signals below on saves of a Book (e.g. total_copies edited through the
+API) and saves / deletes of its loans and holds, which covers admin
+edits and deleted history, and by stock_touched() from the circulation
+and import paths that write with update() / bulk_create() and so fire
+no signals.
+"""
+from dataclasses import dataclass, field
+
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.db.models.signals import post_delete, post_save
+
+from .catalog import books_changed
+from .models import Book, BookHold, BookStockTouch, BorrowedBook
+
+REPORT_FIELDS = ('id', 'title', 'total_copies', 'available_copies', 'open_loans', 'ready_holds', 'expected')
+
+
+def _count(queryset):
+    return Coalesce(
+        Subquery(queryset.order_by().values('book').annotate(n=Count('pk')).values('n')), 0
+    )
+
+
+def with_expected_stock(queryset=None):
+    """Annotate open_loans, ready_holds and expected (available copies) on books."""
+    queryset = Book.objects.all() if queryset is None else queryset
+    return queryset.annotate(
+        open_loans=_count(BorrowedBook.objects.filter(book=OuterRef('pk'), returned=False)),
+        ready_holds=_count(BookHold.objects.filter(book=OuterRef('pk'), status=BookHold.READY)),
+    ).annotate(
+        expected=Greatest(F('total_copies') - F('open_loans') - F('ready_holds'), Value(0)),
+    )
+
+
+def drifted(book_ids=None):
+    """Books whose available_copies differs from the expected value, as dicts."""
+    queryset = Book.objects.all() if book_ids is None else Book.objects.filter(pk__in=book_ids)
+    return list(
+        with_expected_stock(queryset.order_by('pk'))
+        .exclude(available_copies=F('expected'))
+        .values(*REPORT_FIELDS)
+    )
+
+
+@dataclass
+class ReconcileReport:
+    checked: int = 0
+    repaired: int = 0
+    drift: list = field(default_factory=list)
+
+
+def repair(book_ids):
+    """Re-check `book_ids` under row locks and fix their counters. Returns the number fixed."""
+    from .circulation import expire_holds
+
+    with transaction.atomic():
+        list(Book.objects.select_for_update().filter(pk__in=book_ids).order_by('pk').values_list('pk'))
+        rows = drifted(book_ids)
+        books = [Book(pk=row['id'], available_copies=row['expected']) for row in rows]
+        Book.objects.bulk_update(books, ['available_copies'], batch_size=500)
+        books_changed([book.pk for book in books])
+        gained = [row['id'] for row in rows if row['expected'] > row['available_copies']]
+        if gained:
+            expire_holds(book_ids=gained)   # new shelf copies go to the hold queue first
+    return len(books)
+
+
+def reconcile(incremental=False, dry_run=False):
+    report = ReconcileReport()
+    last_touch = BookStockTouch.objects.order_by('-pk').values_list('pk', flat=True).first()
+    touches = BookStockTouch.objects.filter(pk__lte=last_touch or 0)
+    if incremental:
+        book_ids = sorted(set(touches.values_list('book_id', flat=True)))
+        report.checked = Book.objects.filter(pk__in=book_ids).count()
+    else:
+        book_ids = None
+        report.checked = Book.objects.count()
+
+    if book_ids is None or book_ids:
+        report.drift = drifted(book_ids)
+    if report.drift and not dry_run:
+        report.repaired = repair([row['id'] for row in report.drift])
+    if not dry_run:
+        touches.delete()                    # touches queued during this run stay for the next
+    return report
+
+
+# ------------------------------------------------------------------
+# TOUCH QUEUE
+# ------------------------------------------------------------------
+def stock_touched(book_ids):
+    """Queue books for the next incremental run; for writes that bypass model signals."""
+    BookStockTouch.objects.bulk_create([BookStockTouch(book_id=pk) for pk in sorted(set(book_ids))])
+
+
+def _book_saved(sender, instance, **kwargs):
+    BookStockTouch.objects.create(book_id=instance.pk)
+
+
+def _stock_row_changed(sender, instance, **kwargs):
+    BookStockTouch.objects.create(book_id=instance.book_id)
+
+
+def connect_signals():
+    post_save.connect(_book_saved, sender=Book, dispatch_uid='library:stock:book')
+    for model in (BorrowedBook, BookHold):
+        uid = f'library:stock:{model._meta.model_name}'
+        post_save.connect(_stock_row_changed, sender=model, dispatch_uid=uid)
+        post_delete.connect(_stock_row_changed, sender=model, dispatch_uid=uid)
@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from library.catalog import CHANGE_RETENTION_DAYS, build_snapshot, prune
+
+
+class Command(BaseCommand):
+    help = (
+        "Build the kiosk catalog snapshot for the current catalog version from the "
+        "previous snapshot and the changes since, then drop old snapshots and change-log "
+        "rows. --full rebuilds from the tables."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Rebuild from the tables.')
+        parser.add_argument('--retention-days', type=int, default=CHANGE_RETENTION_DAYS,
+                            help='Keep change-log rows this long (how far back deltas reach).')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        snapshot = build_snapshot(full=options['full'])
+        snapshots, changes = prune(retention_days=max(0, options['retention_days']))
+        self.stdout.write(self.style.SUCCESS(
+            f"Catalog v{snapshot.version}: {snapshot.books} books, {snapshot.categories} categories "
+            f"({snapshot.file.size} bytes). Dropped {snapshots} old snapshots, {changes} log rows "
+            f"in {time.monotonic() - started:.1f}s."
+        ))
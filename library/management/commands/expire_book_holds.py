@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from library.circulation import expire_holds
+
+
+class Command(BaseCommand):
+    help = (
+        "Expire ready book holds that were not picked up in time, passing each copy "
+        "to the next student in the queue (or back to the shelf). Run it periodically."
+    )
+
+    def handle(self, *args, **options):
+        expired = expire_holds()
+        self.stdout.write(self.style.SUCCESS(f"Expired {expired} holds."))
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from library.importer import BATCH_SIZE, ImportFormatError, guess_format, import_catalog
+
+
+class Command(BaseCommand):
+    help = (
+        "Import books from a CSV or MARC (ISO 2709) file. ISBNs are normalised to "
+        "ISBN-13; titles already in the catalog get the new copies added to them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or MARC file to import.')
+        parser.add_argument('--format', choices=['csv', 'marc'], help='Defaults to the file extension.')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='Records per transaction.')
+        parser.add_argument('--dry-run', action='store_true', help='Validate and count, write nothing.')
+
+    def handle(self, *args, **options):
+        fmt = options['format'] or guess_format(options['path'])
+        try:
+            with open(options['path'], 'rb') as stream:
+                result = import_catalog(
+                    stream, fmt, batch_size=options['batch_size'], dry_run=options['dry_run']
+                )
+        except OSError as exc:
+            raise CommandError(f"Cannot read {options['path']}: {exc}")
+        except ImportFormatError as exc:
+            if exc.result is not None and exc.result.committed_rows:
+                raise CommandError(
+                    f"{exc} The first {exc.result.committed_rows} records were already imported "
+                    f"({exc.result.created} new titles, {exc.result.merged} merged)."
+                )
+            raise CommandError(str(exc))
+
+        for error in result.errors:
+            self.stderr.write(f"line {error['line']}: {error['error']}")
+        if result.error_count > len(result.errors):
+            self.stderr.write(f"... and {result.error_count - len(result.errors)} more errors")
+
+        prefix = "[dry run] " if options['dry_run'] else ""
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix}Read {result.rows} records: {result.created} new titles, "
+            f"{result.merged} merged into existing titles, {result.copies_added} copies, "
+            f"{result.categories_created} new categories, {result.error_count} rejected."
+        ))
@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from library.inventory import reconcile
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute Book.available_copies from total copies, open loans and ready holds, "
+        "report drift and repair it. --incremental only re-checks books whose stock was "
+        "touched since the last run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--incremental', action='store_true',
+                            help='Only books touched since the last run.')
+        parser.add_argument('--dry-run', action='store_true', help='Report drift without repairing.')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        report = reconcile(incremental=options['incremental'], dry_run=options['dry_run'])
+        for row in report.drift:
+            self.stdout.write(
+                f"  #{row['id']} {row['title'][:40]}: available {row['available_copies']}, "
+                f"expected {row['expected']} (total {row['total_copies']}, "
+                f"{row['open_loans']} on loan, {row['ready_holds']} held)"
+            )
+        prefix = "[dry run] " if options['dry_run'] else ""
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix}Checked {report.checked} books in {time.monotonic() - started:.2f}s: "
+            f"{len(report.drift)} drifted, {report.repaired} repaired."
+        ))
@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from library.stats import refresh_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Refresh the monthly circulation rollups behind the library statistics "
+        "endpoints. Only months touched since the last run are re-aggregated; "
+        "--full rebuilds all of them (after loans were deleted or back-dated)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Rebuild every month.')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        months, rows = refresh_stats(full=options['full'])
+        scope = "all months" if months is None else f"{len(months)} month(s)"
+        self.stdout.write(self.style.SUCCESS(
+            f"Refreshed {scope}, wrote {rows} rollup rows in {time.monotonic() - started:.1f}s."
+        ))
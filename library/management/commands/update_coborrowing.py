@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from library.recommendations import BATCH_SIZE, update_coborrowing
+
+
+class Command(BaseCommand):
+    help = (
+        "Fold new loans into the \"also borrowed\" co-occurrence matrix. Run it "
+        "periodically; --full rebuilds from the whole loan history (after loans "
+        "were deleted or edited)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Rebuild from scratch.')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        loans, rows = update_coborrowing(full=options['full'], batch_size=max(1, options['batch_size']))
+        self.stdout.write(self.style.SUCCESS(
+            f"Folded in {loans} loans, rewrote {rows} book rows in {time.monotonic() - started:.1f}s."
+        ))
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:30
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def check_duplicate_open_loans(apps, schema_editor):
+    """
+    The old borrow view allowed several open loans of one title per student,
+    which the constraint below rejects. Stop with the conflicting loan ids so
+    staff can close the wrong ones; no loan or stock is changed here.
+    """
+    BorrowedBook = apps.get_model('library', 'BorrowedBook')
+
+    duplicated = (
+        BorrowedBook.objects.filter(returned=False)
+        .values('user_id', 'book_id')
+        .annotate(n=Count('id'))
+        .filter(n__gt=1)
+        .order_by('user_id', 'book_id')
+    )
+    conflicts = []
+    for pair in duplicated:
+        loans = BorrowedBook.objects.filter(
+            returned=False, user_id=pair['user_id'], book_id=pair['book_id']
+        ).order_by('id').values_list('id', flat=True)
+        conflicts.append(
+            f"  student profile {pair['user_id']}, book {pair['book_id']}: "
+            f"open loans {', '.join(map(str, loans))}"
+        )
+    if conflicts:
+        raise RuntimeError(
+            "Cannot add the one-open-loan-per-title constraint: these students have more "
+            "than one open loan of the same book. Mark the extra loans returned (with their "
+            "real return dates) and fix the books' available_copies, then migrate again.\n"
+            + "\n".join(conflicts)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0002_initial'),
+        ('portalaccount', '0003_user_user_type_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_duplicate_open_loans, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='borrowedbook',
+            constraint=models.UniqueConstraint(condition=models.Q(('returned', False)), fields=('user', 'book'), name='borrowedbook_one_open_loan'),
+        ),
+    ]
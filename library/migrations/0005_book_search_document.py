@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:43
+
+from django.db import migrations, models
+
+
+def fill_search_documents(apps, schema_editor):
+    Book = apps.get_model('library', 'Book')
+    books = list(Book.objects.select_related('category'))
+    for book in books:
+        parts = (
+            book.title, book.author, book.publisher, book.isbn,
+            book.category.name if book.category_id else None, book.description,
+        )
+        book.search_document = "\n".join(p for p in parts if p)
+    Book.objects.bulk_update(books, ['search_document'], batch_size=500)
+
+
+def create_gin_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS library_book_search_gin ON library_book "
+        "USING gin (to_tsvector('english'::regconfig, search_document))"
+    )
+
+
+def drop_gin_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS library_book_search_gin")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0004_fine_policies'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='search_document',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.RunPython(fill_search_documents, migrations.RunPython.noop),
+        migrations.RunPython(create_gin_index, drop_gin_index),
+    ]
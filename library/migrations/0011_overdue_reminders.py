@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0010_circulation_stats'),
+        ('portalaccount', '0004_media_storage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OverdueReminder',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('reminder_date', models.DateField()),
+                ('email', models.EmailField(max_length=254)),
+                ('subject', models.CharField(max_length=200)),
+                ('body', models.TextField()),
+                ('loans', models.PositiveIntegerField(default=0)),
+                ('total_fine', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('sent', 'Sent'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='overdue_reminders', to='portalaccount.studentprofile')),
+            ],
+            options={
+                'ordering': ['-reminder_date', 'id'],
+                'indexes': [models.Index(fields=['status', 'id'], name='overdue_reminder_status_idx')],
+                'constraints': [models.UniqueConstraint(fields=('student', 'reminder_date'), name='overdue_reminder_once_per_day')],
+            },
+        ),
+    ]
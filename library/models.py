@@ -1,7 +1,11 @@
+from django.conf import settings
 from django.db import models
+from django.db.models.functions import Coalesce, Greatest
 from django.utils import timezone
 from portalaccount.models import StudentProfile
-from datetime import datetime, date
+from mediastore.storage import media_storage
+from datetime import datetime, date, timedelta
+from decimal import Decimal
 
 
 class Category(models.Model):
@@ -11,11 +15,34 @@ class Category(models.Model):
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        stored = None
+        if not self._state.adding:
+            stored = Category.objects.filter(pk=self.pk).values_list('name', flat=True).first()
+        super().save(*args, **kwargs)
+        if stored is None or stored == self.name:
+            return
+        # renamed: the category name is part of every book's search document
+        books = list(self.books.all())
+        for book in books:
+            book.search_document = build_search_document(book, self.name)
+        Book.objects.bulk_update(books, ['search_document'], batch_size=500)
+        from .search import index_books
+        index_books(books)
+
+
+def build_search_document(book, category_name=None):
+    """The text the catalog search indexes for one book."""
+    if category_name is None and book.category_id:
+        category_name = book.category.name
+    parts = (book.title, book.author, book.publisher, book.isbn, category_name, book.description)
+    return "\n".join(p for p in parts if p)
+
 
 class Book(models.Model):
     title = models.CharField(max_length=200)
     description = models.TextField(blank=True)
-    file = models.FileField(upload_to='books/', blank=True, null=True)
+    file = models.FileField(upload_to='books/', storage=media_storage, blank=True, null=True)
     uploaded_at = models.DateTimeField(auto_now_add=True)
     isbn = models.CharField("ISBN", max_length=20, unique=True, default="UNKNOWN-ISBN")
 
@@ -30,18 +57,164 @@ class Book(models.Model):
     total_copies = models.PositiveIntegerField(default=1)
     available_copies = models.PositiveIntegerField(default=1)
 
+    # denormalised text for catalog search (see library.search)
+    search_document = models.TextField(blank=True, default='', editable=False)
+
     def __str__(self):
         return f"{self.title} by {self.author}"
 
+    def save(self, *args, **kwargs):
+        self.search_document = build_search_document(self)
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'search_document'}
+        super().save(*args, **kwargs)
+        from .search import index_books
+        index_books([self])
+
+    def delete(self, *args, **kwargs):
+        pk = self.pk
+        result = super().delete(*args, **kwargs)
+        from .search import unindex_books
+        unindex_books([pk])
+        return result
+
     def reduce_available_copy(self):
-        if self.available_copies > 0:
-            self.available_copies -= 1
-            self.save()
+        from .circulation import take_copy
+
+        if take_copy(self.pk):
+            self.refresh_from_db(fields=["available_copies"])
 
     def increase_available_copy(self):
-        if self.available_copies < self.total_copies:
-            self.available_copies += 1
-            self.save()
+        from .circulation import put_back_copy
+
+        if put_back_copy(self.pk):
+            self.refresh_from_db(fields=["available_copies"])
+
+
+FINE_PER_DAY = 100      # used when no FinePolicy applies
+
+
+class FinePolicy(models.Model):
+    """
+    How overdue loans are charged. A policy with no category is the school
+    default; a category policy overrides it for that category's books.
+    """
+    category = models.OneToOneField(
+        Category, on_delete=models.CASCADE, null=True, blank=True, related_name='fine_policy')
+    rate_per_day = models.DecimalField(max_digits=10, decimal_places=2, default=FINE_PER_DAY)
+    grace_days = models.PositiveIntegerField(default=0)
+    max_fine = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            # only one school-wide default
+            models.UniqueConstraint(
+                fields=['category'], condition=models.Q(category__isnull=True),
+                name='finepolicy_one_default',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.category or 'Default'}: {self.rate_per_day}/day"
+
+
+class SchoolHoliday(models.Model):
+    """Days (inclusive range) on which overdue loans are not charged."""
+    name = models.CharField(max_length=100)
+    start_date = models.DateField()
+    end_date = models.DateField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['start_date']
+
+    def __str__(self):
+        return f"{self.name} ({self.start_date} – {self.end_date})"
+
+
+class DaysBetween(models.Func):
+    """Whole days from `start` to `end` (both DateFields), as an integer."""
+    output_field = models.IntegerField()
+
+    def __init__(self, end, start, **extra):
+        super().__init__(end, start, **extra)
+
+    def as_sql(self, compiler, connection, **extra_context):
+        # PostgreSQL: date - date is already an integer number of days
+        return super().as_sql(compiler, connection, template="(%(expressions)s)", arg_joiner=" - ", **extra_context)
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return super().as_sql(
+            compiler, connection,
+            template="CAST(julianday(%(expressions)s) AS INTEGER)", arg_joiner=") - julianday(",
+            **extra_context,
+        )
+
+    def as_mysql(self, compiler, connection, **extra_context):
+        return super().as_sql(compiler, connection, function="DATEDIFF", **extra_context)
+
+
+class BorrowedBookQuerySet(models.QuerySet):
+    def with_overdue(self, today=None):
+        """
+        Annotate overdue_days_sql and is_overdue_sql, computed in the database
+        with the same rules as the Python properties, so overdue loans can be
+        filtered and sorted in SQL. Fines are priced by library.fines.
+        """
+        days = DaysBetween(self._charge_end(today), models.F("return_date"))
+        return self.annotate(
+            overdue_days_sql=Greatest(days, models.Value(0)),
+        ).annotate(
+            is_overdue_sql=models.ExpressionWrapper(
+                models.Q(overdue_days_sql__gt=0), output_field=models.BooleanField()
+            ),
+        )
+
+    @staticmethod
+    def _charge_end(today=None):
+        # the day a loan stops accruing: its return, or today while it is out
+        return models.Case(
+            models.When(returned=True, actual_return_date__isnull=False, then=models.F("actual_return_date")),
+            default=models.Value(today or timezone.now().date(), output_field=models.DateField()),
+            output_field=models.DateField(),
+        )
+
+    def with_fines(self, today=None):
+        """
+        with_overdue() plus fine_sql and fine_per_day_sql, priced in the database
+        by the current fine policies and holidays (library.fines), so fines can
+        be sorted and totalled in SQL.
+        """
+        from .fines import current_schedule
+
+        today = today or timezone.now().date()
+        _, schedule = current_schedule()
+        return self.with_overdue(today).annotate(
+            fine_sql=schedule.fine_expression(
+                models.F("return_date"), self._charge_end(today), models.F("overdue_days_sql")
+            ),
+            fine_per_day_sql=schedule.rate_expression(),
+        )
+
+    def overdue(self, today=None):
+        """Loans that are overdue right now (open and past their return date)."""
+        today = today or timezone.now().date()
+        return self.filter(returned=False, return_date__lt=today).with_overdue(today)
+
+    def settled_through(self, after=0):
+        """
+        The highest loan id such that every loan between `after` and it was
+        inserted at least LOAN_SETTLE_SECONDS ago. Id watermarks only advance
+        this far: a loan whose transaction is still open can commit with an
+        id below a newer, already committed one.
+        """
+        cutoff = timezone.now() - timedelta(seconds=getattr(settings, 'LOAN_SETTLE_SECONDS', 60))
+        loans = self.filter(id__gt=after)
+        unsettled = loans.filter(created_at__gt=cutoff).order_by('id').values_list('id', flat=True).first()
+        if unsettled is not None:
+            loans = loans.filter(id__lt=unsettled)
+        return loans.order_by('-id').values_list('id', flat=True).first() or after
 
 
 class BorrowedBook(models.Model):
@@ -53,9 +226,20 @@ class BorrowedBook(models.Model):
     return_date = models.DateField()
     actual_return_date = models.DateField(blank=True, null=True)
     returned = models.BooleanField(default=False)
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
+
+    objects = BorrowedBookQuerySet.as_manager()
 
     class Meta:
         ordering = ['-issue_date']
+        constraints = [
+            # one open loan per student per title
+            models.UniqueConstraint(
+                fields=['user', 'book'],
+                condition=models.Q(returned=False),
+                name='borrowedbook_one_open_loan',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.user.user.get_full_name()} borrowed {self.book.title}"
@@ -73,6 +257,8 @@ class BorrowedBook(models.Model):
 
     @property
     def is_overdue(self):
+        if hasattr(self, "is_overdue_sql"):     # annotated by with_overdue()
+            return self.is_overdue_sql
         return_date_obj = self._parse_date(self.return_date)
         if self.returned and self.actual_return_date:
             actual_return_date_obj = self._parse_date(self.actual_return_date)
@@ -85,6 +271,8 @@ class BorrowedBook(models.Model):
 
     @property
     def overdue_days(self):
+        if hasattr(self, "overdue_days_sql"):
+            return self.overdue_days_sql
         return_date_obj = self._parse_date(self.return_date)
         if self.returned and self.actual_return_date:
             actual_return_date_obj = self._parse_date(self.actual_return_date)
@@ -99,13 +287,271 @@ class BorrowedBook(models.Model):
                 return 0
         return max(0, delta.days)
 
+    def _priced(self):
+        # annotated by with_fines(), else set in bulk by library.fines.price_loans
+        if hasattr(self, "fine_sql"):
+            self._fine = self.fine_sql.quantize(Decimal("0.01"))
+            self._fine_per_day = self.fine_per_day_sql
+        elif not hasattr(self, "_fine"):
+            from .fines import price_loans
+            price_loans([self])
+
     @property
     def fine(self):
-        # You can later replace 100 with a dynamic fine per day if you want
-        return self.overdue_days * 100
+        self._priced()
+        return self._fine
+
+    @property
+    def fine_per_day(self):
+        self._priced()
+        return self._fine_per_day
 
     def mark_as_returned(self):
-        self.actual_return_date = timezone.now().date()
-        self.returned = True
-        self.book.increase_available_copy()
-        self.save()
+        from .circulation import return_loan
+
+        return_loan(self)
+
+
+class BookHoldQuerySet(models.QuerySet):
+    def active(self):
+        return self.filter(status__in=BookHold.ACTIVE)
+
+    def with_position(self):
+        """Annotate queue_position (1 = next in line) on waiting holds."""
+        ahead = (
+            BookHold.objects.filter(book=models.OuterRef("book"), status=BookHold.WAITING)
+            .filter(
+                models.Q(created_at__lt=models.OuterRef("created_at"))
+                | models.Q(created_at=models.OuterRef("created_at"), id__lt=models.OuterRef("id"))
+            )
+            .order_by()
+            .values("book")
+            .annotate(n=models.Count("id"))
+            .values("n")
+        )
+        return self.annotate(queue_position=models.Case(
+            models.When(
+                status=BookHold.WAITING,
+                then=Coalesce(models.Subquery(ahead), 0) + 1,
+            ),
+            default=None,
+            output_field=models.IntegerField(),
+        ))
+
+
+class BookHold(models.Model):
+    """
+    A student's place in the FIFO queue for a title. When a copy comes back
+    it is handed to the oldest waiting hold (status -> ready) instead of the
+    shelf, and stays reserved until picked up or the hold expires.
+    """
+    WAITING = 'waiting'
+    READY = 'ready'
+    FULFILLED = 'fulfilled'
+    CANCELLED = 'cancelled'
+    EXPIRED = 'expired'
+    STATUS_CHOICES = [
+        (WAITING, 'Waiting'),
+        (READY, 'Ready for pickup'),
+        (FULFILLED, 'Fulfilled'),
+        (CANCELLED, 'Cancelled'),
+        (EXPIRED, 'Expired'),
+    ]
+    ACTIVE = (WAITING, READY)
+
+    user = models.ForeignKey(
+        StudentProfile, on_delete=models.CASCADE, related_name='book_holds')
+    book = models.ForeignKey(
+        Book, on_delete=models.CASCADE, related_name='holds')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=WAITING)
+    created_at = models.DateTimeField(auto_now_add=True)
+    ready_at = models.DateTimeField(blank=True, null=True)
+    expires_at = models.DateTimeField(blank=True, null=True)
+    closed_at = models.DateTimeField(blank=True, null=True)
+
+    objects = BookHoldQuerySet.as_manager()
+
+    class Meta:
+        ordering = ['created_at', 'id']
+        indexes = [
+            # next waiting hold for a book / queue position
+            models.Index(fields=['book', 'status', 'created_at', 'id'], name='bookhold_queue_idx'),
+            # "my holds" and consuming a ready hold at checkout
+            models.Index(fields=['user', 'status'], name='bookhold_user_status_idx'),
+            # expiry sweep
+            models.Index(fields=['status', 'expires_at'], name='bookhold_expiry_idx'),
+        ]
+        constraints = [
+            # one place in the queue per student per title
+            models.UniqueConstraint(
+                fields=['user', 'book'],
+                condition=models.Q(status__in=['waiting', 'ready']),
+                name='bookhold_one_active_hold',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user} – {self.book.title} ({self.status})"
+
+
+class BookCoBorrow(models.Model):
+    """
+    One row of the sparse "also borrowed" matrix (see library.recommendations):
+    the books borrowed by students who borrowed `book`, as two parallel
+    little-endian uint32 arrays ordered by count, highest first.
+    """
+    book = models.OneToOneField(
+        Book, on_delete=models.CASCADE, primary_key=True, related_name='co_borrowing')
+    neighbours = models.BinaryField(default=bytes)
+    counts = models.BinaryField(default=bytes)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Co-borrowing for book #{self.book_id}"
+
+
+class CoBorrowWatermark(models.Model):
+    """Last BorrowedBook id folded into BookCoBorrow (a single row)."""
+    last_loan_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Co-borrowing up to loan #{self.last_loan_id}"
+
+
+class BookStockTouch(models.Model):
+    """
+    "This book's stock may have changed" - queued by signals on Book,
+    BorrowedBook and BookHold writes, consumed by incremental runs of
+    `manage.py reconcile_inventory`. A plain id, not a foreign key: rows
+    are queued while a book's loans are being cascade-deleted.
+    """
+    book_id = models.BigIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Stock touched: book #{self.book_id}"
+
+
+class CirculationMonthlyRollup(models.Model):
+    """
+    Circulation counts per book per borrower classroom per month (`month` is
+    the 1st of the month), for the statistics endpoints. Kept current by
+    `manage.py refresh_circulation_stats` (library.stats).
+
+    Each count sits in the month of its own event: issued by issue date,
+    returned / late_returns / loan_days by actual return date, overdue (kept
+    past the due date, returned or not) by due date.
+    """
+    month = models.DateField()
+    book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='circulation_rollups')
+    category = models.ForeignKey(
+        Category, on_delete=models.SET_NULL, null=True, blank=True, related_name='circulation_rollups')
+    classroom = models.ForeignKey(
+        'academic.Classroom', on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='circulation_rollups')
+    issued = models.PositiveIntegerField(default=0)
+    returned = models.PositiveIntegerField(default=0)
+    late_returns = models.PositiveIntegerField(default=0)
+    overdue = models.PositiveIntegerField(default=0)
+    loan_days = models.PositiveIntegerField(default=0)      # summed over `returned` loans
+
+    class Meta:
+        ordering = ['-month']
+        indexes = [
+            models.Index(fields=['month', 'book'], name='circ_rollup_month_book_idx'),
+            models.Index(fields=['category', 'month'], name='circ_rollup_cat_month_idx'),
+            models.Index(fields=['classroom', 'month'], name='circ_rollup_class_month_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.book_id} - {self.month:%Y-%m}"
+
+
+class CirculationStatsWatermark(models.Model):
+    """How far library.stats has folded BorrowedBook in (a single row)."""
+    last_loan_id = models.BigIntegerField(default=0)
+    refreshed_on = models.DateField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Circulation stats up to loan #{self.last_loan_id} ({self.refreshed_on})"
+
+
+class OverdueReminder(models.Model):
+    """
+    Outbox of overdue-loan reminders: one rendered message per student per
+    day, written by `manage.py send_overdue_reminders` (library.reminders)
+    and delivered from here through the configured EMAIL_BACKEND.
+    """
+    PENDING = 'pending'
+    SENT = 'sent'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (SENT, 'Sent'),
+        (FAILED, 'Failed'),
+    ]
+
+    student = models.ForeignKey(
+        StudentProfile, on_delete=models.CASCADE, related_name='overdue_reminders')
+    reminder_date = models.DateField()
+    email = models.EmailField()
+    subject = models.CharField(max_length=200)
+    body = models.TextField()
+    loans = models.PositiveIntegerField(default=0)
+    total_fine = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        ordering = ['-reminder_date', 'id']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['student', 'reminder_date'], name='overdue_reminder_once_per_day'),
+        ]
+        indexes = [
+            models.Index(fields=['status', 'id'], name='overdue_reminder_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.email} - {self.reminder_date} ({self.status})"
+
+
+class CatalogChange(models.Model):
+    """
+    Append-only log of catalog edits for kiosk sync (library.catalog): a
+    book or category saved or deleted, or a book's availability changed.
+    The id doubles as the catalog version.
+    """
+    BOOK = 'book'
+    CATEGORY = 'category'
+    KIND_CHOICES = [
+        (BOOK, 'Book'),
+        (CATEGORY, 'Category'),
+    ]
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"#{self.id} {self.kind} {self.object_id}"
+
+
+class CatalogSnapshot(models.Model):
+    """A gzipped JSON dump of the catalog as of CatalogChange `version`."""
+    version = models.BigIntegerField(unique=True)
+    file = models.FileField(upload_to='catalog/', storage=media_storage)
+    books = models.PositiveIntegerField(default=0)
+    categories = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-version']
+
+    def __str__(self):
+        return f"Catalog snapshot v{self.version}"
@@ -0,0 +1,164 @@
+"""
+"Students who borrowed this also borrowed" recommendations.
+
+The item-item co-occurrence matrix (how many students borrowed both A and
+B) is built from BorrowedBook history and stored sparse, one BookCoBorrow
+row per book holding packed uint32 arrays of neighbour ids and counts,
+sorted by count. A lookup reads the first k entries of one row (and is
+cached), with no self-join over the loans table at request time.
+
+`update_coborrowing()` folds in loans newer than the watermark, batch by
+batch. It stops short of loans inserted in the last LOAN_SETTLE_SECONDS
+(see BorrowedBook.objects.settled_through), so a transaction that commits
+late cannot leave a lower id behind the watermark. For each student with
+new loans it pairs each newly borrowed title with the titles that student
+had borrowed before, so only the rows of books touched by new loans are
+rewritten. The same code rebuilds from
+scratch (`full=True`) after history has been deleted or edited.
+Run it periodically: `manage.py update_coborrowing`.
+"""
+import sys
+from array import array
+from collections import defaultdict
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import BookCoBorrow, BorrowedBook, CoBorrowWatermark
+
+TOP_K = 50                                  # neighbours kept in the lookup cache
+BATCH_SIZE = 20000                          # loans folded in per transaction
+CACHE_TIMEOUT = 60 * 60 * 24
+_STUDENT_CHUNK = 500                        # IN (...) size for history reads
+
+
+# ------------------------------------------------------------------
+# PACKED ARRAYS
+# ------------------------------------------------------------------
+def _pack(values):
+    packed = array('I', values)
+    if sys.byteorder == 'big':
+        packed.byteswap()
+    return packed.tobytes()
+
+
+def _unpack(data, limit=None):
+    data = bytes(data or b'')
+    if limit is not None:
+        data = data[:limit * 4]             # only the head: rows are sorted by count
+    values = array('I')
+    values.frombytes(data)
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values
+
+
+def _row_counts(row):
+    return dict(zip(_unpack(row.neighbours), _unpack(row.counts)))
+
+
+def _encode(row, counts):
+    ordered = sorted(counts.items(), key=lambda item: (-item[1], item[0]))
+    row.neighbours = _pack(book_id for book_id, _ in ordered)
+    row.counts = _pack(count for _, count in ordered)
+
+
+def _cache_key(book_id):
+    return f"library:coborrow:{book_id}"
+
+
+# ------------------------------------------------------------------
+# LOOKUP
+# ------------------------------------------------------------------
+def co_borrowed(book_id, limit=10):
+    """[(book_id, students)] most often borrowed together with `book_id`."""
+    top = cache.get(_cache_key(book_id))
+    if top is None:
+        row = BookCoBorrow.objects.filter(book_id=book_id).values_list('neighbours', 'counts').first()
+        top = list(zip(_unpack(row[0], TOP_K), _unpack(row[1], TOP_K))) if row else []
+        cache.set(_cache_key(book_id), top, CACHE_TIMEOUT)
+    return top[:limit]
+
+
+# ------------------------------------------------------------------
+# INCREMENTAL BUILD
+# ------------------------------------------------------------------
+def _history(student_ids, up_to):
+    """{student_id: set(book_id)} for loans with id <= up_to."""
+    seen = defaultdict(set)
+    student_ids = list(student_ids)
+    for i in range(0, len(student_ids), _STUDENT_CHUNK):
+        rows = (
+            BorrowedBook.objects.filter(user_id__in=student_ids[i:i + _STUDENT_CHUNK], id__lte=up_to)
+            .order_by().values_list('user_id', 'book_id').distinct()
+        )
+        for student_id, book_id in rows.iterator():
+            seen[student_id].add(book_id)
+    return seen
+
+
+def _fold_batch(watermark, batch_size):
+    """Fold the next batch of loans after `watermark` in. Returns (last id, loans, rows)."""
+    settled = BorrowedBook.objects.settled_through(watermark)
+    loans = list(
+        BorrowedBook.objects.filter(id__gt=watermark, id__lte=settled).order_by('id')
+        .values_list('id', 'user_id', 'book_id')[:batch_size]
+    )
+    if not loans:
+        return watermark, 0, 0
+
+    seen = _history({student_id for _, student_id, _ in loans}, watermark)
+    delta = defaultdict(lambda: defaultdict(int))       # book -> neighbour -> +students
+    for _, student_id, book_id in loans:
+        books = seen[student_id]
+        if book_id in books:
+            continue                        # re-borrowing a title adds no new pair
+        for other in books:
+            delta[book_id][other] += 1
+            delta[other][book_id] += 1
+        books.add(book_id)
+
+    existing = {row.book_id: row for row in BookCoBorrow.objects.filter(book_id__in=delta)}
+    changed, created = [], []
+    for book_id, increments in delta.items():
+        row = existing.get(book_id)
+        counts = _row_counts(row) if row else {}
+        for other, n in increments.items():
+            counts[other] = counts.get(other, 0) + n
+        if row is None:
+            row = BookCoBorrow(book_id=book_id)
+            created.append(row)
+        else:
+            changed.append(row)
+        _encode(row, counts)
+    BookCoBorrow.objects.bulk_create(created, batch_size=500)
+    BookCoBorrow.objects.bulk_update(changed, ['neighbours', 'counts'], batch_size=500)
+
+    touched = [_cache_key(book_id) for book_id in delta]
+    transaction.on_commit(lambda: cache.delete_many(touched))
+    return loans[-1][0], len(loans), len(delta)
+
+
+def update_coborrowing(full=False, batch_size=BATCH_SIZE):
+    """Bring the matrix up to date. Returns (loans folded in, rows rewritten)."""
+    total_loans = total_rows = 0
+    CoBorrowWatermark.objects.get_or_create(pk=1)
+    if full:
+        with transaction.atomic():
+            CoBorrowWatermark.objects.select_for_update().filter(pk=1).update(last_loan_id=0)
+            book_ids = list(BookCoBorrow.objects.values_list('book_id', flat=True))
+            BookCoBorrow.objects.all().delete()
+            transaction.on_commit(lambda: cache.delete_many([_cache_key(b) for b in book_ids]))
+
+    while True:
+        with transaction.atomic():
+            # the row lock keeps two runs from folding the same loans twice
+            state = CoBorrowWatermark.objects.select_for_update().get(pk=1)
+            last_id, loans, rows = _fold_batch(state.last_loan_id, batch_size)
+            if not loans:
+                break
+            state.last_loan_id = last_id
+            state.save(update_fields=['last_loan_id', 'updated_at'])
+        total_loans += loans
+        total_rows += rows
+    return total_loans, total_rows
@@ -0,0 +1,192 @@
+"""
+Overdue-loan reminders.
+
+`queue_reminders()` streams the open overdue loans ordered by student
+(`.iterator()`, a server-side cursor on PostgreSQL, chunked fetches on
+SQLite), so only the current chunk is in memory. Loans are buffered up
+to a chunk boundary that falls between two students, priced in one
+pass (library.fines), rendered into one OverdueReminder per student and
+written with one bulk insert in its own transaction. Students that
+already have a reminder for the day are skipped, so a run that died
+half-way can simply be started again.
+
+`deliver_reminders()` sends pending outbox rows in id batches through
+Django's EMAIL_BACKEND, over one connection per batch. The file backend
+(EMAIL_FILE_PATH) or an SMTP debugging server is enough for testing, the
+locmem backend for the test suite. A message that fails, or a batch whose
+connection cannot be opened, is retried on later runs and marked failed
+after MAX_ATTEMPTS.
+"""
+from dataclasses import dataclass
+from decimal import Decimal
+from itertools import groupby
+
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .fines import price_loans
+from .models import BorrowedBook, OverdueReminder
+
+CHUNK_SIZE = 2000                           # loans per fetch / per outbox commit
+DELIVERY_BATCH = 200                        # messages per backend connection
+MAX_ATTEMPTS = 3
+
+SUBJECT = "Overdue library books: {count} item(s)"
+BODY = """Dear {name},
+
+The following library books are overdue:
+
+{lines}
+
+Fines so far: {total_fine}
+
+Please return them to the library as soon as possible.
+"""
+LINE = "  - {title} (due {due}, {days} day(s) late, fine {fine})"
+
+
+@dataclass
+class ReminderReport:
+    loans: int = 0
+    students: int = 0
+    queued: int = 0
+    skipped: int = 0
+
+
+# ------------------------------------------------------------------
+# QUEUEING
+# ------------------------------------------------------------------
+def render(student, loans):
+    """(subject, body) for one student's overdue loans (priced by price_loans)."""
+    lines = "\n".join(
+        LINE.format(title=loan.book.title, due=loan.return_date, days=loan.overdue_days, fine=loan.fine)
+        for loan in loans
+    )
+    return (
+        SUBJECT.format(count=len(loans)),
+        BODY.format(
+            name=student.user.get_full_name() or student.user.email,
+            lines=lines,
+            total_fine=sum((loan.fine for loan in loans), Decimal(0)),
+        ),
+    )
+
+
+def _flush(buffer, today, report):
+    """Price, render and store reminders for the buffered loans."""
+    price_loans(buffer, today=today)
+    students = {loan.user_id for loan in buffer}
+    done = set(
+        OverdueReminder.objects.filter(reminder_date=today, student_id__in=students)
+        .values_list('student_id', flat=True)
+    )
+    reminders = []
+    for student_id, loans in groupby(buffer, key=lambda loan: loan.user_id):
+        loans = list(loans)
+        report.students += 1
+        if student_id in done:
+            report.skipped += 1
+            continue
+        student = loans[0].user
+        subject, body = render(student, loans)
+        reminders.append(OverdueReminder(
+            student=student,
+            reminder_date=today,
+            email=student.user.email,
+            subject=subject,
+            body=body,
+            loans=len(loans),
+            total_fine=sum((loan.fine for loan in loans), Decimal(0)),
+        ))
+    queued_today = OverdueReminder.objects.filter(reminder_date=today, student_id__in=students)
+    with transaction.atomic():
+        # a concurrent run may have queued the same student meanwhile; those rows are dropped
+        before = queued_today.count()
+        OverdueReminder.objects.bulk_create(reminders, ignore_conflicts=True)
+        queued = queued_today.count() - before
+    report.queued += queued
+    report.skipped += len(reminders) - queued
+
+
+def queue_reminders(today=None, chunk_size=CHUNK_SIZE):
+    """Write one reminder per student with open overdue loans. Returns a ReminderReport."""
+    today = today or timezone.now().date()
+    report = ReminderReport()
+    loans = (
+        BorrowedBook.objects.overdue(today)
+        .filter(user__user__is_active=True)
+        .select_related('user__user', 'book')
+        .order_by('user_id', 'return_date', 'id')
+        .iterator(chunk_size=chunk_size)
+    )
+    buffer = []
+    for loan in loans:
+        if len(buffer) >= chunk_size and loan.user_id != buffer[-1].user_id:
+            _flush(buffer, today, report)
+            buffer = []
+        buffer.append(loan)
+        report.loans += 1
+    if buffer:
+        _flush(buffer, today, report)
+    return report
+
+
+# ------------------------------------------------------------------
+# DELIVERY
+# ------------------------------------------------------------------
+def _attempt_failed(reminder, error, max_attempts):
+    """Record a failed attempt. True when the reminder is now failed for good."""
+    reminder.attempts += 1
+    reminder.last_error = str(error)
+    if reminder.attempts >= max_attempts:
+        reminder.status = OverdueReminder.FAILED
+        return True
+    return False
+
+
+def deliver_reminders(batch_size=DELIVERY_BATCH, max_attempts=MAX_ATTEMPTS):
+    """Send pending reminders. Returns (sent, failed for good)."""
+    sent = failed = 0
+    last_id = 0
+    while True:
+        batch = list(
+            OverdueReminder.objects.filter(status=OverdueReminder.PENDING, id__gt=last_id)
+            .order_by('id')[:batch_size]
+        )
+        if not batch:
+            break
+        last_id = batch[-1].id
+
+        connection = get_connection()
+        try:
+            connection.open()
+        except Exception as e:
+            # the mail server is unreachable: one failed attempt for the batch, retry on the next run
+            print(f"[ERROR] Cannot open the mail connection for {len(batch)} overdue reminders: {e}")
+            failed += sum(_attempt_failed(reminder, e, max_attempts) for reminder in batch)
+            OverdueReminder.objects.bulk_update(
+                batch, ['status', 'attempts', 'last_error'], batch_size=batch_size
+            )
+            break
+        try:
+            for reminder in batch:
+                try:
+                    connection.send_messages([
+                        EmailMessage(reminder.subject, reminder.body, to=[reminder.email], connection=connection)
+                    ])
+                except Exception as e:
+                    print(f"[ERROR] Overdue reminder #{reminder.id} to {reminder.email} failed: {e}")
+                    failed += _attempt_failed(reminder, e, max_attempts)
+                    continue
+                reminder.attempts += 1
+                reminder.status = OverdueReminder.SENT
+                reminder.sent_at = timezone.now()
+                reminder.last_error = ''
+                sent += 1
+        finally:
+            connection.close()
+            OverdueReminder.objects.bulk_update(
+                batch, ['status', 'attempts', 'last_error', 'sent_at'], batch_size=batch_size
+            )
+    return sent, failed
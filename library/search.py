@@ -0,0 +1,203 @@
+"""
+Ranked full-text search over the book catalog.
+
+Every Book carries a denormalised `search_document` (title, author,
+publisher, ISBN, category name, description), refreshed by Book.save and
+Category.save.
+
+- PostgreSQL: the document is indexed with GIN on
+  to_tsvector('english', search_document) (migration 0005); queries use
+  websearch_to_tsquery, ts_rank and ts_headline against that expression.
+- Other databases (SQLite test runs): a process-wide inverted index, built
+  lazily, ranked with BM25 and updated in place by the same save hooks.
+  It is rebuilt when older than INDEX_TTL_SECONDS so other worker
+  processes pick up changes as well.
+
+Headlines are HTML: the document text is escaped and only the <mark> tags
+around matched words are markup.
+"""
+import math
+import re
+import threading
+import time
+from collections import Counter
+
+from django.db import connection
+from django.db.models import F, Func, Value
+from django.db.models.functions import Replace
+from django.utils.html import escape
+
+from .models import Book
+
+SEARCH_CONFIG = 'english'
+INDEX_TTL_SECONDS = 60
+START_SEL, STOP_SEL = '<mark>', '</mark>'
+HEADLINE_WORDS = 35
+
+_TOKEN_RE = re.compile(r"\w+")
+_lock = threading.Lock()
+_index = None           # _InvertedIndex | None
+
+
+def _uses_postgres():
+    return connection.vendor == 'postgresql'
+
+
+def tokenize(text):
+    return [t.lower() for t in _TOKEN_RE.findall(text or '')]
+
+
+# ------------------------------------------------------------------
+# IN-PROCESS INVERTED INDEX (non-PostgreSQL)
+# ------------------------------------------------------------------
+class _InvertedIndex:
+    K1, B = 1.2, 0.75
+
+    def __init__(self, rows):
+        self.built_at = time.monotonic()
+        self.postings = {}          # token -> {book_id: term frequency}
+        self.lengths = {}           # book_id -> tokens in document
+        self.terms = {}             # book_id -> its tokens, so removal skips the vocabulary
+        for book_id, document in rows:
+            self.add(book_id, document)
+
+    def add(self, book_id, document):
+        self.remove(book_id)
+        tokens = tokenize(document)
+        counts = Counter(tokens)
+        self.lengths[book_id] = len(tokens)
+        self.terms[book_id] = tuple(counts)
+        for token, tf in counts.items():
+            self.postings.setdefault(token, {})[book_id] = tf
+
+    def remove(self, book_id):
+        if self.lengths.pop(book_id, None) is None:
+            return
+        for token in self.terms.pop(book_id):
+            del self.postings[token][book_id]
+            if not self.postings[token]:
+                del self.postings[token]
+
+    def search(self, terms):
+        """[(book_id, score)] for books containing every term, best first."""
+        lists = [self.postings.get(t) for t in dict.fromkeys(terms)]
+        if not lists or not all(lists):
+            return []
+        lists.sort(key=len)
+        hits = set(lists[0]).intersection(*lists[1:])
+
+        n = len(self.lengths)
+        avg = sum(self.lengths.values()) / n
+        scores = {}
+        for docs in lists:
+            idf = math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+            for book_id in hits:
+                tf = docs[book_id]
+                norm = self.K1 * (1 - self.B + self.B * self.lengths[book_id] / avg)
+                scores[book_id] = scores.get(book_id, 0) + idf * tf * (self.K1 + 1) / (tf + norm)
+        return sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+
+
+def _get_index():
+    global _index
+    with _lock:
+        if _index is None or time.monotonic() - _index.built_at > INDEX_TTL_SECONDS:
+            _index = _InvertedIndex(Book.objects.values_list('id', 'search_document').iterator())
+        return _index
+
+
+def index_books(books):
+    """Refresh the in-process index for saved books (no-op on PostgreSQL)."""
+    if _index is None or _uses_postgres():
+        return
+    with _lock:
+        for book in books:
+            _index.add(book.pk, book.search_document)
+
+
+def unindex_books(book_ids):
+    if _index is None or _uses_postgres():
+        return
+    with _lock:
+        for book_id in book_ids:
+            _index.remove(book_id)
+
+
+def _mark(word, terms):
+    """`word` HTML-escaped, with the tokens in `terms` marked."""
+    parts, last = [], 0
+    for match in _TOKEN_RE.finditer(word):
+        token = escape(match.group())
+        parts.append(escape(word[last:match.start()]))
+        parts.append(f"{START_SEL}{token}{STOP_SEL}" if match.group().lower() in terms else token)
+        last = match.end()
+    parts.append(escape(word[last:]))
+    return ''.join(parts)
+
+
+def highlight(document, terms):
+    """A ts_headline-like HTML fragment of `document` with the query terms marked."""
+    terms = set(terms)
+    words = document.split()
+    first = next((i for i, w in enumerate(words) if terms & set(tokenize(w))), 0)
+    start = max(0, first - HEADLINE_WORDS // 3)
+    return ' '.join(_mark(word, terms) for word in words[start:start + HEADLINE_WORDS])
+
+
+def _escaped(expression):
+    """`expression` HTML-escaped in SQL, the way django.utils.html.escape does it."""
+    for char, entity in (('&', '&amp;'), ('<', '&lt;'), ('>', '&gt;'), ('"', '&quot;'), ("'", '&#x27;')):
+        expression = Replace(expression, Value(char), Value(entity))
+    return expression
+
+
+# ------------------------------------------------------------------
+# SEARCH
+# ------------------------------------------------------------------
+def _search_postgres(query, offset, limit):
+    from django.contrib.postgres.search import (
+        SearchHeadline, SearchQuery, SearchRank, SearchVectorField,
+    )
+
+    # must match the expression of the GIN index in migration 0005
+    vector = Func(
+        F('search_document'),
+        template=f"to_tsvector('{SEARCH_CONFIG}'::regconfig, %(expressions)s)",
+        output_field=SearchVectorField(),
+    )
+    search_query = SearchQuery(query, config=SEARCH_CONFIG, search_type='websearch')
+    qs = Book.objects.annotate(document=vector).filter(document=search_query)
+
+    total = qs.count()
+    page = (
+        qs.select_related('category')
+        .annotate(
+            rank=SearchRank(vector, search_query),
+            # the parser keeps entities whole, so only <mark> is markup in the result
+            headline=SearchHeadline(
+                _escaped(F('search_document')), search_query, config=SEARCH_CONFIG,
+                start_sel=START_SEL, stop_sel=STOP_SEL, max_words=HEADLINE_WORDS,
+            ),
+        )
+        .defer('search_document')
+        .order_by('-rank', 'id')[offset:offset + limit]
+    )
+    return total, [(book, book.rank, book.headline) for book in page]
+
+
+def _search_index(query, offset, limit):
+    terms = tokenize(query)
+    hits = _get_index().search(terms)
+    page = hits[offset:offset + limit]
+    books = Book.objects.select_related('category').in_bulk([book_id for book_id, _ in page])
+    return len(hits), [
+        (books[book_id], round(score, 6), highlight(books[book_id].search_document, terms))
+        for book_id, score in page if book_id in books
+    ]
+
+
+def search_books(query, offset=0, limit=20):
+    """(total hits, [(book, rank, headline)]) for one page of results, best first."""
+    if _uses_postgres():
+        return _search_postgres(query, offset, limit)
+    return _search_index(query, offset, limit)
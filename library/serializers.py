@@ -1,6 +1,9 @@
 from rest_framework import serializers
+from django.urls import reverse
 from django.utils import timezone
-from .models import Book, BorrowedBook, Category
+from .fines import price_loans
+from .importer import normalize_isbn
+from .models import Book, BookHold, BorrowedBook, Category, FinePolicy, SchoolHoliday
 from portalaccount.models import StudentProfile
 from django.contrib.auth import get_user_model
 
@@ -20,39 +23,105 @@ class CategorySerializer(serializers.ModelSerializer):
 # ────────────────────────────────────────────────────────
 class BookSerializer(serializers.ModelSerializer):
     category = serializers.PrimaryKeyRelatedField(queryset=Category.objects.all())
+    file_url = serializers.SerializerMethodField()      # protected, Range-capable
 
     class Meta:
         model = Book
         fields = [
-            'id', 'title', 'description', 'file', 'isbn',
+            'id', 'title', 'description', 'file', 'file_url', 'isbn',
             'author', 'publisher', 'edition',
             'price', 'language', 'total_copies', 'available_copies',
             'uploaded_at', 'category'
         ]
         read_only_fields = ['available_copies', 'uploaded_at']
 
+    def get_file_url(self, obj):
+        if not obj.file:
+            return None
+        url = reverse('book-file', args=[obj.pk])
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
+    def validate_isbn(self, value):
+        # store real ISBNs as ISBN-13 so the catalog import can dedupe on them;
+        # the model's unique check ran on the raw value, so repeat it here
+        value = normalize_isbn(value) or value
+        clash = Book.objects.filter(isbn=value)
+        if self.instance:
+            clash = clash.exclude(pk=self.instance.pk)
+        if clash.exists():
+            raise serializers.ValidationError("book with this ISBN already exists.")
+        return value
+
     def to_representation(self, instance):
         rep = super().to_representation(instance)
         rep['category'] = CategorySerializer(instance.category).data if instance.category else None
         return rep
 
 
+# ────────────────────────────────────────────────────────
+# FINE POLICY / HOLIDAY SERIALIZERS
+# ────────────────────────────────────────────────────────
+class FinePolicySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = FinePolicy
+        fields = ['id', 'category', 'rate_per_day', 'grace_days', 'max_fine', 'updated_at']
+        read_only_fields = ['updated_at']
+
+    def validate(self, data):
+        category = data.get('category', getattr(self.instance, 'category', None))
+        clash = FinePolicy.objects.filter(category=category)
+        if self.instance:
+            clash = clash.exclude(pk=self.instance.pk)
+        if clash.exists():
+            raise serializers.ValidationError(
+                "A policy for this category already exists." if category
+                else "A default policy already exists."
+            )
+        return data
+
+
+class SchoolHolidaySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = SchoolHoliday
+        fields = ['id', 'name', 'start_date', 'end_date']
+
+    def validate(self, data):
+        start = data.get('start_date', getattr(self.instance, 'start_date', None))
+        end = data.get('end_date', getattr(self.instance, 'end_date', None))
+        if start and end and end < start:
+            raise serializers.ValidationError("end_date must not be before start_date.")
+        return data
+
+
 # ────────────────────────────────────────────────────────
 # BORROWED BOOK SERIALIZER
 # ────────────────────────────────────────────────────────
+class BorrowedBookListSerializer(serializers.ListSerializer):
+    """Prices every loan in one pass before the rows are rendered."""
+
+    def to_representation(self, data):
+        loans = list(data.all() if hasattr(data, 'all') else data)
+        price_loans([loan for loan in loans if not hasattr(loan, 'fine_sql')])   # with_fines() rows are priced
+        return super().to_representation(loans)
+
+
 class BorrowedBookSerializer(serializers.ModelSerializer):
     user_name = serializers.SerializerMethodField()
     book_title = serializers.SerializerMethodField()
 
     is_overdue = serializers.ReadOnlyField()
     overdue_days = serializers.ReadOnlyField()
-    fine = serializers.ReadOnlyField()
+    # numbers in JSON, as before fine policies made them Decimals
+    fine = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True, coerce_to_string=False)
 
     overdue = serializers.SerializerMethodField()  # Backward compatibility
-    fine_per_day = serializers.SerializerMethodField()  # Optional field if needed
+    fine_per_day = serializers.DecimalField(
+        max_digits=10, decimal_places=2, read_only=True, coerce_to_string=False)
 
     class Meta:
         model = BorrowedBook
+        list_serializer_class = BorrowedBookListSerializer
         fields = [
             'id', 'user', 'user_name',
             'book', 'book_title',
@@ -80,5 +149,22 @@ class BorrowedBookSerializer(serializers.ModelSerializer):
     def get_overdue(self, obj):
         return obj.is_overdue
 
-    def get_fine_per_day(self, obj):
-        return 100  # Or dynamically return from settings/config if needed
+
+# ────────────────────────────────────────────────────────
+# BOOK HOLD SERIALIZER
+# ────────────────────────────────────────────────────────
+class BookHoldSerializer(serializers.ModelSerializer):
+    book_title = serializers.CharField(source='book.title', read_only=True)
+    queue_position = serializers.SerializerMethodField()
+
+    class Meta:
+        model = BookHold
+        fields = [
+            'id', 'user', 'book', 'book_title', 'status', 'queue_position',
+            'created_at', 'ready_at', 'expires_at', 'closed_at',
+        ]
+        read_only_fields = fields
+
+    def get_queue_position(self, obj):
+        # annotated by BookHoldQuerySet.with_position()
+        return getattr(obj, 'queue_position', None)
@@ -0,0 +1,167 @@
+"""
+Pre-aggregated circulation statistics.
+
+CirculationMonthlyRollup holds, per (month, book, borrower classroom),
+the issue / return / overdue counts and summed loan days. Reports read
+these rows instead of joining BorrowedBook, Book, Category and
+StudentProfile on every load.
+
+`refresh_stats()` works out which months changed since the last run:
+- months of newly issued loans (id past the watermark, which only
+  advances over loans settled per BorrowedBook.objects.settled_through);
+- months of loans returned since the last run;
+- due months of loans that went overdue since the last run.
+It deletes those months' rollup rows and re-aggregates them from
+BorrowedBook with three grouped queries (issues, returns, overdue), one
+per event type, whatever the number of months. `full=True` rebuilds
+everything, e.g. after loans were deleted or back-dated.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from .models import BorrowedBook, CirculationMonthlyRollup, CirculationStatsWatermark, DaysBetween
+
+STAT_FIELDS = ('issued', 'returned', 'late_returns', 'overdue', 'loan_days')
+_KEY = ('book_id', 'book__category_id', 'user__classroom_id')
+
+
+def month_start(value):
+    return value.replace(day=1)
+
+
+def next_month(value):
+    value = month_start(value)
+    return value.replace(year=value.year + 1, month=1) if value.month == 12 else value.replace(month=value.month + 1)
+
+
+def _in_months(field, months):
+    q = Q()
+    for month in months:
+        q |= Q(**{f'{field}__gte': month, f'{field}__lt': next_month(month)})
+    return q
+
+
+def _grouped(queryset, date_field, months, **aggregates):
+    if months is not None:
+        queryset = queryset.filter(_in_months(date_field, months))
+    return (
+        queryset.annotate(month=TruncMonth(date_field))
+        .values('month', *_KEY)
+        .annotate(**aggregates)
+        .order_by()
+        .iterator(chunk_size=2000)
+    )
+
+
+def _rollup_rows(months, today):
+    """Rollup rows for `months` (None = all history), from three grouped queries."""
+    rows = defaultdict(lambda: dict.fromkeys(STAT_FIELDS, 0))
+
+    def add(row, **values):
+        key = (row['month'], *(row[k] for k in _KEY))
+        for name, value in values.items():
+            rows[key][name] += value or 0
+
+    for row in _grouped(BorrowedBook.objects.all(), 'issue_date', months, n=Count('id')):
+        add(row, issued=row['n'])
+
+    returns = BorrowedBook.objects.filter(returned=True, actual_return_date__isnull=False)
+    for row in _grouped(
+        returns, 'actual_return_date', months,
+        n=Count('id'),
+        late=Count('id', filter=Q(actual_return_date__gt=F('return_date'))),
+        days=Sum(DaysBetween('actual_return_date', 'issue_date')),
+    ):
+        add(row, returned=row['n'], late_returns=row['late'], loan_days=max(row['days'] or 0, 0))
+
+    kept_late = BorrowedBook.objects.filter(
+        Q(returned=True, actual_return_date__gt=F('return_date'))
+        | Q(returned=False, return_date__lt=today)
+    )
+    for row in _grouped(kept_late, 'return_date', months, n=Count('id')):
+        add(row, overdue=row['n'])
+
+    for (month, book_id, category_id, classroom_id), counts in rows.items():
+        yield CirculationMonthlyRollup(
+            month=month, book_id=book_id, category_id=category_id, classroom_id=classroom_id, **counts
+        )
+
+
+def _changed_months(state, today):
+    """Months whose rollups may be stale since the last refresh."""
+    months = set(
+        BorrowedBook.objects.filter(id__gt=state.last_loan_id).order_by()
+        .dates('issue_date', 'month')
+    )
+    since = (state.refreshed_on or today) - timedelta(days=1)   # one day of slack
+    months.update(
+        BorrowedBook.objects.filter(returned=True, actual_return_date__gte=since).order_by()
+        .dates('actual_return_date', 'month')
+    )
+    months.update(
+        BorrowedBook.objects.filter(returned=False, return_date__gte=since, return_date__lt=today)
+        .order_by().dates('return_date', 'month')
+    )
+    return months
+
+
+def refresh_stats(full=False, today=None):
+    """Bring the rollups up to date. Returns (months refreshed or None for all, rows written)."""
+    today = today or timezone.now().date()
+    CirculationStatsWatermark.objects.get_or_create(pk=1)
+    with transaction.atomic():
+        # one refresh at a time
+        state = CirculationStatsWatermark.objects.select_for_update().get(pk=1)
+        # not past loans still settling: one committing late would have a lower id
+        last_loan_id = BorrowedBook.objects.settled_through(state.last_loan_id)
+        full = full or state.refreshed_on is None
+
+        if full:
+            months = None
+            CirculationMonthlyRollup.objects.all().delete()
+        else:
+            months = sorted(_changed_months(state, today))
+            CirculationMonthlyRollup.objects.filter(month__in=months).delete()
+        written = 0
+        if months is None or months:
+            written = len(CirculationMonthlyRollup.objects.bulk_create(
+                _rollup_rows(months, today), batch_size=1000
+            ))
+
+        state.last_loan_id = last_loan_id
+        state.refreshed_on = today
+        state.save(update_fields=['last_loan_id', 'refreshed_on', 'updated_at'])
+    return months, written
+
+
+# ------------------------------------------------------------------
+# READING
+# ------------------------------------------------------------------
+def rollups_between(date_from=None, date_to=None):
+    """Rollup rows for a date range, widened to whole months."""
+    rollups = CirculationMonthlyRollup.objects.all()
+    if date_from:
+        rollups = rollups.filter(month__gte=month_start(date_from))
+    if date_to:
+        rollups = rollups.filter(month__lte=month_start(date_to))
+    return rollups
+
+
+SUMS = {name: Sum(name) for name in STAT_FIELDS}
+
+
+def with_average(totals):
+    """Counts plus avg_loan_days (over returned loans, None when nothing came back)."""
+    counts = {name: totals.get(name) or 0 for name in STAT_FIELDS}
+    returned = counts['returned']
+    counts['avg_loan_days'] = round(counts['loan_days'] / returned, 1) if returned else None
+    return counts
+
+
+def summarize(rollups):
+    return with_average(rollups.order_by().aggregate(**SUMS))
@@ -1,3 +1,632 @@
-from django.test import TestCase
+import gzip
+import json
+import random
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stdout
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.core import mail
+from django.core.cache import cache
+from django.core.mail.backends.locmem import EmailBackend
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from academic.models import Classroom
+from portalaccount.models import StudentProfile, User
+from . import catalog
+from .circulation import (
+    AlreadyBorrowed, AlreadyReturned, CirculationError, NoCopiesAvailable,
+    checkout, checkout_many, place_hold, put_back_copy, return_loan, return_many, take_copy,
+)
+from .fines import FineSchedule
+from .inventory import reconcile
+from .models import (
+    Book, BookCoBorrow, BookHold, BookStockTouch, BorrowedBook, Category, CirculationMonthlyRollup, FinePolicy,
+    OverdueReminder, SchoolHoliday,
+)
+from .recommendations import _row_counts, co_borrowed, update_coborrowing
+from .stats import STAT_FIELDS, refresh_stats
+from .reminders import deliver_reminders, queue_reminders
+
+# circulation calls per second the stress tests must sustain (32 threads, local PostgreSQL)
+MIN_OPS_PER_SECOND = 50
+
+
+def _run_parallel(fn, jobs, workers=32):
+    """Run fn(job) on a thread pool; each worker closes its own DB connection. Returns (results, seconds)."""
+    def wrapped(job):
+        try:
+            return fn(job)
+        finally:
+            connection.close()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(wrapped, jobs))
+    return results, time.perf_counter() - started
+
+
+class FineScheduleTests(SimpleTestCase):
+    def setUp(self):
+        self.schedule = FineSchedule(
+            [FinePolicy(rate_per_day=Decimal("2.00"), grace_days=1)],
+            [SchoolHoliday(start_date=date(2026, 3, 3), end_date=date(2026, 3, 4))],
+        )
+
+    def test_batch_with_no_late_loan(self):
+        today = date(2026, 3, 10)
+        prices = self.schedule.price([
+            (1, None, today + timedelta(days=5), today), (2, None, today + timedelta(days=2), today),
+        ])
+        self.assertEqual(prices, {1: (Decimal("0.00"), Decimal("2.00")), 2: (Decimal("0.00"), Decimal("2.00"))})
+
+    def test_holidays_and_grace_skipped(self):
+        prices = self.schedule.price([
+            (1, None, date(2026, 3, 1), date(2026, 3, 10)),     # 9 late - 2 holidays - 1 grace
+            (2, None, date(2026, 3, 20), date(2026, 3, 10)),    # not due yet
+        ])
+        self.assertEqual(prices[1][0], Decimal("12.00"))
+        self.assertEqual(prices[2][0], Decimal("0.00"))
+
+
+class DeskBatchTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(email="stack@example.com", password="x")
+        self.student = StudentProfile.objects.create(user=user)
+        self.shelved = Book.objects.create(title="Optics", isbn="9780306406157", price=1,
+                                           total_copies=2, available_copies=2)
+        self.gone = Book.objects.create(title="Gone", isbn="GONE-1", price=1, total_copies=1, available_copies=0)
+        self.other = Book.objects.create(title="Other", isbn="OTHER-1", price=1, total_copies=1, available_copies=1)
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+
+    def _post(self, url, items, **extra):
+        response = self.client.post(url, {"user": self.student.user_id, "items": items, **extra}, format="json")
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def _borrow(self, items):
+        today = date.today()
+        return self._post("/borrow/batch/", items, issue_date=today, return_date=today + timedelta(days=14))
+
+    def test_per_item_results_for_a_mixed_stack(self):
+        data = self._borrow(["0-306-40615-2", self.shelved.pk, self.gone.pk, "9999999999994", self.other.pk])
+
+        self.assertEqual((data["processed"], data["failed"]), (2, 3))
+        self.assertEqual([r["status"] for r in data["results"]], [201, 400, 400, 404, 201])
+        self.assertEqual(data["results"][1]["detail"], "Scanned twice in this batch.")
+        self.assertEqual(data["results"][2]["detail"], NoCopiesAvailable().detail)
+        self.assertEqual(
+            dict(Book.objects.values_list("isbn", "available_copies")),
+            {"9780306406157": 1, "GONE-1": 0, "OTHER-1": 0},
+        )
+        self.assertEqual(BorrowedBook.objects.filter(user=self.student, returned=False).count(), 2)
+
+        again = self._borrow([self.shelved.pk])
+        self.assertEqual(again["results"][0]["status"], AlreadyBorrowed.status_code)
+
+    def test_return_stack_restocks(self):
+        self._borrow([self.shelved.pk, self.other.pk])
+        data = self._post("/return/batch/", ["9780306406157", self.other.pk, self.gone.pk])
+
+        self.assertEqual([r["status"] for r in data["results"]], [200, 200, 404])
+        self.assertFalse(BorrowedBook.objects.filter(user=self.student, returned=False).exists())
+        self.assertEqual(Book.objects.get(pk=self.shelved.pk).available_copies, 2)
+
+    def test_impossible_return_date_is_rejected(self):
+        response = self.client.post("/return/batch/", {
+            "user": self.student.user_id, "items": [self.shelved.pk], "returned_on": "2026-02-30",
+        }, format="json")
+        self.assertEqual(response.status_code, 400)
+
+
+class OverdueReportTests(TestCase):
+    def setUp(self):
+        today = timezone.now().date()
+        reference = Category.objects.create(name="Reference")
+        FinePolicy.objects.create(category=reference, rate_per_day=10, max_fine=50)
+        cache.clear()                                   # the cached policy version
+        users = User.objects.bulk_create(User(email=f"late{i}@example.com") for i in range(5))
+        students = StudentProfile.objects.bulk_create(StudentProfile(user=user) for user in users)
+
+        self.loans = {}
+        for i, (name, days_late, category) in enumerate((
+            ("three", 3, None), ("ten", 10, None), ("capped", 30, reference), ("not_due", -2, None),
+        )):
+            book = Book.objects.create(title=name, isbn=f"LATE-{i}", price=1, category=category,
+                                       total_copies=1, available_copies=0)
+            self.loans[name] = BorrowedBook.objects.create(
+                user=students[i], book=book, issue_date=today - timedelta(days=40),
+                return_date=today - timedelta(days=days_late),
+            )
+        self.loans["returned"] = BorrowedBook.objects.create(
+            user=students[4], book=book, issue_date=today - timedelta(days=40),
+            return_date=today - timedelta(days=5), returned=True, actual_return_date=today - timedelta(days=1),
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(users[0])
+
+    def _report(self, **params):
+        response = self.client.get("/borrowed/overdue/", params)
+        self.assertEqual(response.status_code, 200)
+        ids = {loan.pk: name for name, loan in self.loans.items()}
+        return [ids[row["id"]] for row in response.data["results"]], response.data["count"], response.data["total_fine"]
+
+    def test_sorted_by_fine_with_school_wide_total(self):
+        self.assertEqual(self._report(), (["ten", "three", "capped"], 3, Decimal("1350.00")))
+        self.assertEqual(self._report(ordering="-overdue_days")[0], ["capped", "ten", "three"])
+        self.assertEqual(self._report(include_returned="true")[1:], (4, Decimal("1750.00")))
+
+    def test_totals_cover_every_page(self):
+        self.assertEqual(self._report(page_size=2, page=2), (["capped"], 3, Decimal("1350.00")))
+        self.assertEqual(self._report(page_size=2, page=5), ([], 3, Decimal("1350.00")))
+        self.assertEqual(self.client.get("/borrowed/overdue/", {"page": "last"}).status_code, 400)
+
+
+class CirculationUpdateTests(TestCase):
+    """The conditional updates behind checkout / return, on any database."""
+
+    def setUp(self):
+        users = User.objects.bulk_create(User(email=f"desk{i}@example.com") for i in range(3))
+        self.students = StudentProfile.objects.bulk_create(StudentProfile(user=user) for user in users)
+        self.book = Book.objects.create(title="Desk", isbn="DESK-1", price=1, total_copies=2, available_copies=2)
+        self.due = date.today() + timedelta(days=14)
+
+    def _available(self):
+        self.book.refresh_from_db()
+        return self.book.available_copies
+
+    def test_checkout_stops_at_zero(self):
+        for student in self.students[:2]:
+            checkout(student, self.book, date.today(), self.due)
+        with self.assertRaises(NoCopiesAvailable):
+            checkout(self.students[2], self.book, date.today(), self.due)
+        self.assertEqual(self._available(), 0)
+        self.assertFalse(take_copy(self.book.pk))
+        self.assertEqual(BorrowedBook.objects.filter(book=self.book).count(), 2)
+
+    def test_second_open_loan_is_rolled_back(self):
+        checkout(self.students[0], self.book, date.today(), self.due)
+        with self.assertRaises(AlreadyBorrowed):
+            checkout(self.students[0], self.book, date.today(), self.due)
+        self.assertEqual(self._available(), 1)          # the second decrement was undone
+
+    def test_stale_return_restocks_once(self):
+        loan = checkout(self.students[0], self.book, date.today(), self.due)
+        stale = BorrowedBook.objects.get(pk=loan.pk)
+        return_loan(loan)
+        with self.assertRaises(AlreadyReturned):
+            return_loan(stale)
+        self.assertEqual(self._available(), 2)
+
+    def test_put_back_never_exceeds_total(self):
+        self.assertFalse(put_back_copy(self.book.pk))
+        self.assertEqual(self._available(), 2)
+
+
+class ReconcileInventoryTests(TestCase):
+    def setUp(self):
+        users = User.objects.bulk_create(User(email=f"stock{i}@example.com") for i in range(2))
+        self.ada, self.ben = StudentProfile.objects.bulk_create(StudentProfile(user=user) for user in users)
+        self.books = [
+            Book.objects.create(title=f"Stock {i}", isbn=f"STOCK-{i}", price=1, total_copies=3, available_copies=3)
+            for i in range(3)
+        ]
+        self.due = date.today() + timedelta(days=14)
+        reconcile()                                     # start from an empty touch queue
+
+    def _corrupt(self, book, available):
+        Book.objects.filter(pk=book.pk).update(available_copies=available)     # no signal, no touch
+
+    def test_batch_circulation_queues_touches(self):
+        first, second, third = self.books
+        checkout_many(self.ada, [first.pk, second.pk], date.today(), self.due)
+        return_many(self.ada, [first.pk])
+        self.assertEqual(
+            set(BookStockTouch.objects.values_list("book_id", flat=True)), {first.pk, second.pk}
+        )
+
+    def test_incremental_run_repairs_drift_on_touched_books(self):
+        first, second, third = self.books
+        checkout_many(self.ada, [first.pk, second.pk], date.today(), self.due)
+        reconcile()
+        self._corrupt(first, 0)
+        self._corrupt(third, 1)
+        return_many(self.ada, [first.pk])              # touches the first book only
+
+        report = reconcile(incremental=True)
+        self.assertEqual(report.checked, 1)
+        self.assertEqual([(row["id"], row["available_copies"], row["expected"]) for row in report.drift],
+                         [(first.pk, 1, 3)])
+        self.assertEqual(report.repaired, 1)
+        first.refresh_from_db()
+        self.assertEqual(first.available_copies, 3)
+        self.assertFalse(BookStockTouch.objects.exists())
+
+        report = reconcile(dry_run=True)                # untouched drift needs a full run
+        self.assertEqual([row["id"] for row in report.drift], [third.pk])
+        self.assertEqual(report.repaired, 0)
+        self.assertEqual(reconcile().repaired, 1)
+        self.assertEqual(reconcile().drift, [])
+
+    def test_repaired_copy_goes_to_a_waiting_hold(self):
+        book = self.books[0]
+        for student in (self.ada, self.ben):
+            BorrowedBook.objects.create(user=student, book=book, issue_date=date.today(), return_date=self.due)
+        self._corrupt(book, 0)                          # one copy is really on the shelf
+        users = User.objects.bulk_create(User(email=f"queue{i}@example.com") for i in range(2))
+        holds = [place_hold(student, book) for student in StudentProfile.objects.bulk_create(
+            StudentProfile(user=user) for user in users
+        )]
+        return_loan(BorrowedBook.objects.get(user=self.ada, book=book))     # first hold is ready
+
+        self.assertEqual(reconcile(incremental=True).repaired, 1)
+        book.refresh_from_db()
+        self.assertEqual(book.available_copies, 0)
+        self.assertEqual(
+            list(BookHold.objects.filter(pk__in=[h.pk for h in holds]).values_list("status", flat=True)),
+            [BookHold.READY, BookHold.READY],
+        )
+
+
+@override_settings(LOAN_SETTLE_SECONDS=-1)        # every loan counts as settled at once
+class CoBorrowingTests(TestCase):
+    def setUp(self):
+        users = User.objects.bulk_create(User(email=f"reader{i}@example.com") for i in range(6))
+        self.students = StudentProfile.objects.bulk_create(StudentProfile(user=user) for user in users)
+        self.books = [
+            Book.objects.create(title=f"Shelf {i}", isbn=f"SHELF-{i}", price=1, total_copies=9, available_copies=9)
+            for i in range(8)
+        ]
+        self.rng = random.Random(20)
+        cache.clear()
+
+    def _borrow(self, n):
+        BorrowedBook.objects.bulk_create(
+            BorrowedBook(user=self.rng.choice(self.students), book=self.rng.choice(self.books),
+                         return_date=date.today(), returned=True)
+            for _ in range(n)
+        )
+
+    def _matrix(self):
+        return {row.book_id: _row_counts(row) for row in BookCoBorrow.objects.all() if row.counts}
+
+    def _brute_force(self):
+        borrowed = {}
+        for student_id, book_id in BorrowedBook.objects.values_list("user_id", "book_id"):
+            borrowed.setdefault(student_id, set()).add(book_id)
+        pairs = {}
+        for books in borrowed.values():
+            for a in books:
+                for b in books - {a}:
+                    pairs.setdefault(a, {}).setdefault(b, 0)
+                    pairs[a][b] += 1
+        return pairs
+
+    def test_incremental_and_full_builds_match_pair_counts(self):
+        self._borrow(30)
+        update_coborrowing(batch_size=7)
+        self._borrow(30)                                # includes re-borrows of earlier titles
+        update_coborrowing(batch_size=7)
+        expected = self._brute_force()
+        self.assertEqual(self._matrix(), expected)
+
+        self.assertEqual(update_coborrowing(full=True)[0], 60)
+        self.assertEqual(self._matrix(), expected)
+        book_id, neighbours = next(iter(expected.items()))
+        self.assertEqual(co_borrowed(book_id, limit=1)[0][1], max(neighbours.values()))
+
+
+@override_settings(LOAN_SETTLE_SECONDS=-1)
+class CirculationStatsTests(TestCase):
+    def setUp(self):
+        classroom = Classroom.objects.create(name="Form 1", section="B", academic_year="2026")
+        users = User.objects.bulk_create(User(email=f"stats{i}@example.com") for i in range(2))
+        self.students = StudentProfile.objects.bulk_create([
+            StudentProfile(user=users[0], classroom=classroom), StudentProfile(user=users[1]),
+        ])
+        category = Category.objects.create(name="Fiction")
+        self.books = [
+            Book.objects.create(title=f"Stats {i}", isbn=f"STATS-{i}", price=1, category=category if i else None,
+                                total_copies=5, available_copies=5)
+            for i in range(3)
+        ]
+
+    def _loan(self, student, book, issued, due, returned_on=None):
+        return BorrowedBook.objects.create(
+            user=self.students[student], book=self.books[book], issue_date=issued, return_date=due,
+            returned=returned_on is not None, actual_return_date=returned_on,
+        )
+
+    def _rollups(self):
+        return sorted(CirculationMonthlyRollup.objects.values_list(
+            "month", "book_id", "category_id", "classroom_id", *STAT_FIELDS), key=repr)
+
+    def test_incremental_refresh_matches_full_rebuild(self):
+        day_one, day_two = date(2026, 4, 30), date(2026, 5, 1)
+        self._loan(0, 0, date(2026, 2, 10), date(2026, 2, 24), returned_on=date(2026, 2, 20))
+        self._loan(1, 1, date(2026, 3, 5), date(2026, 3, 19))                  # overdue since March
+        due_today = self._loan(0, 2, date(2026, 4, 10), day_one)               # overdue from day two
+        on_time = self._loan(1, 0, date(2026, 4, 20), date(2026, 5, 4))
+        late = self._loan(0, 1, date(2026, 3, 1), date(2026, 3, 15))
+        refresh_stats(today=day_one)
+
+        return_loan(on_time, returned_on=day_two)
+        return_loan(late, returned_on=day_two)
+        self._loan(1, 2, day_two, date(2026, 5, 15))
+        months, _ = refresh_stats(today=day_two)
+        self.assertEqual(months, [date(2026, 4, 1), date(2026, 5, 1)])   # the late return counts in May
+        incremental = self._rollups()
+
+        refresh_stats(full=True, today=day_two)
+        self.assertEqual(incremental, self._rollups())
+        april = CirculationMonthlyRollup.objects.get(month=date(2026, 4, 1), book=due_today.book)
+        self.assertEqual((april.issued, april.overdue), (1, 1))
+
+
+@mock.patch.object(catalog, "SETTLE_SECONDS", -1)          # every change is settled at once
+@mock.patch.object(catalog, "SNAPSHOT_MIN_INTERVAL", 0)
+class CatalogSyncTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category = Category.objects.create(name="Atlases")
+            self.kept, self.dropped = (
+                Book.objects.create(title=title, isbn=f"KIOSK-{i}", price=1, category=self.category,
+                                    total_copies=2, available_copies=2)
+                for i, title in enumerate(("World", "Moon"))
+            )
+        self.client = APIClient()
+
+    def _snapshot(self, etag=None):
+        headers = {"HTTP_IF_NONE_MATCH": etag} if etag else {}
+        response = self.client.get("/catalog/snapshot/", **headers)
+        body = b"".join(response.streaming_content) if response.status_code == 200 else b""
+        return response, json.loads(gzip.decompress(body)) if body else None
+
+    def test_snapshot_plus_delta_equals_the_next_snapshot(self):
+        response, document = self._snapshot()
+        self.assertEqual(response.status_code, 200)
+        etag, version = response["ETag"], int(response["X-Catalog-Version"])
+        self.assertEqual(document["version"], version)
+        self.assertEqual(self._snapshot(etag)[0].status_code, 304)
+
+        dropped_id = self.dropped.pk
+        with self.captureOnCommitCallbacks(execute=True):
+            self.kept.title = "World, revised"
+            self.kept.save()
+            self.dropped.delete()
+        delta = self.client.get("/catalog/changes/", {"since": version}).data
+        self.assertEqual([book["title"] for book in delta["books"]], ["World, revised"])
+        self.assertEqual(delta["deleted"], {"categories": [], "books": [dropped_id]})
+
+        books = {book["id"]: book for book in document["books"]}
+        books.update((book["id"], book) for book in delta["books"])
+        for pk in delta["deleted"]["books"]:
+            del books[pk]
+        response, fresh = self._snapshot(etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual((fresh["version"], fresh["books"]), (delta["version"], [books[pk] for pk in sorted(books)]))
+        self.assertEqual(self.client.get("/catalog/changes/", {"since": delta["version"]}).data["books"], [])
+
+
+@skipUnless(connection.vendor == "postgresql", "concurrency stress tests need PostgreSQL")
+class CirculationStressTests(TransactionTestCase):
+    """Hammer borrow / return from many threads and check the stock invariants."""
+
+    STUDENTS = 200
+
+    def setUp(self):
+        users = User.objects.bulk_create(
+            User(email=f"stress{i}@example.com") for i in range(self.STUDENTS)
+        )
+        self.students = StudentProfile.objects.bulk_create(
+            StudentProfile(user=user) for user in users
+        )
+        self.issue_date = date.today()
+        self.return_date = date.today() + timedelta(days=14)
+
+    def _book(self, copies):
+        return Book.objects.create(
+            title="Stress Test", isbn=f"STRESS-{copies}-{random.random()}"[:20],
+            price=1, total_copies=copies, available_copies=copies,
+        )
+
+    def _borrow(self, student, book):
+        try:
+            return checkout(student, book, self.issue_date, self.return_date)
+        except CirculationError:
+            return None
+
+    def _assert_stock_consistent(self, book):
+        book.refresh_from_db()
+        open_loans = BorrowedBook.objects.filter(book=book, returned=False).count()
+        ready_holds = BookHold.objects.filter(book=book, status=BookHold.READY).count()
+        self.assertGreaterEqual(book.available_copies, 0)
+        self.assertLessEqual(book.available_copies, book.total_copies)
+        self.assertEqual(book.available_copies, book.total_copies - open_loans - ready_holds)
+
+    def _assert_throughput(self, ops, elapsed):
+        self.assertGreaterEqual(
+            ops / elapsed, MIN_OPS_PER_SECOND,
+            f"{ops} circulation calls took {elapsed:.2f}s ({ops / elapsed:.0f} ops/s)",
+        )
+
+    def test_parallel_checkouts_never_oversell(self):
+        book = self._book(copies=10)
+        results, elapsed = _run_parallel(lambda s: self._borrow(s, book), self.students)
+
+        self.assertEqual(sum(r is not None for r in results), 10)
+        self._assert_stock_consistent(book)
+        self._assert_throughput(len(results), elapsed)
+
+    def test_same_student_cannot_open_two_loans(self):
+        book = self._book(copies=50)
+        student = self.students[0]
+        results, _ = _run_parallel(lambda _: self._borrow(student, book), range(50))
+
+        self.assertEqual(sum(r is not None for r in results), 1)
+        self._assert_stock_consistent(book)
+
+    def test_parallel_returns_restock_once(self):
+        book = self._book(copies=1)
+        loan = checkout(self.students[0], book, self.issue_date, self.return_date)
+
+        def give_back(_):
+            try:
+                return_loan(BorrowedBook.objects.get(pk=loan.pk))
+                return True
+            except CirculationError:
+                return False
+
+        results, _ = _run_parallel(give_back, range(50))
+        self.assertEqual(sum(results), 1)
+        self._assert_stock_consistent(book)
+        self.assertEqual(book.available_copies, 1)
+
+    def test_mixed_borrow_and_return_keeps_invariants(self):
+        book = self._book(copies=15)
+        ops = 0
+        lock = threading.Lock()
+
+        def churn(student):
+            nonlocal ops
+            done = 0
+            for _ in range(5):
+                loan = self._borrow(student, book)
+                done += 1
+                if loan is not None and random.random() < 0.8:
+                    try:
+                        return_loan(loan)
+                    except CirculationError:
+                        pass
+                    done += 1
+            with lock:
+                ops += done
+
+        _, elapsed = _run_parallel(churn, self.students)
+        self.assertGreaterEqual(ops, 5 * self.STUDENTS)     # every worker ran all its borrows
+        self._assert_stock_consistent(book)
+        self._assert_throughput(ops, elapsed)
+
+    def test_parallel_returns_serve_hold_queue_in_order(self):
+        book = self._book(copies=20)
+        loans = [checkout(s, book, self.issue_date, self.return_date) for s in self.students[:20]]
+        waiting = [place_hold(s, book) for s in self.students[20:60]]
+
+        _run_parallel(return_loan, loans)
+
+        ready = set(BookHold.objects.filter(book=book, status=BookHold.READY).values_list("pk", flat=True))
+        self.assertEqual(ready, {hold.pk for hold in waiting[:20]})   # first come, first served
+        self._assert_stock_consistent(book)
+        self.assertEqual(book.available_copies, 0)
+
+
+class FlakyBackend(EmailBackend):
+    """locmem backend that refuses one address, or every connection while `down`."""
+    down = False
+
+    def open(self):
+        if FlakyBackend.down:
+            raise ConnectionRefusedError("mail server unreachable")
+        return super().open()
+
+    def send_messages(self, messages):
+        if any("bounce@" in address for message in messages for address in message.to):
+            raise OSError("mailbox unavailable")
+        return super().send_messages(messages)
+
+
+@override_settings(EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend")
+class OverdueReminderTests(TestCase):
+    def setUp(self):
+        self.today = date(2026, 3, 20)
+        users = User.objects.bulk_create(
+            User(email=email) for email in ("ada@example.com", "ben@example.com", "bounce@example.com")
+        )
+        self.ada, self.ben, self.bounce = StudentProfile.objects.bulk_create(StudentProfile(user=u) for u in users)
+        books = [
+            Book.objects.create(title=f"Overdue {i}", isbn=f"OVERDUE-{i}", price=1, total_copies=5, available_copies=4)
+            for i in range(3)
+        ]
+        for student, book, days_late in (
+            (self.ada, books[0], 3), (self.ada, books[1], 10), (self.ben, books[2], 1),
+        ):
+            BorrowedBook.objects.create(
+                user=student, book=book, issue_date=self.today - timedelta(days=30),
+                return_date=self.today - timedelta(days=days_late),
+            )
+        BorrowedBook.objects.create(                    # not yet due: no reminder
+            user=self.ben, book=books[0], issue_date=self.today, return_date=self.today + timedelta(days=7),
+        )
+
+    def test_one_reminder_per_student_across_chunks(self):
+        report = queue_reminders(today=self.today, chunk_size=1)
+
+        self.assertEqual((report.loans, report.students, report.queued, report.skipped), (3, 2, 2, 0))
+        ada = OverdueReminder.objects.get(student=self.ada)
+        self.assertEqual(ada.loans, 2)
+        self.assertIn("Overdue 0", ada.body)
+        self.assertIn("Overdue 1", ada.body)
+        self.assertEqual(deliver_reminders(), (2, 0))
+        self.assertEqual(sorted(m.to[0] for m in mail.outbox), ["ada@example.com", "ben@example.com"])
+
+    def test_second_run_on_the_same_day_sends_nothing_new(self):
+        queue_reminders(today=self.today)
+        deliver_reminders()
+        report = queue_reminders(today=self.today)
+
+        self.assertEqual((report.queued, report.skipped), (0, 2))
+        self.assertEqual(deliver_reminders(), (0, 0))
+        self.assertEqual(len(mail.outbox), 2)
+
+    @override_settings(EMAIL_BACKEND="library.tests.FlakyBackend")
+    def test_failed_sends_are_retried_then_marked_failed(self):
+        BorrowedBook.objects.create(
+            user=self.bounce, book=Book.objects.get(isbn="OVERDUE-0"),
+            issue_date=self.today - timedelta(days=30), return_date=self.today - timedelta(days=2),
+        )
+        queue_reminders(today=self.today)
+
+        with redirect_stdout(StringIO()):               # the [ERROR] lines
+            self.assertEqual(deliver_reminders(max_attempts=2), (2, 0))
+            bounced = OverdueReminder.objects.get(student=self.bounce)
+            self.assertEqual((bounced.status, bounced.attempts), (OverdueReminder.PENDING, 1))
+            self.assertEqual(deliver_reminders(max_attempts=2), (0, 1))
+        bounced.refresh_from_db()
+        self.assertEqual((bounced.status, bounced.attempts), (OverdueReminder.FAILED, 2))
+        self.assertIn("mailbox unavailable", bounced.last_error)
+
+    @override_settings(EMAIL_BACKEND="library.tests.FlakyBackend")
+    def test_unreachable_server_counts_an_attempt(self):
+        queue_reminders(today=self.today)
+        FlakyBackend.down = True
+        try:
+            with redirect_stdout(StringIO()):
+                self.assertEqual(deliver_reminders(max_attempts=3), (0, 0))
+        finally:
+            FlakyBackend.down = False
+        self.assertEqual(
+            set(OverdueReminder.objects.values_list("status", "attempts")), {(OverdueReminder.PENDING, 1)}
+        )
+        self.assertEqual(deliver_reminders(max_attempts=3), (2, 0))
+
+    def test_impossible_date_is_a_command_error(self):
+        with self.assertRaises(CommandError):
+            call_command("send_overdue_reminders", "--date", "2026-02-30")
@@ -3,18 +3,62 @@ from .views import (
     CategoryListCreateAPIView,
     BookListCreateAPIView,
     BookDetailAPIView,
+    BookFileDownloadAPIView,
+    BookAlsoBorrowedAPIView,
+    BookSearchAPIView,
+    BookImportAPIView,
     BorrowBookCreateView,
     ReturnBookAPIView,
+    BorrowBatchAPIView,
+    ReturnBatchAPIView,
     MyBorrowedBooksAPIView,
-    AllBorrowedBooksAPIView
+    AllBorrowedBooksAPIView,
+    OverdueReportAPIView,
+    FinesReportAPIView,
+    InventoryDriftReportAPIView,
+    BookHoldCreateAPIView,
+    MyHoldsAPIView,
+    CancelHoldAPIView,
+    BookHoldQueueAPIView,
+    FinePolicyListCreateAPIView,
+    FinePolicyDetailAPIView,
+    SchoolHolidayListCreateAPIView,
+    CatalogSnapshotAPIView,
+    CatalogChangesAPIView,
+    CirculationTopBooksAPIView,
+    CirculationCategoryTrendsAPIView,
+    CirculationClassroomsAPIView,
+    SchoolHolidayDetailAPIView,
 )
 
 urlpatterns = [
     path('categories/', CategoryListCreateAPIView.as_view(), name='category-list-create'),
     path('books/', BookListCreateAPIView.as_view(), name='book-list-create'),
+    path('books/import/', BookImportAPIView.as_view(), name='book-import'),
+    path('books/search/', BookSearchAPIView.as_view(), name='book-search'),
     path('books/<int:pk>/', BookDetailAPIView.as_view(), name='book-detail'),
+    path('books/<int:pk>/file/', BookFileDownloadAPIView.as_view(), name='book-file'),
+    path('books/<int:pk>/also-borrowed/', BookAlsoBorrowedAPIView.as_view(), name='book-also-borrowed'),
+    path('books/<int:pk>/holds/', BookHoldQueueAPIView.as_view(), name='book-hold-queue'),
+    path('catalog/snapshot/', CatalogSnapshotAPIView.as_view(), name='catalog-snapshot'),
+    path('catalog/changes/', CatalogChangesAPIView.as_view(), name='catalog-changes'),
+    path('holds/', BookHoldCreateAPIView.as_view(), name='hold-create'),
+    path('holds/mine/', MyHoldsAPIView.as_view(), name='my-holds'),
+    path('holds/<int:pk>/cancel/', CancelHoldAPIView.as_view(), name='hold-cancel'),
     path('borrow/', BorrowBookCreateView.as_view(), name='borrow-book'),  # ✅ Correct endpoint
     path('return/<int:pk>/', ReturnBookAPIView.as_view(), name='return-book'),
+    path('borrow/batch/', BorrowBatchAPIView.as_view(), name='borrow-batch'),
+    path('return/batch/', ReturnBatchAPIView.as_view(), name='return-batch'),
     path('my-borrowed/', MyBorrowedBooksAPIView.as_view(), name='my-borrowed-books'),
     path('borrowed/all/', AllBorrowedBooksAPIView.as_view(), name='all-borrowed-books'),
+    path('borrowed/overdue/', OverdueReportAPIView.as_view(), name='overdue-report'),
+    path('borrowed/fines/', FinesReportAPIView.as_view(), name='fines-report'),
+    path('inventory/drift/', InventoryDriftReportAPIView.as_view(), name='inventory-drift'),
+    path('stats/top-books/', CirculationTopBooksAPIView.as_view(), name='stats-top-books'),
+    path('stats/categories/', CirculationCategoryTrendsAPIView.as_view(), name='stats-categories'),
+    path('stats/classrooms/', CirculationClassroomsAPIView.as_view(), name='stats-classrooms'),
+    path('fine-policies/', FinePolicyListCreateAPIView.as_view(), name='fine-policy-list-create'),
+    path('fine-policies/<int:pk>/', FinePolicyDetailAPIView.as_view(), name='fine-policy-detail'),
+    path('holidays/', SchoolHolidayListCreateAPIView.as_view(), name='holiday-list-create'),
+    path('holidays/<int:pk>/', SchoolHolidayDetailAPIView.as_view(), name='holiday-detail'),
 ]
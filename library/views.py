@@ -1,17 +1,44 @@
 # library/views.py
-from django.db import transaction
-from django.utils import timezone
+from decimal import Decimal
+
+from django.db.models import Count, Sum, Window
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.dateparse import parse_date
 from rest_framework import permissions, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from django.contrib.auth import get_user_model
 
-from .models import Book, BorrowedBook, Category
+from .catalog import VersionTooOld, changes_since, current_snapshot
+from .circulation import (
+    MAX_BATCH_ITEMS,
+    CirculationError,
+    cancel_hold,
+    checkout,
+    checkout_many,
+    expire_holds,
+    place_hold,
+    return_loan,
+    return_many,
+)
+from mediastore.storage import display_name
+from myschoolapp.protected_media import serve_protected_file
+
+from .fines import price_loans
+from .importer import ImportFormatError, guess_format, import_catalog
+from .inventory import drifted
+from .recommendations import TOP_K, co_borrowed
+from .search import search_books
+from .stats import SUMS, rollups_between, summarize, with_average
+from .models import Book, BookHold, BorrowedBook, Category, FinePolicy, SchoolHoliday
 from .serializers import (
+    BookHoldSerializer,
     BookSerializer,
     BorrowedBookSerializer,
     CategorySerializer,
+    FinePolicySerializer,
+    SchoolHolidaySerializer,
 )
 from portalaccount.models import StudentProfile
 
@@ -54,6 +81,121 @@ class BookListCreateAPIView(APIView):
         return Response(ser.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class BookImportAPIView(APIView):
+    """
+    POST multipart { file, format?: csv | marc, dry_run?: true }
+    Streams the file into the catalog (see library.importer). An unreadable
+    file gives 400; when that shows part-way through, `result.committed_rows`
+    records before the error were already imported.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        upload = request.FILES.get("file")
+        if not upload:
+            return Response({"detail": "Missing field(s): file"}, status=status.HTTP_400_BAD_REQUEST)
+
+        fmt = request.data.get("format") or guess_format(upload.name)
+        try:
+            result = import_catalog(upload, fmt, dry_run=request.data.get("dry_run") == "true")
+        except ImportFormatError as exc:
+            body = {"detail": str(exc)}
+            if exc.result is not None and exc.result.rows:
+                # chunks before the error are committed: committed_rows says how far
+                body["result"] = exc.result.as_dict()
+            return Response(body, status=status.HTTP_400_BAD_REQUEST)
+        return Response(result.as_dict())
+
+
+class BookSearchAPIView(APIView):
+    """
+    Ranked catalog search over title, author, publisher, description,
+    ISBN and category name.
+
+    Query params: q (required), page (default 1), page_size (default 20, max 100)
+    Each hit is the book plus `rank` and a `headline` with <mark>ed matches.
+    """
+    permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    PAGE_SIZE = 20
+    MAX_PAGE_SIZE = 100
+
+    def get(self, request):
+        query = (request.query_params.get("q") or "").strip()
+        if not query:
+            return Response({"detail": "q is required."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            page = max(1, int(request.query_params.get("page", 1)))
+            page_size = min(self.MAX_PAGE_SIZE, max(1, int(request.query_params.get("page_size", self.PAGE_SIZE))))
+        except ValueError:
+            return Response({"detail": "page and page_size must be integers."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        total, hits = search_books(query, offset=(page - 1) * page_size, limit=page_size)
+        results = []
+        for book, rank, headline in hits:
+            row = BookSerializer(book).data
+            row["rank"] = rank
+            row["headline"] = headline
+            results.append(row)
+        return Response({
+            "count": total,
+            "page": page,
+            "page_size": page_size,
+            "results": results,
+        })
+
+
+class BookAlsoBorrowedAPIView(APIView):
+    """
+    "Students who borrowed this also borrowed": the titles most often
+    borrowed by the same students, from the co-borrowing matrix kept up to
+    date by `manage.py update_coborrowing`.
+
+    Query params: limit (default 10, max 50)
+    Each result is the book plus `co_borrowers` (number of students).
+    """
+    permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    LIMIT = 10
+
+    def get(self, request, pk):
+        book = get_object_or_404(Book.objects.only("id"), pk=pk)
+        try:
+            limit = min(TOP_K, max(1, int(request.query_params.get("limit", self.LIMIT))))
+        except ValueError:
+            return Response({"detail": "limit must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
+
+        # over-fetch a little: neighbours may have been deleted from the catalog
+        top = co_borrowed(book.pk, limit=TOP_K)
+        books = Book.objects.select_related("category").in_bulk([book_id for book_id, _ in top])
+        results = []
+        for book_id, students in top:
+            if book_id in books:
+                row = BookSerializer(books[book_id]).data
+                row["co_borrowers"] = students
+                results.append(row)
+                if len(results) == limit:
+                    break
+        return Response({"book": book.pk, "results": results})
+
+
+class BookFileDownloadAPIView(APIView):
+    """The book's file for signed-in users, with Range / ETag support (inline by default)."""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, pk):
+        book = get_object_or_404(Book.objects.only("id", "title", "file"), pk=pk)
+        if not book.file:
+            return Response({"detail": "No file attached."}, status=status.HTTP_404_NOT_FOUND)
+        try:
+            return serve_protected_file(
+                request, book.file,
+                as_attachment=request.query_params.get("download") == "true",
+                filename=display_name(book.file.name, book.title),
+            )
+        except FileNotFoundError:
+            return Response({"detail": "File not found."}, status=status.HTTP_404_NOT_FOUND)
+
+
 class BookDetailAPIView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
@@ -75,6 +217,54 @@ class BookDetailAPIView(APIView):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
+# ------------------------------------------------------------------
+# KIOSK CATALOG  – versioned snapshot + deltas (library.catalog)
+# ------------------------------------------------------------------
+class CatalogSnapshotAPIView(APIView):
+    """
+    The whole catalog as gzipped JSON, served with a strong ETag (send
+    If-None-Match to skip an unchanged download). X-Catalog-Version is the
+    version to pass to catalog/changes/ afterwards.
+    """
+    permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+
+    def get(self, request):
+        snapshot = current_snapshot()
+        response = serve_protected_file(
+            request, snapshot.file, as_attachment=False, filename=f"catalog-{snapshot.version}.json.gz"
+        )
+        if response.status_code in (200, 206):
+            response["Content-Type"] = "application/gzip"
+        response["X-Catalog-Version"] = str(snapshot.version)
+        return response
+
+
+class CatalogChangesAPIView(APIView):
+    """
+    Books and categories changed after a catalog version, plus deleted ids.
+
+    Query params: since=<version> (required)
+    410 means the version is too old to catch up on: download the snapshot.
+    """
+    permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+
+    def get(self, request):
+        try:
+            since = int(request.query_params.get("since", ""))
+        except ValueError:
+            since = -1
+        if since < 0:
+            return Response({"detail": "since (a catalog version) is required."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        try:
+            return Response(changes_since(since))
+        except VersionTooOld:
+            return Response(
+                {"detail": "This catalog version is too old; download catalog/snapshot/ again."},
+                status=status.HTTP_410_GONE,
+            )
+
+
 # ------------------------------------------------------------------
 # BORROW  /  RETURN
 # ------------------------------------------------------------------
@@ -108,7 +298,8 @@ class BorrowBookCreateView(APIView):
 
         book = get_object_or_404(Book, pk=request.data["book"])
 
-        # --- guard: already borrowed & not yet returned --------------------------
+        # --- fast path: already borrowed & not yet returned -----------------------
+        # (the open-loan constraint still catches a concurrent duplicate)
         already = BorrowedBook.objects.filter(
             user=student, book=book, returned=False
         ).exists()
@@ -118,25 +309,17 @@ class BorrowBookCreateView(APIView):
                 status=status.HTTP_409_CONFLICT,
             )
 
-        # --- guard: copies available --------------------------------------------
-        if book.available_copies <= 0:
-            return Response(
-                {"detail": "No available copies of this book."},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
-
-        # --- create borrow record atomically ------------------------------------
-        with transaction.atomic():
-            borrow = BorrowedBook.objects.create(
-                user=student,
-                book=book,
+        # --- take a copy (or the student's ready hold) + create the loan ----------
+        expire_holds(book_ids=[book.pk])    # lapsed reservations free their copies
+        try:
+            borrow = checkout(
+                student,
+                book,
                 issue_date=request.data["issue_date"],
                 return_date=request.data["return_date"],
-                returned=False,
             )
-            # only now decrement stock
-            book.available_copies -= 1
-            book.save(update_fields=["available_copies"])
+        except CirculationError as exc:
+            return Response({"detail": exc.detail}, status=exc.status_code)
 
         ser = BorrowedBookSerializer(borrow)
         if DEBUG_BORROW:
@@ -148,23 +331,164 @@ class ReturnBookAPIView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def post(self, request, pk):
-        borrow = get_object_or_404(BorrowedBook, pk=pk)
+        borrow = get_object_or_404(BorrowedBook.objects.select_related("user__user", "book"), pk=pk)
 
-        if borrow.returned:
-            return Response(
-                {"detail": "Book already returned."},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
+        try:
+            return_loan(borrow)
+        except CirculationError as exc:
+            return Response({"detail": exc.detail}, status=exc.status_code)
 
-        with transaction.atomic():
-            borrow.actual_return_date = timezone.now().date()
-            borrow.returned = True
-            borrow.save(update_fields=["actual_return_date", "returned"])
+        return Response(BorrowedBookSerializer(borrow).data)
 
-            borrow.book.available_copies += 1
-            borrow.book.save(update_fields=["available_copies"])
 
-        return Response(BorrowedBookSerializer(borrow).data)
+# ------------------------------------------------------------------
+# DESK BATCHES  – scan a stack of books for one student
+# ------------------------------------------------------------------
+def _desk_batch(request):
+    """(student, items, error Response or None) from a batch payload."""
+    items = request.data.get("items")
+    if not request.data.get("user") or not isinstance(items, list) or not items:
+        return None, None, Response({"detail": "user and a non-empty items list are required."},
+                                    status=status.HTTP_400_BAD_REQUEST)
+    if len(items) > MAX_BATCH_ITEMS:
+        return None, None, Response({"detail": f"At most {MAX_BATCH_ITEMS} items per batch."},
+                                    status=status.HTTP_400_BAD_REQUEST)
+    if any(not isinstance(item, (int, str)) or isinstance(item, bool) for item in items):
+        return None, None, Response({"detail": "items must be book ids or ISBNs."},
+                                    status=status.HTTP_400_BAD_REQUEST)
+    # user, student profile and its user row in one query
+    student = StudentProfile.objects.select_related("user").filter(user_id=request.data["user"]).first()
+    if student is None:
+        return None, None, Response({"detail": "Student profile not found."}, status=status.HTTP_404_NOT_FOUND)
+    return student, items, None
+
+
+def _batch_response(results, loans):
+    rendered = dict(zip((loan.pk for loan in loans), BorrowedBookSerializer(loans, many=True).data))
+    done = 0
+    for result in results:
+        loan = result.pop("loan", None)
+        if loan is not None:
+            result["loan"] = rendered[loan.pk]
+            done += 1
+    return Response({"processed": done, "failed": len(results) - done, "results": results})
+
+
+class BorrowBatchAPIView(APIView):
+    """
+    POST { user, items: [book id | ISBN, ...], issue_date, return_date }
+    Issues every scanned book to the student in one transaction. Each item
+    gets its own result: status 201 with the loan, or an error status and
+    detail (unknown book, already issued, no copies, scanned twice).
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        student, items, error = _desk_batch(request)
+        if error:
+            return error
+        missing = [f for f in ("issue_date", "return_date") if not request.data.get(f)]
+        if missing:
+            return Response({"detail": f"Missing field(s): {', '.join(missing)}"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        results, loans = checkout_many(
+            student, items, request.data["issue_date"], request.data["return_date"]
+        )
+        return _batch_response(results, loans)
+
+
+class ReturnBatchAPIView(APIView):
+    """
+    POST { user, items: [book id | ISBN, ...], returned_on? }
+    Closes the student's open loans for every scanned book; each item gets
+    status 200 with the closed loan (and its fine) or an error.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        student, items, error = _desk_batch(request)
+        if error:
+            return error
+        returned_on = request.data.get("returned_on")
+        if returned_on:
+            try:
+                returned_on = parse_date(str(returned_on))
+            except ValueError:                  # well formed but impossible, e.g. 2026-02-30
+                returned_on = None
+            if returned_on is None:
+                return Response({"detail": "returned_on must be YYYY-MM-DD."},
+                                status=status.HTTP_400_BAD_REQUEST)
+        results, loans = return_many(student, items, returned_on)
+        return _batch_response(results, loans)
+
+
+# ------------------------------------------------------------------
+# HOLDS
+# ------------------------------------------------------------------
+class BookHoldCreateAPIView(APIView):
+    """
+    POST { book, user? } – join the queue for a book with no copies left.
+    `user` (a user id) lets staff place a hold for a student; it defaults
+    to the requesting student.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        if not request.data.get("book"):
+            return Response({"detail": "Missing field(s): book"}, status=status.HTTP_400_BAD_REQUEST)
+
+        user_obj = get_object_or_404(User, pk=request.data.get("user") or request.user.pk)
+        try:
+            student = user_obj.student_profile
+        except StudentProfile.DoesNotExist:
+            return Response({"detail": "Student profile not found."}, status=404)
+        book = get_object_or_404(Book, pk=request.data["book"])
+
+        expire_holds(book_ids=[book.pk])
+        try:
+            hold = place_hold(student, book)
+        except CirculationError as exc:
+            return Response({"detail": exc.detail}, status=exc.status_code)
+
+        hold = BookHold.objects.with_position().select_related("book").get(pk=hold.pk)
+        return Response(BookHoldSerializer(hold).data, status=status.HTTP_201_CREATED)
+
+
+class MyHoldsAPIView(APIView):
+    """The requesting student's holds; ?all=true also lists closed ones."""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        student = get_object_or_404(StudentProfile, user=request.user)
+        qs = BookHold.objects.filter(user=student)
+        if request.query_params.get("all") != "true":
+            qs = qs.active()
+        qs = qs.with_position().select_related("book").order_by("-created_at", "-id")
+        return Response(BookHoldSerializer(qs, many=True).data)
+
+
+class CancelHoldAPIView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, pk):
+        hold = get_object_or_404(BookHold.objects.select_related("book", "user"), pk=pk)
+        if hold.user.user_id != request.user.pk and not request.user.is_staff:
+            return Response({"detail": "Not your hold."}, status=status.HTTP_403_FORBIDDEN)
+        try:
+            cancel_hold(hold)
+        except CirculationError as exc:
+            return Response({"detail": exc.detail}, status=exc.status_code)
+        return Response(BookHoldSerializer(hold).data)
+
+
+class BookHoldQueueAPIView(APIView):
+    """Active holds on one book, in queue order."""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, pk):
+        book = get_object_or_404(Book, pk=pk)
+        qs = book.holds.active().with_position().select_related("book").order_by("created_at", "id")
+        return Response(BookHoldSerializer(qs, many=True).data)
 
 
 # ------------------------------------------------------------------
@@ -175,7 +499,11 @@ class MyBorrowedBooksAPIView(APIView):
 
     def get(self, request):
         student = get_object_or_404(StudentProfile, user=request.user)
-        qs = BorrowedBook.objects.filter(user=student).select_related("book")
+        qs = (
+            BorrowedBook.objects.filter(user=student)
+            .select_related("user__user", "book")
+            .with_overdue()
+        )
         return Response(BorrowedBookSerializer(qs, many=True).data)
 
 
@@ -185,7 +513,336 @@ class AllBorrowedBooksAPIView(APIView):
     def get(self, request):
         qs = (
             BorrowedBook.objects.filter(returned=False)
-            .select_related("user", "book")
+            .select_related("user__user", "book")
+            .with_overdue()
             .order_by("-issue_date")
         )
         return Response(BorrowedBookSerializer(qs, many=True).data)
+
+
+class OverdueReportAPIView(APIView):
+    """
+    Overdue loans with fines, filtered, sorted, paged and totalled in one
+    query. Fines are priced in SQL by the fine policies (with_fines()).
+
+    Query params:
+        include_returned=true   also list loans that were returned late
+        ordering=-fine | fine | -overdue_days | overdue_days | return_date
+        book=<id>, student=<student profile id>
+        page=<n> (from 1), page_size=<n> (default 100, at most 500)
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    ORDERINGS = {
+        "fine": ("fine_sql", "id"),
+        "-fine": ("-fine_sql", "id"),
+        "overdue_days": ("overdue_days_sql", "id"),
+        "-overdue_days": ("-overdue_days_sql", "id"),
+        "return_date": ("return_date", "id"),
+    }
+    PAGE_SIZE = 100
+    MAX_PAGE_SIZE = 500
+
+    def get(self, request):
+        try:
+            page = int(request.query_params.get("page", 1))
+            page_size = int(request.query_params.get("page_size", self.PAGE_SIZE))
+        except ValueError:
+            return Response({"detail": "page and page_size must be integers."}, status=status.HTTP_400_BAD_REQUEST)
+        page = max(page, 1)
+        page_size = max(1, min(page_size, self.MAX_PAGE_SIZE))
+
+        if request.query_params.get("include_returned") == "true":
+            qs = BorrowedBook.objects.with_fines().filter(is_overdue_sql=True)
+        else:
+            today = timezone.now().date()
+            qs = BorrowedBook.objects.filter(returned=False, return_date__lt=today).with_fines(today)
+
+        for param, field in (("book", "book_id"), ("student", "user_id")):
+            value = request.query_params.get(param)
+            if value:
+                qs = qs.filter(**{field: value})
+
+        ordering = self.ORDERINGS.get(request.query_params.get("ordering"), self.ORDERINGS["-fine"])
+        matching = qs
+        qs = (
+            qs.select_related("user__user", "book")
+            # totals over every matching row ride along on the page – still a single query
+            .annotate(
+                total_fine=Window(Sum("fine_sql")),
+                total_count=Window(Count("id")),
+            )
+            .order_by(*ordering)
+        )
+        offset = (page - 1) * page_size
+        rows = list(qs[offset:offset + page_size])
+        if rows:
+            count, total = rows[0].total_count, rows[0].total_fine
+        else:                                   # past the last page
+            totals = matching.order_by().aggregate(count=Count("id"), total=Sum("fine_sql"))
+            count, total = totals["count"], totals["total"]
+        return Response({
+            "count": count,
+            "total_fine": Decimal(total or 0).quantize(Decimal("0.01")),
+            "page": page,
+            "page_size": page_size,
+            "results": BorrowedBookSerializer(rows, many=True).data,
+        })
+
+
+class InventoryDriftReportAPIView(APIView):
+    """
+    Books whose available_copies disagrees with total copies minus open
+    loans and ready holds (read only; `manage.py reconcile_inventory`
+    repairs them).
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        rows = drifted()
+        return Response({"count": len(rows), "results": rows})
+
+
+class FinesReportAPIView(APIView):
+    """
+    End-of-term fines: every loan due in [date_from, date_to] that was or is
+    late, priced in one pass and totalled per student.
+
+    Query params: date_from, date_to (YYYY-MM-DD, required), student=<profile id>
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        try:
+            date_from = parse_date(request.query_params.get("date_from") or "")
+            date_to = parse_date(request.query_params.get("date_to") or "")
+        except ValueError:
+            date_from = date_to = None
+        if not date_from or not date_to or date_to < date_from:
+            return Response(
+                {"detail": "date_from and date_to (YYYY-MM-DD) are required."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        qs = (
+            BorrowedBook.objects.with_overdue()
+            .filter(is_overdue_sql=True, return_date__gte=date_from, return_date__lte=date_to)
+            .select_related("user__user", "book")
+        )
+        if request.query_params.get("student"):
+            qs = qs.filter(user_id=request.query_params["student"])
+
+        rows = list(qs)
+        price_loans(rows)
+
+        students = {}
+        for loan in rows:
+            entry = students.setdefault(loan.user_id, {
+                "student": loan.user_id,
+                "student_name": loan.user.user.get_full_name(),
+                "loans": 0,
+                "outstanding": 0,
+                "fine": Decimal(0),
+            })
+            entry["loans"] += 1
+            entry["outstanding"] += not loan.returned
+            entry["fine"] += loan.fine
+
+        results = sorted(students.values(), key=lambda e: (-e["fine"], e["student"]))
+        return Response({
+            "date_from": date_from,
+            "date_to": date_to,
+            "total_fine": sum((e["fine"] for e in results), Decimal(0)),
+            "students": results,
+        })
+
+
+# ------------------------------------------------------------------
+# STATISTICS  – read from CirculationMonthlyRollup (library.stats)
+# ------------------------------------------------------------------
+def _stats_range(request):
+    """(date_from, date_to, error). Both optional; ranges are widened to whole months."""
+    raw_from = request.query_params.get("date_from") or ""
+    raw_to = request.query_params.get("date_to") or ""
+    try:
+        date_from, date_to = parse_date(raw_from), parse_date(raw_to)
+    except ValueError:
+        date_from = date_to = None
+    if (raw_from and not date_from) or (raw_to and not date_to) or (
+        date_from and date_to and date_to < date_from
+    ):
+        return None, None, Response(
+            {"detail": "date_from / date_to must be YYYY-MM-DD with date_from <= date_to."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    return date_from, date_to, None
+
+
+class CirculationTopBooksAPIView(APIView):
+    """
+    Most borrowed titles with return / overdue counts and average loan length.
+
+    Query params: date_from, date_to, category=<id>, limit (default 10, max 100)
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        date_from, date_to, error = _stats_range(request)
+        if error:
+            return error
+        try:
+            limit = min(max(int(request.query_params.get("limit", 10)), 1), 100)
+        except ValueError:
+            limit = 10
+
+        rollups = rollups_between(date_from, date_to)
+        if request.query_params.get("category"):
+            rollups = rollups.filter(category_id=request.query_params["category"])
+        rows = (
+            rollups.values("book_id", "book__title", "book__author")
+            .annotate(**SUMS)
+            .order_by("-issued", "book_id")[:limit]
+        )
+        return Response({
+            "date_from": date_from,
+            "date_to": date_to,
+            "totals": summarize(rollups),
+            "results": [
+                {"book": r["book_id"], "title": r["book__title"], "author": r["book__author"], **with_average(r)}
+                for r in rows
+            ],
+        })
+
+
+class CirculationCategoryTrendsAPIView(APIView):
+    """
+    Loans per category per month.
+
+    Query params: date_from, date_to, category=<id>
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        date_from, date_to, error = _stats_range(request)
+        if error:
+            return error
+        rollups = rollups_between(date_from, date_to)
+        if request.query_params.get("category"):
+            rollups = rollups.filter(category_id=request.query_params["category"])
+
+        categories = {}
+        rows = (
+            rollups.values("category_id", "category__name", "month")
+            .annotate(**SUMS)
+            .order_by("category__name", "category_id", "month")
+        )
+        for r in rows:
+            entry = categories.setdefault(r["category_id"], {
+                "category": r["category_id"],
+                "category_name": r["category__name"] or "Uncategorised",
+                "months": [],
+            })
+            entry["months"].append({"month": r["month"], **with_average(r)})
+        return Response({
+            "date_from": date_from,
+            "date_to": date_to,
+            "totals": summarize(rollups),
+            "categories": list(categories.values()),
+        })
+
+
+class CirculationClassroomsAPIView(APIView):
+    """
+    Borrowing per classroom of the borrowing student.
+
+    Query params: date_from, date_to, academic_year=<e.g. 2025>
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        date_from, date_to, error = _stats_range(request)
+        if error:
+            return error
+        rollups = rollups_between(date_from, date_to)
+        if request.query_params.get("academic_year"):
+            rollups = rollups.filter(classroom__academic_year=request.query_params["academic_year"])
+
+        rows = (
+            rollups.values("classroom_id", "classroom__name", "classroom__section")
+            .annotate(**SUMS)
+            .order_by("-issued", "classroom_id")
+        )
+        return Response({
+            "date_from": date_from,
+            "date_to": date_to,
+            "totals": summarize(rollups),
+            "results": [
+                {
+                    "classroom": r["classroom_id"],
+                    "classroom_name": " ".join(filter(None, (r["classroom__name"], r["classroom__section"])))
+                    or "No classroom",
+                    **with_average(r),
+                }
+                for r in rows
+            ],
+        })
+
+
+# ------------------------------------------------------------------
+# FINE POLICIES  /  HOLIDAYS
+# ------------------------------------------------------------------
+class FinePolicyListCreateAPIView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        qs = FinePolicy.objects.select_related("category").order_by("category__name")
+        return Response(FinePolicySerializer(qs, many=True).data)
+
+    def post(self, request):
+        ser = FinePolicySerializer(data=request.data)
+        if ser.is_valid():
+            ser.save()
+            return Response(ser.data, status=status.HTTP_201_CREATED)
+        return Response(ser.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class FinePolicyDetailAPIView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_object(self, pk):
+        return get_object_or_404(FinePolicy, pk=pk)
+
+    def get(self, request, pk):
+        return Response(FinePolicySerializer(self.get_object(pk)).data)
+
+    def put(self, request, pk):
+        ser = FinePolicySerializer(self.get_object(pk), data=request.data, partial=True)
+        if ser.is_valid():
+            ser.save()
+            return Response(ser.data)
+        return Response(ser.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    def delete(self, request, pk):
+        self.get_object(pk).delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class SchoolHolidayListCreateAPIView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        return Response(SchoolHolidaySerializer(SchoolHoliday.objects.all(), many=True).data)
+
+    def post(self, request):
+        ser = SchoolHolidaySerializer(data=request.data)
+        if ser.is_valid():
+            ser.save()
+            return Response(ser.data, status=status.HTTP_201_CREATED)
+        return Response(ser.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class SchoolHolidayDetailAPIView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def delete(self, request, pk):
+        get_object_or_404(SchoolHoliday, pk=pk).delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,153 @@
+"""
+Derivative images (thumbnails, WebP) for uploaded pictures.
+
+Variants live next to the media pool, keyed by the source content:
+
+    derivatives/<key[:2]>/<key>/thumb.jpg, thumb.webp, medium.jpg, ...
+
+where `key` is the SHA-256 of a content-addressed source (so identical
+uploads share their variants too) or of the file name for legacy files.
+Nothing needs to be stored on the model: URLs follow from the source name.
+
+Rendering happens after the saving transaction commits, in a process pool
+(IMAGE_PIPELINE_WORKERS processes, started with "spawn"), so the request
+returns as soon as the original is stored. Until the variants exist the
+URLs fall back to the original picture. IMAGE_PIPELINE_WORKERS = 0 renders
+inline instead (management commands, tests).
+
+`manage.py build_image_variants` backfills variants for existing pictures.
+"""
+import hashlib
+import multiprocessing
+import os
+import shutil
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_save
+
+from .imaging import VARIANTS, render_variants, variant_filename
+from .storage import media_storage, sha256_from_name
+
+DERIVATIVES_DIR = 'derivatives'
+WORKERS = getattr(settings, 'IMAGE_PIPELINE_WORKERS', 2)
+
+_pool = None
+_pool_lock = threading.Lock()
+_pending = set()                            # keys queued in this process
+_tracked = []                               # [(model, attname)]
+
+
+def derivative_key(name):
+    return sha256_from_name(name) or hashlib.sha256(name.encode()).hexdigest()
+
+
+def derivative_dir(name):
+    key = derivative_key(name)
+    return f"{DERIVATIVES_DIR}/{key[:2]}/{key}"
+
+
+def has_variants(name):
+    directory = media_storage().path(derivative_dir(name))
+    return all(os.path.exists(os.path.join(directory, variant_filename(v))) for v in VARIANTS)
+
+
+def variant_urls(field_file, request=None):
+    """{variant: url} for a picture; the original's URL for variants not rendered yet."""
+    if not field_file:
+        return None
+    storage = media_storage()
+    directory = derivative_dir(field_file.name)
+    ready = has_variants(field_file.name)
+    urls = {}
+    for variant in VARIANTS:
+        name = f"{directory}/{variant_filename(variant)}" if ready else field_file.name
+        url = storage.url(name)
+        urls[variant] = request.build_absolute_uri(url) if request is not None else url
+    return urls
+
+
+def remove_variants(name):
+    shutil.rmtree(media_storage().path(derivative_dir(name)), ignore_errors=True)
+
+
+# ------------------------------------------------------------------
+# RENDERING
+# ------------------------------------------------------------------
+def _executor():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=WORKERS, mp_context=multiprocessing.get_context('spawn'))
+        return _pool
+
+
+def _reset_executor():
+    global _pool
+    with _pool_lock:
+        _pool = None
+
+
+def render(name):
+    """Render the variants of one stored picture in this process."""
+    storage = media_storage()
+    return render_variants(storage.path(name), storage.path(derivative_dir(name)))
+
+
+def _render_logged(name):
+    try:
+        render(name)
+    except Exception as e:
+        print(f"[ERROR] Image variants for {name} failed: {e}")
+
+
+def _submit(name):
+    key = derivative_key(name)
+    if key in _pending:
+        return
+    storage = media_storage()
+    args = (storage.path(name), storage.path(derivative_dir(name)))
+    try:
+        future = _executor().submit(render_variants, *args)
+    except BrokenProcessPool:               # a worker died (e.g. OOM on a huge image)
+        _reset_executor()
+        future = _executor().submit(render_variants, *args)
+    _pending.add(key)
+
+    def _done(future):
+        _pending.discard(key)
+        if future.exception() is not None:
+            print(f"[ERROR] Image variants for {name} failed: {future.exception()}")
+    future.add_done_callback(_done)
+
+
+def schedule(name):
+    """Queue variant rendering for a picture once the current transaction commits."""
+    if not name or has_variants(name):
+        return
+    if WORKERS <= 0:
+        transaction.on_commit(lambda: _render_logged(name))
+    else:
+        transaction.on_commit(lambda: _submit(name))
+
+
+def _saved(sender, instance, update_fields=None, **kwargs):
+    for model, attname in _tracked:
+        if sender is model and (update_fields is None or attname in update_fields):
+            field_file = getattr(instance, attname)
+            if field_file:
+                schedule(field_file.name)
+
+
+def track(model, attname):
+    """Render variants whenever `model.<attname>` is saved with a picture."""
+    _tracked.append((model, attname))
+    post_save.connect(_saved, sender=model, dispatch_uid=f'mediastore:images:{model._meta.label}')
+
+
+def tracked_images():
+    return list(_tracked)
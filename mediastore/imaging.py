@@ -0,0 +1,80 @@
+"""
+Image resizing for derivative variants (thumbnails, WebP).
+
+Pure Pillow on file paths, with no Django imports, so it can run in
+worker processes started with "spawn" without setting Django up there.
+"""
+import os
+import tempfile
+
+from PIL import Image, ImageOps
+
+# name -> (width, height, crop, format, extension)
+#   crop=True:  fill the box exactly (centre crop) - avatars in lists
+#   crop=False: fit inside the box, keep the aspect ratio - profile pages
+VARIANTS = {
+    'thumb': (128, 128, True, 'JPEG', '.jpg'),
+    'thumb_webp': (128, 128, True, 'WEBP', '.webp'),
+    'medium': (480, 480, False, 'JPEG', '.jpg'),
+    'medium_webp': (480, 480, False, 'WEBP', '.webp'),
+}
+SAVE_OPTIONS = {
+    'JPEG': {'quality': 82, 'optimize': True, 'progressive': True},
+    'WEBP': {'quality': 80, 'method': 4},
+}
+
+
+def variant_filename(variant):
+    return variant.removesuffix('_webp') + VARIANTS[variant][4]      # thumb.jpg, thumb.webp
+
+
+def _write_atomic(image, path, fmt):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.render-')
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            image.save(out, fmt, **SAVE_OPTIONS[fmt])
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def render_variants(src_path, out_dir, variants=None):
+    """
+    Write every variant of the image at `src_path` into `out_dir`. The
+    source is decoded once: phone JPEGs are drafted down by the decoder
+    (JPEG DCT scaling) before the full-size bitmap is ever built.
+    Returns the list of file names written.
+    """
+    variants = variants or list(VARIANTS)
+    largest = max(max(VARIANTS[v][:2]) for v in variants)
+    os.makedirs(out_dir, exist_ok=True)
+
+    with Image.open(src_path) as source:
+        source.draft('RGB', (largest * 2, largest * 2))
+        image = ImageOps.exif_transpose(source)         # camera rotation, then drop EXIF
+        if image.mode not in ('RGB', 'L'):
+            background = Image.new('RGB', image.size, 'white')
+            image = image.convert('RGBA')
+            background.paste(image, mask=image.getchannel('A'))
+            image = background
+        image.load()
+
+    written = []
+    rendered = {}                           # (w, h, crop) -> bitmap, shared by the formats
+    base = image
+    # largest first: each fitted size becomes the source of the smaller ones
+    for variant in sorted(variants, key=lambda v: -max(VARIANTS[v][:2])):
+        width, height, crop, fmt, _ = VARIANTS[variant]
+        geometry = (width, height, crop)
+        if geometry not in rendered:
+            if crop:
+                rendered[geometry] = ImageOps.fit(base, (width, height), Image.Resampling.LANCZOS)
+            else:
+                resized = base.copy()
+                resized.thumbnail((width, height), Image.Resampling.LANCZOS)
+                rendered[geometry] = base = resized
+        _write_atomic(rendered[geometry], os.path.join(out_dir, variant_filename(variant)), fmt)
+        written.append(variant_filename(variant))
+    return written
@@ -0,0 +1,60 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand
+
+from mediastore.images import derivative_dir, has_variants, tracked_images
+from mediastore.imaging import render_variants
+from mediastore.storage import media_storage
+
+
+class Command(BaseCommand):
+    help = (
+        "Backfill thumbnail / WebP variants for existing pictures (profile pictures, ...). "
+        "Each distinct source file is rendered once, in a pool of worker processes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 2)
+        parser.add_argument('--force', action='store_true', help='Re-render variants that already exist.')
+
+    def handle(self, *args, **options):
+        storage = media_storage()
+        names = set()
+        for model, attname in tracked_images():
+            rows = model._base_manager.exclude(**{attname: ''}).exclude(**{f'{attname}__isnull': True})
+            names.update(rows.values_list(attname, flat=True).distinct().iterator())
+
+        todo, missing = [], 0
+        for name in sorted(names):
+            if not storage.exists(name):
+                missing += 1
+            elif options['force'] or not has_variants(name):
+                todo.append(name)
+        self.stdout.write(
+            f"{len(names)} pictures: {len(todo)} to render, "
+            f"{len(names) - len(todo) - missing} already done, {missing} missing on disk."
+        )
+        if not todo:
+            return
+
+        started = time.monotonic()
+        failed = 0
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=max(1, options['workers']), mp_context=context) as pool:
+            futures = {
+                pool.submit(render_variants, storage.path(name), storage.path(derivative_dir(name))): name
+                for name in todo
+            }
+            for done, future in enumerate(as_completed(futures), 1):
+                if future.exception() is not None:
+                    failed += 1
+                    self.stderr.write(f"{futures[future]}: {future.exception()}")
+                if done % 100 == 0:
+                    self.stdout.write(f"  {done}/{len(todo)}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Rendered {len(todo) - failed} pictures in {time.monotonic() - started:.1f}s ({failed} failed)."
+        ))
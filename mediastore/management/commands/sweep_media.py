@@ -0,0 +1,148 @@
+import os
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from mediastore.images import remove_variants
+from mediastore.models import MediaBlob
+from mediastore.refs import count_references, referenced_names, tracked_fields
+from mediastore.storage import PREFIX, TMP_DIR, is_blob, media_storage
+from mediastore.uploads import SESSION_TTL_HOURS, UPLOAD_DIR, purge_stale_sessions
+
+
+class Command(BaseCommand):
+    help = (
+        "Recount content-addressed media references from the tables, then delete blobs "
+        "no row references any more. --adopt-legacy first moves files saved before the "
+        "content-addressed storage into it, so duplicates collapse into one blob. "
+        "Chunked upload sessions idle for longer than --upload-ttl-hours are removed too."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace-hours', type=float, default=1.0,
+                            help='Keep unreferenced blobs younger than this (uploads in flight).')
+        parser.add_argument('--adopt-legacy', action='store_true',
+                            help='Re-store old uploads by content hash and repoint their rows.')
+        parser.add_argument('--upload-ttl-hours', type=float, default=SESSION_TTL_HOURS,
+                            help='Remove unfinished chunked uploads idle for longer than this.')
+        parser.add_argument('--dry-run', action='store_true', help='Report only.')
+
+    def handle(self, *args, **options):
+        storage = media_storage()
+        dry_run = options['dry_run']
+
+        sessions, upload_bytes = purge_stale_sessions(options['upload_ttl_hours'], dry_run=dry_run)
+        self.stdout.write(
+            f"Removed {sessions} stale upload sessions ({upload_bytes / 1024 / 1024:.1f} MB)."
+        )
+
+        if options['adopt_legacy']:
+            self._adopt_legacy(storage, dry_run)
+
+        # 1. authoritative recount. An unlocked pass over the tables finds the
+        #    blobs whose count looks wrong; each is then recounted under its row
+        #    lock, so a save adjusting it concurrently is neither lost nor overwritten.
+        counts = referenced_names()
+        suspects = [
+            blob.pk for blob in MediaBlob.objects.only('id', 'name', 'ref_count').iterator()
+            if blob.ref_count != counts.get(blob.name, 0)
+        ]
+        corrected = len(suspects) if dry_run else sum(self._recount(pk) for pk in suspects)
+        self.stdout.write(f"Corrected {corrected} reference counts.")
+
+        # 2. unreferenced blobs past the grace period (since last stored or referenced)
+        cutoff = timezone.now() - timedelta(hours=options['grace_hours'])
+        if dry_run:                         # counts were not written back
+            orphans = [
+                b for b in MediaBlob.objects.filter(updated_at__lt=cutoff) if b.name not in counts
+            ]
+        else:
+            orphans = list(MediaBlob.objects.filter(ref_count=0, updated_at__lt=cutoff))
+        freed = removed = 0
+        for blob in orphans:
+            if not dry_run:
+                with transaction.atomic():
+                    # re-check under the row lock: an upload may have just reused it
+                    locked = (
+                        MediaBlob.objects.select_for_update()
+                        .filter(pk=blob.pk, ref_count=0, updated_at__lt=cutoff).first()
+                    )
+                    if locked is None or count_references(locked.name):
+                        continue
+                    storage.delete_blob(blob.name)
+                    remove_variants(blob.name)
+                    locked.delete()
+            freed += blob.size
+            removed += 1
+
+        # 3. blob files with no MediaBlob row (interrupted uploads) and stale temp files
+        known = set(MediaBlob.objects.values_list('name', flat=True))
+        oldest = time.time() - options['grace_hours'] * 3600
+        root = storage.path(PREFIX)
+        for directory, _, files in os.walk(root):
+            for filename in files:
+                path = os.path.join(directory, filename)
+                name = os.path.relpath(path, storage.location).replace(os.sep, '/')
+                if name.startswith(UPLOAD_DIR + '/'):
+                    continue                # chunked uploads: purged by session above
+                in_tmp = name.startswith(TMP_DIR + '/')
+                if (in_tmp or (is_blob(name) and name not in known)) and os.path.getmtime(path) < oldest:
+                    freed += os.path.getsize(path)
+                    removed += 1
+                    if not dry_run:
+                        os.remove(path)
+
+        prefix = "[dry run] " if dry_run else ""
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix}Removed {removed} unreferenced files, {freed / 1024 / 1024:.1f} MB reclaimed."
+        ))
+
+    @transaction.atomic
+    def _recount(self, pk):
+        """Set one blob's count from the tables while holding its row lock. True if it changed."""
+        blob = MediaBlob.objects.select_for_update().filter(pk=pk).first()
+        if blob is None:
+            return False
+        actual = count_references(blob.name)
+        if blob.ref_count == actual:
+            return False
+        MediaBlob.objects.filter(pk=pk).update(ref_count=actual, updated_at=timezone.now())
+        return True
+
+    def _adopt_legacy(self, storage, dry_run):
+        """Re-save legacy files through the content-addressed storage and repoint rows."""
+        moved = {}                          # old name -> blob name
+        missing = 0
+        for model, attnames in tracked_fields().items():
+            for attname in attnames:
+                legacy = (
+                    model._base_manager.exclude(**{f'{attname}__startswith': f'{PREFIX}/'})
+                    .exclude(**{attname: ''}).exclude(**{f'{attname}__isnull': True})
+                    .values_list('pk', attname)
+                )
+                for pk, old in legacy.iterator():
+                    if old not in moved:
+                        if not storage.exists(old):
+                            missing += 1
+                            continue
+                        if dry_run:
+                            moved[old] = None
+                            continue
+                        with storage.open(old, 'rb') as handle:
+                            moved[old] = storage.save(old, handle)
+                    if not dry_run:
+                        # bypasses signals on purpose - the recount that follows is authoritative
+                        model._base_manager.filter(pk=pk).update(**{attname: moved[old]})
+
+        freed = 0
+        for old in moved:
+            if not dry_run:
+                freed += storage.size(old)
+                os.remove(storage.path(old))
+        self.stdout.write(
+            f"Adopted {len(moved)} legacy files ({freed / 1024 / 1024:.1f} MB of originals removed); "
+            f"{missing} referenced files were missing on disk."
+        )
@@ -0,0 +1,26 @@
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mediastore', '0002_upload_session'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mediablob',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+            preserve_default=False,
+        ),
+        migrations.RemoveIndex(
+            model_name='mediablob',
+            name='mediablob_orphan_idx',
+        ),
+        migrations.AddIndex(
+            model_name='mediablob',
+            index=models.Index(fields=['ref_count', 'updated_at'], name='mediablob_orphan_idx'),
+        ),
+    ]
@@ -0,0 +1,75 @@
+import uuid
+
+from django.conf import settings
+from django.db import models
+
+
+class MediaBlob(models.Model):
+    """
+    One stored file in the content-addressed media pool (see storage.py).
+    `ref_count` is the number of model rows whose file field points at it;
+    blobs that stay at zero are reclaimed by `manage.py sweep_media`.
+    """
+    name = models.CharField(max_length=255, unique=True)      # storage path, cas/ab/cd/<sha256><ext>
+    sha256 = models.CharField(max_length=64, db_index=True)
+    size = models.BigIntegerField()
+    ref_count = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # last stored again or (de)referenced; sweep_media's grace period counts from here
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['ref_count', 'updated_at'], name='mediablob_orphan_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.ref_count} refs)"
+
+
+class UploadSession(models.Model):
+    """
+    A resumable chunked upload (see uploads.py). Chunks are written in place
+    into `<UPLOAD_DIR>/<id>.part`; `received` lists the chunk numbers that
+    arrived complete, so a client can ask what is missing and resend it.
+    """
+    STATUS_OPEN = 'open'
+    STATUS_COMPLETE = 'complete'
+    STATUS_CHOICES = [
+        (STATUS_OPEN, 'Open'),
+        (STATUS_COMPLETE, 'Complete'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='upload_sessions')
+    target = models.CharField(max_length=20)                   # key of uploads.TARGETS
+    object_id = models.PositiveIntegerField()
+    filename = models.CharField(max_length=255)
+    size = models.BigIntegerField()
+    chunk_size = models.PositiveIntegerField()
+    sha256 = models.CharField(max_length=64, blank=True)       # optional, checked on completion
+    received = models.JSONField(default=list)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_OPEN)
+    blob_name = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'updated_at'], name='uploadsession_stale_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.filename} -> {self.target} #{self.object_id} ({self.status})"
+
+    @property
+    def chunk_count(self):
+        return max(1, -(-self.size // self.chunk_size))
+
+    def chunk_length(self, index):
+        return min(self.chunk_size, self.size - index * self.chunk_size)
+
+    def missing_chunks(self):
+        received = set(self.received)
+        return [i for i in range(self.chunk_count) if i not in received]
@@ -0,0 +1,104 @@
+"""
+Reference counting for content-addressed media.
+
+Every model file field that uses ContentAddressedStorage is tracked: the
+file name a row was loaded with is remembered (post_init), and on save /
+delete the MediaBlob counts of the old and new names are adjusted in the
+same transaction. Queryset .update() / bulk operations bypass signals, so
+`manage.py sweep_media` recounts from the tables, each blob under its row
+lock, before it deletes anything.
+"""
+from collections import Counter
+
+from django.apps import apps
+from django.db.models import F, FileField
+from django.db.models.signals import post_delete, post_init, post_save
+from django.utils import timezone
+
+from .models import MediaBlob
+from .storage import ContentAddressedStorage, PREFIX, is_blob
+
+_UNKNOWN = object()                         # field was deferred when the row was loaded
+_tracked = {}                               # model -> [attname]
+
+
+def tracked_fields():
+    """{model: [attname]} for every file field stored content-addressed."""
+    if not _tracked:
+        for model in apps.get_models():
+            names = [
+                f.attname for f in model._meta.concrete_fields
+                if isinstance(f, FileField) and isinstance(f.storage, ContentAddressedStorage)
+            ]
+            if names:
+                _tracked[model] = names
+    return _tracked
+
+
+def _name(value):
+    name = getattr(value, 'name', value)
+    return name or None
+
+
+def adjust(names, delta):
+    counts = Counter(n for n in names if is_blob(n))
+    for name, times in counts.items():
+        MediaBlob.objects.filter(name=name).update(
+            ref_count=F('ref_count') + delta * times, updated_at=timezone.now()
+        )
+
+
+def _remember(sender, instance, **kwargs):
+    instance._media_names = {
+        attname: _name(instance.__dict__[attname]) if attname in instance.__dict__ else _UNKNOWN
+        for attname in _tracked[sender]
+    }
+
+
+def _saved(sender, instance, created, **kwargs):
+    before = getattr(instance, '_media_names', {})
+    added, removed = [], []
+    for attname in _tracked[sender]:
+        if attname not in instance.__dict__:
+            continue                        # deferred and untouched
+        old = None if created else before.get(attname, _UNKNOWN)
+        new = _name(instance.__dict__[attname])
+        if old is _UNKNOWN or old == new:
+            continue
+        added.append(new)
+        removed.append(old)
+        before[attname] = new
+    instance._media_names = before
+    adjust(added, +1)
+    adjust(removed, -1)
+
+
+def _deleted(sender, instance, **kwargs):
+    adjust([_name(instance.__dict__.get(attname)) for attname in _tracked[sender]], -1)
+
+
+def connect_signals():
+    for model in tracked_fields():
+        uid = f'mediastore:{model._meta.label}'
+        post_init.connect(_remember, sender=model, dispatch_uid=uid)
+        post_save.connect(_saved, sender=model, dispatch_uid=uid)
+        post_delete.connect(_deleted, sender=model, dispatch_uid=uid)
+
+
+def referenced_names():
+    """Counter of blob names referenced by any tracked row, read from the tables."""
+    counts = Counter()
+    for model, attnames in tracked_fields().items():
+        for attname in attnames:
+            rows = model._base_manager.filter(**{f'{attname}__startswith': f'{PREFIX}/'})
+            counts.update(rows.values_list(attname, flat=True).iterator())
+    return counts
+
+
+def count_references(name):
+    """How many tracked rows point at one blob, read from the tables."""
+    return sum(
+        model._base_manager.filter(**{attname: name}).count()
+        for model, attnames in tracked_fields().items()
+        for attname in attnames
+    )
@@ -0,0 +1,28 @@
+from rest_framework import serializers
+
+from .models import UploadSession
+from .uploads import TARGETS
+
+
+class UploadSessionCreateSerializer(serializers.Serializer):
+    target = serializers.ChoiceField(choices=sorted(TARGETS))
+    object_id = serializers.IntegerField(min_value=1)
+    filename = serializers.CharField(max_length=255)
+    size = serializers.IntegerField(min_value=1)
+    sha256 = serializers.CharField(max_length=64, required=False, allow_blank=True)
+
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    chunk_count = serializers.IntegerField(read_only=True)
+    missing_chunks = serializers.SerializerMethodField()
+
+    class Meta:
+        model = UploadSession
+        fields = [
+            'id', 'target', 'object_id', 'filename', 'size', 'chunk_size', 'chunk_count',
+            'received', 'missing_chunks', 'sha256', 'status', 'created_at', 'updated_at',
+        ]
+        read_only_fields = fields
+
+    def get_missing_chunks(self, obj):
+        return obj.missing_chunks()
@@ -0,0 +1,143 @@
+"""
+Content-addressed media storage.
+
+Uploads are streamed to a temporary file while being hashed (so a large
+PDF is never held in memory) and then stored once under their SHA-256:
+
+    cas/<sha[:2]>/<sha[2:4]>/<sha256><ext>
+
+Uploading the same bytes again - under any name, to any field using this
+storage - reuses the existing file. Because one blob can back many rows,
+`delete()` leaves blobs alone; unreferenced blobs are reclaimed by
+`manage.py sweep_media` (reference counts live in MediaBlob).
+
+Files saved before this storage was introduced keep their old names and
+are served as before.
+"""
+import hashlib
+import os
+import re
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.utils import timezone
+from django.utils.text import slugify
+
+PREFIX = 'cas'
+TMP_DIR = f'{PREFIX}/tmp'
+_BLOB_RE = re.compile(rf'^{PREFIX}/[0-9a-f]{{2}}/[0-9a-f]{{2}}/([0-9a-f]{{64}})(\.[\w]+)?$')
+
+
+def is_blob(name):
+    return bool(name and _BLOB_RE.match(name))
+
+
+def sha256_from_name(name):
+    match = _BLOB_RE.match(name or '')
+    return match.group(1) if match else None
+
+
+def blob_name(sha, ext=''):
+    return f"{PREFIX}/{sha[:2]}/{sha[2:4]}/{sha}{ext}"
+
+
+def display_name(name, title=None):
+    """A human file name for downloads; blobs are named by hash on disk."""
+    if not is_blob(name):
+        return os.path.basename(name)
+    ext = os.path.splitext(name)[1]
+    return f"{slugify(title or '') or 'file'}{ext}"
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    def get_available_name(self, name, max_length=None):
+        return name                         # the final name is decided by the content in _save
+
+    def _save(self, name, content):
+        tmp_dir = self.path(TMP_DIR)
+        os.makedirs(tmp_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=tmp_dir, prefix='upload-')
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    out.write(chunk)
+                    size += len(chunk)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        return self._place(tmp_path, digest.hexdigest(), size, name)
+
+    def store_path(self, path, name, sha256=None):
+        """
+        Move a file already written under MEDIA_ROOT (e.g. an assembled chunked
+        upload) into the pool without copying it. Returns the blob name. If
+        the move fails the file is left where it was.
+        """
+        if sha256 is None:
+            digest = hashlib.sha256()
+            with open(path, 'rb') as handle:
+                for chunk in iter(lambda: handle.read(1024 * 1024), b''):
+                    digest.update(chunk)
+            sha256 = digest.hexdigest()
+        size = os.path.getsize(path)
+        name = self.pool_name(sha256, name)
+        self._move(path, name)
+        return self.register(name, sha256, size)
+
+    def pool_name(self, sha, name):
+        """The blob name bytes with this hash are stored under (keeps `name`'s extension)."""
+        ext = os.path.splitext(name)[1].lower()
+        if not re.fullmatch(r'\.\w{1,10}', ext):
+            ext = ''
+        return blob_name(sha, ext)
+
+    def register(self, name, sha, size):
+        """Create the MediaBlob row for `name`, or restart its sweep grace period. Returns `name`."""
+        from .models import MediaBlob
+        blob, created = MediaBlob.objects.get_or_create(name=name, defaults={'sha256': sha, 'size': size})
+        if not created:
+            # reused: restart the sweep grace period until the row using it is saved
+            MediaBlob.objects.filter(pk=blob.pk).update(updated_at=timezone.now())
+        return name
+
+    def _move(self, path, name):
+        final_path = self.path(name)
+        if os.path.exists(final_path):
+            os.remove(path)                 # already stored - costs no extra disk
+        else:
+            os.makedirs(os.path.dirname(final_path), exist_ok=True)
+            os.replace(path, final_path)
+            if self.file_permissions_mode is not None:
+                os.chmod(final_path, self.file_permissions_mode)
+
+    def _place(self, tmp_path, sha, size, name):
+        name = self.pool_name(sha, name)
+        try:
+            self._move(tmp_path, name)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return self.register(name, sha, size)
+
+    def delete(self, name):
+        if is_blob(name):
+            return                          # shared - reclaimed by sweep_media once unreferenced
+        super().delete(name)
+
+    def delete_blob(self, name):
+        super().delete(name)
+
+
+_storage = None
+
+
+def media_storage():
+    """Storage callable for FileFields (keeps migrations free of instance state)."""
+    global _storage
+    if _storage is None:
+        _storage = ContentAddressedStorage()
+    return _storage
@@ -0,0 +1,78 @@
+import hashlib
+import os
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import mock
+
+from django.db import IntegrityError
+from django.test import TestCase, override_settings
+
+from library.models import Book
+from portalaccount.models import User
+from . import uploads
+from .models import MediaBlob, UploadSession
+from .storage import media_storage
+
+DATA = b"scanned textbook pages"
+
+
+class ChunkedUploadTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.user = User.objects.create_user(email="uploader@example.com", password="x")
+        self.book = Book.objects.create(title="Scanned", isbn="SCAN-1", price=1, total_copies=1, available_copies=1)
+        with mock.patch.object(uploads, "CHUNK_SIZE", 8):
+            self.session = uploads.create_session(
+                self.user, "book", self.book.pk, "scan.pdf", len(DATA), sha256=hashlib.sha256(DATA).hexdigest()
+            )
+
+    def _send_all(self):
+        for index in reversed(range(self.session.chunk_count)):
+            chunk = DATA[index * 8:(index + 1) * 8]
+            uploads.write_chunk(self.session, index, BytesIO(chunk), len(chunk))
+
+    def test_chunks_in_any_order_are_stored_once(self):
+        self._send_all()
+        session, book = uploads.complete(self.session, self.user)
+
+        self.assertEqual(session.status, UploadSession.STATUS_COMPLETE)
+        self.assertEqual(book.file.name, session.blob_name)
+        with media_storage().open(session.blob_name) as handle:
+            self.assertEqual(handle.read(), DATA)
+        self.assertFalse(os.path.exists(uploads.part_path(session)))
+        self.assertEqual(MediaBlob.objects.get(name=session.blob_name).ref_count, 1)
+
+    def test_failed_attach_keeps_the_part_file(self):
+        self._send_all()
+        with mock.patch.object(Book, "save", side_effect=IntegrityError("boom")):
+            with self.assertRaises(IntegrityError):
+                uploads.complete(self.session, self.user)
+
+        self.assertTrue(os.path.exists(uploads.part_path(self.session)))
+        self.assertFalse(MediaBlob.objects.exists())
+        session, book = uploads.complete(self.session, self.user)     # the client retries
+        self.assertEqual(book.file.name, session.blob_name)
+
+    def test_purged_session_is_a_conflict(self):
+        uploads.write_chunk(self.session, 0, BytesIO(DATA[:8]), 8)
+        self.assertEqual(uploads.purge_stale_sessions(max_age_hours=0)[0], 1)
+
+        with self.assertRaises(uploads.UploadConflict):
+            uploads.write_chunk(self.session, 1, BytesIO(DATA[8:16]), 8)
+        with self.assertRaises(uploads.UploadConflict):
+            uploads.complete(self.session, self.user)
+
+    def test_missing_part_file_is_a_conflict(self):
+        self._send_all()
+        os.remove(uploads.part_path(self.session))
+
+        with self.assertRaises(uploads.UploadConflict):
+            uploads.complete(self.session, self.user)
+        with self.assertRaises(uploads.UploadConflict):
+            uploads.write_chunk(self.session, 0, BytesIO(DATA[:8]), 8)
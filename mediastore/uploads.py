@@ -0,0 +1,250 @@
+"""
+Resumable chunked uploads for large files (scanned textbooks, attachments).
+
+    1. create_session()  - declares the target row, file name and size;
+                           an empty file of that size is created on disk
+    2. write_chunk()     - chunk N (any order, re-sendable) is streamed from
+                           the request straight into its offset in that file
+    3. complete()        - once every chunk is in, the file is set on the
+                           target's file field and then moved into the
+                           content-addressed pool (a rename, no copy)
+
+Nothing is buffered in memory beyond one read of CHUNK_READ bytes, and a
+dropped connection only loses the chunk in flight. Sessions that are not
+completed within UPLOAD_SESSION_TTL_HOURS are removed by
+`purge_stale_sessions()` (run by `manage.py sweep_media`); chunks or a
+completion sent for a purged session get UploadConflict.
+
+Settings:
+    MEDIA_UPLOAD_CHUNK_SIZE       bytes per chunk (default 8 MB)
+    MEDIA_UPLOAD_MAX_SIZE         largest accepted file (default 2 GB)
+    UPLOAD_SESSION_TTL_HOURS      idle sessions older than this are purged
+"""
+import hashlib
+import os
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import UploadSession
+from .storage import PREFIX, media_storage
+
+UPLOAD_DIR = f'{PREFIX}/uploads'
+CHUNK_READ = 64 * 1024
+CHUNK_SIZE = getattr(settings, 'MEDIA_UPLOAD_CHUNK_SIZE', 8 * 1024 * 1024)
+MAX_UPLOAD_SIZE = getattr(settings, 'MEDIA_UPLOAD_MAX_SIZE', 2 * 1024 * 1024 * 1024)
+SESSION_TTL_HOURS = getattr(settings, 'UPLOAD_SESSION_TTL_HOURS', 24)
+
+
+class UploadError(Exception):
+    status_code = 400
+
+
+class UploadForbidden(UploadError):
+    status_code = 403
+
+
+class UploadConflict(UploadError):
+    status_code = 409
+
+
+class UploadExpired(UploadConflict):
+    def __init__(self, message="This upload has expired; start a new one."):
+        super().__init__(message)
+
+
+# ------------------------------------------------------------------
+# TARGETS  – which file fields can receive a chunked upload
+# ------------------------------------------------------------------
+@dataclass(frozen=True)
+class UploadTarget:
+    model: str                              # "app_label.Model"
+    field: str
+    can_attach: callable                    # (user, instance) -> bool
+
+    def get_model(self):
+        return apps.get_model(self.model)
+
+
+def _can_edit_announcement(user, announcement):
+    # same rule as AnnouncementDetail.put
+    return user == announcement.posted_by or user.is_staff
+
+
+TARGETS = {
+    'book': UploadTarget('library.Book', 'file', lambda user, book: True),
+    'announcement': UploadTarget('newsevents.Announcement', 'file', _can_edit_announcement),
+}
+
+
+def _target_instance(session_or_target, object_id=None, user=None):
+    if isinstance(session_or_target, UploadSession):
+        key, object_id = session_or_target.target, session_or_target.object_id
+    else:
+        key = session_or_target
+    target = TARGETS.get(key)
+    if target is None:
+        raise UploadError(f"Unknown target {key!r}; expected one of {', '.join(TARGETS)}.")
+    model = target.get_model()
+    instance = model._default_manager.filter(pk=object_id).first()
+    if instance is None:
+        raise UploadError(f"{model._meta.verbose_name.capitalize()} {object_id} does not exist.")
+    if user is not None and not target.can_attach(user, instance):
+        raise UploadForbidden("Permission denied.")
+    return target, instance
+
+
+# ------------------------------------------------------------------
+# SESSIONS
+# ------------------------------------------------------------------
+def part_path(session):
+    return media_storage().path(f"{UPLOAD_DIR}/{session.pk}.part")
+
+
+def create_session(user, target, object_id, filename, size, sha256=''):
+    _target_instance(target, object_id, user)
+    if size < 1:
+        raise UploadError("size must be at least 1 byte.")
+    if size > MAX_UPLOAD_SIZE:
+        raise UploadError(f"File too large; the limit is {MAX_UPLOAD_SIZE} bytes.")
+    sha256 = (sha256 or '').lower()
+    if sha256 and (len(sha256) != 64 or any(c not in '0123456789abcdef' for c in sha256)):
+        raise UploadError("sha256 must be 64 hex characters.")
+
+    session = UploadSession.objects.create(
+        owner=user, target=target, object_id=object_id,
+        filename=os.path.basename(filename)[:255] or 'upload',
+        size=size, chunk_size=CHUNK_SIZE, sha256=sha256,
+    )
+    path = part_path(session)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as handle:
+        handle.truncate(size)               # sparse: chunks can land in any order
+    return session
+
+
+def write_chunk(session, index, stream, content_length, chunk_sha256=None):
+    """
+    Stream one chunk from `stream` into its place in the part file. The
+    chunk is only recorded as received once every byte has been written
+    (and matched `chunk_sha256`, if the client sent one).
+    """
+    if session.status != UploadSession.STATUS_OPEN:
+        raise UploadConflict("Upload is already complete.")
+    if not 0 <= index < session.chunk_count:
+        raise UploadError(f"Chunk {index} out of range; this upload has {session.chunk_count} chunks.")
+    expected = session.chunk_length(index)
+    if content_length != expected:
+        raise UploadError(f"Chunk {index} must be exactly {expected} bytes, got {content_length}.")
+
+    digest = hashlib.sha256()
+    written = 0
+    try:
+        handle = open(part_path(session), 'r+b')
+    except FileNotFoundError:
+        raise UploadExpired()               # purged while the client was sending
+    with handle:
+        handle.seek(index * session.chunk_size)
+        while written < expected:
+            data = stream.read(min(CHUNK_READ, expected - written))
+            if not data:
+                break
+            handle.write(data)
+            digest.update(data)
+            written += len(data)
+    if written != expected:
+        raise UploadError(f"Chunk {index} was cut short ({written} of {expected} bytes); resend it.")
+    if chunk_sha256 and digest.hexdigest() != chunk_sha256.lower():
+        raise UploadError(f"Chunk {index} checksum mismatch; resend it.")
+
+    with transaction.atomic():
+        # chunks may arrive in parallel: merge under the row lock
+        locked = UploadSession.objects.select_for_update().filter(pk=session.pk).first()
+        if locked is None:
+            raise UploadExpired()
+        if index not in locked.received:
+            locked.received = sorted([*locked.received, index])
+        locked.save(update_fields=['received', 'updated_at'])
+    return locked
+
+
+def complete(session, user):
+    """Attach the assembled file to its target. Returns (session, target instance)."""
+    with transaction.atomic():
+        session = UploadSession.objects.select_for_update().filter(pk=session.pk).first()
+        if session is None:
+            raise UploadExpired()
+        if session.status == UploadSession.STATUS_COMPLETE:
+            raise UploadConflict("Upload is already complete.")
+        missing = session.missing_chunks()
+        if missing:
+            raise UploadConflict(f"{len(missing)} chunks still missing: {missing[:20]}")
+        target, instance = _target_instance(session, user=user)
+
+        path = part_path(session)
+        digest = hashlib.sha256()
+        try:
+            handle = open(path, 'rb')
+        except FileNotFoundError:
+            raise UploadExpired()
+        with handle:
+            for data in iter(lambda: handle.read(1024 * 1024), b''):
+                digest.update(data)
+        sha = digest.hexdigest()
+        if session.sha256 and sha != session.sha256:
+            raise UploadError("File checksum does not match the one declared for this upload.")
+
+        storage = media_storage()
+        name = storage.register(storage.pool_name(sha, session.filename), sha, session.size)
+        setattr(instance, target.field, name)
+        instance.save(update_fields=[target.field])
+
+        session.status = UploadSession.STATUS_COMPLETE
+        session.blob_name = name
+        session.save(update_fields=['status', 'blob_name', 'updated_at'])
+
+        # last, once the rows are written: if anything above fails the part
+        # file is still there and the client can call complete() again.
+        # A rename into the pool; the bytes are not copied again.
+        storage.store_path(path, session.filename, sha256=sha)
+    return session, instance
+
+
+def abort(session):
+    if os.path.exists(part_path(session)):
+        os.remove(part_path(session))
+    session.delete()
+
+
+def purge_stale_sessions(max_age_hours=SESSION_TTL_HOURS, dry_run=False):
+    """
+    Delete sessions idle for longer than `max_age_hours` (and their part
+    files), plus part files no session owns. Returns (sessions, bytes freed).
+    """
+    cutoff = timezone.now() - timedelta(hours=max_age_hours)
+    stale = UploadSession.objects.filter(updated_at__lt=cutoff)
+    removed = freed = 0
+    for session in stale.iterator():
+        path = part_path(session)
+        if session.status == UploadSession.STATUS_OPEN and os.path.exists(path):
+            freed += os.path.getsize(path)
+            if not dry_run:
+                os.remove(path)
+        removed += 1
+    if not dry_run:
+        stale.delete()
+
+    directory = media_storage().path(UPLOAD_DIR)
+    if os.path.isdir(directory):
+        live = {str(pk) for pk in UploadSession.objects.values_list('pk', flat=True)}
+        for filename in os.listdir(directory):
+            path = os.path.join(directory, filename)
+            if filename.removesuffix('.part') not in live and os.path.getmtime(path) < cutoff.timestamp():
+                freed += os.path.getsize(path)
+                if not dry_run:
+                    os.remove(path)
+    return removed, freed
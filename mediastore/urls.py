@@ -0,0 +1,15 @@
+from django.urls import path
+
+from .views import (
+    UploadChunkAPIView,
+    UploadCompleteAPIView,
+    UploadSessionCreateAPIView,
+    UploadSessionDetailAPIView,
+)
+
+urlpatterns = [
+    path('uploads/', UploadSessionCreateAPIView.as_view(), name='upload-create'),
+    path('uploads/<uuid:pk>/', UploadSessionDetailAPIView.as_view(), name='upload-detail'),
+    path('uploads/<uuid:pk>/chunks/<int:index>/', UploadChunkAPIView.as_view(), name='upload-chunk'),
+    path('uploads/<uuid:pk>/complete/', UploadCompleteAPIView.as_view(), name='upload-complete'),
+]
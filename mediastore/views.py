@@ -0,0 +1,98 @@
+from django.shortcuts import get_object_or_404
+from rest_framework import permissions, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from . import uploads
+from .models import UploadSession
+from .serializers import UploadSessionCreateSerializer, UploadSessionSerializer
+
+
+def _error(exc):
+    return Response({"detail": str(exc)}, status=exc.status_code)
+
+
+def _own_session(request, pk):
+    return get_object_or_404(UploadSession, pk=pk, owner=request.user)
+
+
+# ------------------------------------------------------------------
+# CHUNKED UPLOADS
+# ------------------------------------------------------------------
+class UploadSessionCreateAPIView(APIView):
+    """
+    POST { target: book | announcement, object_id, filename, size, sha256? }
+    -> 201 session (id, chunk_size, chunk_count, ...)
+
+    Then PUT each chunk to uploads/<id>/chunks/<n>/ and POST
+    uploads/<id>/complete/ to attach the file.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        ser = UploadSessionCreateSerializer(data=request.data)
+        if not ser.is_valid():
+            return Response(ser.errors, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            session = uploads.create_session(request.user, **ser.validated_data)
+        except uploads.UploadError as exc:
+            return _error(exc)
+        return Response(UploadSessionSerializer(session).data, status=status.HTTP_201_CREATED)
+
+
+class UploadSessionDetailAPIView(APIView):
+    """GET: progress and missing chunks (to resume).  DELETE: abort."""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, pk):
+        return Response(UploadSessionSerializer(_own_session(request, pk)).data)
+
+    def delete(self, request, pk):
+        uploads.abort(_own_session(request, pk))
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class UploadChunkAPIView(APIView):
+    """
+    PUT raw bytes of chunk <index> (0-based) as the request body. Every chunk
+    but the last is exactly chunk_size bytes. Optional header
+    X-Chunk-SHA256 is checked before the chunk counts as received.
+    Re-sending a chunk is harmless.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def put(self, request, pk, index):
+        session = _own_session(request, pk)
+        try:
+            content_length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            content_length = 0
+        try:
+            # read the raw body stream - never request.data, which would buffer it
+            session = uploads.write_chunk(
+                session, index, request.stream, content_length,
+                chunk_sha256=request.headers.get('X-Chunk-SHA256'),
+            )
+        except uploads.UploadError as exc:
+            return _error(exc)
+        return Response({
+            "index": index,
+            "received": len(session.received),
+            "chunk_count": session.chunk_count,
+        })
+
+
+class UploadCompleteAPIView(APIView):
+    """POST once every chunk is in: attaches the file to the target and returns it."""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, pk):
+        session = _own_session(request, pk)
+        try:
+            session, instance = uploads.complete(session, request.user)
+        except uploads.UploadError as exc:
+            return _error(exc)
+        return Response({
+            **UploadSessionSerializer(session).data,
+            "file": getattr(instance, uploads.TARGETS[session.target].field).name,
+        })
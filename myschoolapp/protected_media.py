@@ -0,0 +1,177 @@
+"""
+Protected media serving shared by the apps that hand out uploaded files
+(announcement attachments, library books, ...).
+
+`serve_protected_file(request, field_file)` answers a GET/HEAD for a
+FileField value after the calling view has done its permission checks:
+
+- strong ETag from the file's SHA-256 (taken from the name for
+  content-addressed blobs, otherwise cached per path/size/mtime, so a
+  file is hashed once, not per request) and Last-Modified;
+- conditional GET: If-None-Match / If-Modified-Since -> 304;
+- byte ranges: "Range: bytes=a-b" -> 206, honouring If-Range; an
+  unsatisfiable range -> 416; multi-range requests get the whole file;
+- offload: with PROTECTED_MEDIA_OFFLOAD = "x-accel" (nginx) or
+  "x-sendfile" (Apache / lighttpd) the response only carries headers and
+  the web server streams the bytes (and handles Range itself).
+
+Settings:
+    PROTECTED_MEDIA_OFFLOAD       None | "x-accel" | "x-sendfile"
+    PROTECTED_MEDIA_ACCEL_PREFIX  internal nginx location mapped onto
+                                  MEDIA_ROOT (default "/protected-media/")
+"""
+import hashlib
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe
+
+from mediastore.storage import sha256_from_name
+
+CHUNK_SIZE = 64 * 1024
+ETAG_CACHE_TIMEOUT = 60 * 60 * 24 * 7
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+# ------------------------------------------------------------------
+# VALIDATORS
+# ------------------------------------------------------------------
+def file_sha256(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as handle:
+        for chunk in iter(lambda: handle.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def content_etag(path, stat=None):
+    """Strong ETag for a file on disk, recomputed only when it changes."""
+    stat = stat or os.stat(path)
+    key = f"media:etag:{hashlib.md5(path.encode()).hexdigest()}:{stat.st_size}:{stat.st_mtime_ns}"
+    etag = cache.get(key)
+    if etag is None:
+        etag = f'"{file_sha256(path)}"'
+        cache.set(key, etag, ETAG_CACHE_TIMEOUT)
+    return etag
+
+
+def _etag_matches(header, etag):
+    if header.strip() == '*':
+        return True
+    return etag in {tag.strip().removeprefix('W/') for tag in header.split(',')}
+
+
+def _not_modified(request, etag, mtime):
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match is not None:               # takes precedence over the date
+        return _etag_matches(if_none_match, etag)
+    since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE') or '')
+    return since is not None and int(mtime) <= since
+
+
+def _requested_range(request, etag, mtime, size):
+    """
+    (start, end) inclusive for a satisfiable single range, None to send the
+    whole file, or "unsatisfiable".
+    """
+    header = request.META.get('HTTP_RANGE')
+    if not header or request.method not in ('GET', 'HEAD'):
+        return None
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if if_range:
+        if if_range.startswith(('"', 'W/')):
+            if if_range.strip() != etag:
+                return None
+        elif parse_http_date_safe(if_range) != int(mtime):
+            return None
+
+    match = _RANGE_RE.match(header.strip())
+    if not match or match.groups() == ('', ''):
+        return None                             # malformed or multi-range: full body
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+        if start >= size or (last and int(last) < start):
+            return 'unsatisfiable'
+    else:
+        suffix = int(last)
+        if suffix == 0:
+            return 'unsatisfiable'
+        start, end = max(0, size - suffix), size - 1
+    return start, end
+
+
+# ------------------------------------------------------------------
+# RESPONSES
+# ------------------------------------------------------------------
+def _stream_range(path, start, end):
+    with open(path, 'rb') as handle:
+        handle.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = handle.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def _offload_response(field_file, path, content_type):
+    mode = getattr(settings, 'PROTECTED_MEDIA_OFFLOAD', None)
+    if not mode:
+        return None
+    response = HttpResponse(content_type=content_type)
+    if mode == 'x-accel':
+        prefix = getattr(settings, 'PROTECTED_MEDIA_ACCEL_PREFIX', '/protected-media/')
+        response['X-Accel-Redirect'] = prefix.rstrip('/') + '/' + quote(field_file.name)
+    elif mode == 'x-sendfile':
+        response['X-Sendfile'] = path
+    else:
+        raise ValueError(f"Unknown PROTECTED_MEDIA_OFFLOAD mode {mode!r}")
+    return response
+
+
+def serve_protected_file(request, field_file, as_attachment=True, filename=None):
+    """Serve a FileField value with ETag, conditional GET, Range and optional offload."""
+    path = field_file.path
+    stat = os.stat(path)
+    size, mtime = stat.st_size, stat.st_mtime
+    sha = sha256_from_name(field_file.name)    # content-addressed: the name is the hash
+    etag = f'"{sha}"' if sha else content_etag(path, stat)
+    filename = filename or os.path.basename(field_file.name)
+    content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+    validators = {'ETag': etag, 'Last-Modified': http_date(mtime)}
+    if _not_modified(request, etag, mtime):
+        response = HttpResponseNotModified()
+    else:
+        response = _offload_response(field_file, path, content_type)
+        if response is None:
+            byte_range = _requested_range(request, etag, mtime, size)
+            if byte_range == 'unsatisfiable':
+                response = HttpResponse(status=416)
+                response['Content-Range'] = f"bytes */{size}"
+            elif byte_range:
+                start, end = byte_range
+                response = StreamingHttpResponse(
+                    _stream_range(path, start, end), status=206, content_type=content_type
+                )
+                response['Content-Length'] = str(end - start + 1)
+                response['Content-Range'] = f"bytes {start}-{end}/{size}"
+            else:
+                # whole file: FileResponse lets the WSGI server use sendfile()
+                response = FileResponse(open(path, 'rb'), content_type=content_type)
+                response['Content-Length'] = str(size)
+        response['Content-Disposition'] = content_disposition_header(as_attachment, filename)
+
+    response['Accept-Ranges'] = 'bytes'
+    response['Cache-Control'] = 'private, no-cache'     # revalidate, but reuse with a 304
+    for header, value in validators.items():
+        response[header] = value
+    return response
@@ -21,6 +21,40 @@ import os
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Protected downloads (myschoolapp/protected_media.py): None streams from
+# Django; "x-accel" (nginx, internal location below -> MEDIA_ROOT) or
+# "x-sendfile" (Apache / lighttpd) hands the bytes to the web server.
+PROTECTED_MEDIA_OFFLOAD = None
+PROTECTED_MEDIA_ACCEL_PREFIX = '/protected-media/'
+
+# Resumable chunked uploads (mediastore/uploads.py)
+MEDIA_UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+MEDIA_UPLOAD_MAX_SIZE = 2 * 1024 * 1024 * 1024
+UPLOAD_SESSION_TTL_HOURS = 24
+
+# Thumbnail / WebP rendering (mediastore/images.py): worker processes,
+# 0 renders inline in the saving process
+IMAGE_PIPELINE_WORKERS = 2
+
+# Loan id watermarks (library.recommendations, library.stats) only pass
+# loans inserted at least this long ago, so open transactions can commit
+LOAN_SETTLE_SECONDS = 60
+
+# Kiosk catalog snapshots (library/catalog.py): rebuild at most this often
+# on request, how long change-log inserts must settle before they get a
+# version (the rows are written on commit, so this only covers the insert), and
+# how far back deltas reach
+CATALOG_SNAPSHOT_MIN_INTERVAL = 60
+CATALOG_CHANGE_SETTLE_SECONDS = 5
+CATALOG_CHANGE_RETENTION_DAYS = 30
+
+# Outgoing mail (overdue reminders, library/reminders.py). Development
+# writes messages to files; for an SMTP debugging server use the smtp
+# backend with EMAIL_HOST = 'localhost', EMAIL_PORT = 1025.
+EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_mail')
+DEFAULT_FROM_EMAIL = 'library@school.local'
+
 
 
 # Quick-start development settings - unsuitable for production
@@ -57,6 +91,7 @@ INSTALLED_APPS = [
     'django_filters',
     'attendance',
     'rest_framework.authtoken',
+    'mediastore',
 ]
 
 MIDDLEWARE = [
@@ -32,6 +32,7 @@ urlpatterns = [
     path('', include('library.urls')),
     path('', include('attendance.urls')),
     path('', include('grading.urls')),
+    path('', include('mediastore.urls')),
 
     
     path('api/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:57
+
+import mediastore.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('newsevents', '0003_remove_announcement_is_active'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='announcement',
+            name='file',
+            field=models.FileField(blank=True, null=True, storage=mediastore.storage.media_storage, upload_to='announcements/'),
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
 from django.conf import settings
+from mediastore.storage import media_storage
 
 
 class Announcement(models.Model):
@@ -21,7 +22,7 @@ class Announcement(models.Model):
         related_name='announcements'
     )
     posted_at = models.DateTimeField(auto_now_add=True)
-    file = models.FileField(upload_to='announcements/', blank=True, null=True)
+    file = models.FileField(upload_to='announcements/', storage=media_storage, blank=True, null=True)
 
     class Meta:
         ordering = ['-posted_at']
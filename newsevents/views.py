@@ -1,11 +1,13 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, permissions
-from django.http import Http404, FileResponse
+from django.http import Http404
 from django.shortcuts import get_object_or_404
 from .models import Announcement
 from .serializers import AnnouncementSerializer
 from rest_framework_simplejwt.authentication import JWTAuthentication
+from mediastore.storage import display_name
+from myschoolapp.protected_media import serve_protected_file
 
 
 class AnnouncementListCreate(APIView):
@@ -104,10 +106,12 @@ class AnnouncementFileDownload(APIView):
             return Response({"detail": "No file attached."}, status=404)
 
         try:
-            file_handle = announcement.file.open('rb')
-            filename = announcement.file.name.split("/")[-1]
+            filename = display_name(announcement.file.name, announcement.title)
             print(f"[DEBUG] Sending file '{filename}'")
-            return FileResponse(file_handle, as_attachment=True, filename=filename)
+            return serve_protected_file(request, announcement.file, as_attachment=True, filename=filename)
+        except FileNotFoundError:
+            print(f"[ERROR] File missing on disk for announcement ID={pk}")
+            return Response({"detail": "File not found."}, status=404)
         except Exception as e:
             print(f"[ERROR] File open/download failed: {str(e)}")
             return Response({"detail": "File error."}, status=500)
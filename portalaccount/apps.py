@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class PortalaccountConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'portalaccount'
+
+    def ready(self):
+        from mediastore import images
+        from .models import HeadTeacherProfile, ParentProfile, StaffProfile, StudentProfile, TeacherProfile
+
+        # thumbnails / WebP for every profile picture
+        for model in (StudentProfile, TeacherProfile, HeadTeacherProfile, ParentProfile, StaffProfile):
+            images.track(model, 'profile_picture')
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:57
+
+import mediastore.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portalaccount', '0003_user_user_type_idx'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='headteacherprofile',
+            name='profile_picture',
+            field=models.ImageField(blank=True, null=True, storage=mediastore.storage.media_storage, upload_to='headteacher_profile_pics/'),
+        ),
+        migrations.AlterField(
+            model_name='parentprofile',
+            name='profile_picture',
+            field=models.ImageField(blank=True, null=True, storage=mediastore.storage.media_storage, upload_to='parent_profile_pics/'),
+        ),
+        migrations.AlterField(
+            model_name='staffprofile',
+            name='profile_picture',
+            field=models.ImageField(blank=True, null=True, storage=mediastore.storage.media_storage, upload_to='staff_profile_pics/'),
+        ),
+        migrations.AlterField(
+            model_name='studentprofile',
+            name='profile_picture',
+            field=models.ImageField(blank=True, null=True, storage=mediastore.storage.media_storage, upload_to='student_profile_pics/'),
+        ),
+        migrations.AlterField(
+            model_name='teacherprofile',
+            name='profile_picture',
+            field=models.ImageField(blank=True, null=True, storage=mediastore.storage.media_storage, upload_to='teacher_profile_pics/'),
+        ),
+    ]
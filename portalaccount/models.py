@@ -1,6 +1,7 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser, BaseUserManager
 from django.utils import timezone
+from mediastore.storage import media_storage
 
 # ============================
 # Custom User Manager
@@ -67,6 +68,9 @@ class User(AbstractUser):
     class Meta:
         verbose_name = "User"
         verbose_name_plural = "Users"
+        indexes = [
+            models.Index(fields=["user_type"], name="user_user_type_idx"),
+        ]
 
 
 # ============================
@@ -74,7 +78,7 @@ class User(AbstractUser):
 # ============================
 class StudentProfile(models.Model):
     user = models.OneToOneField('portalaccount.User', on_delete=models.CASCADE, related_name='student_profile')
-    profile_picture = models.ImageField(upload_to='student_profile_pics/', blank=True, null=True)
+    profile_picture = models.ImageField(upload_to='student_profile_pics/', storage=media_storage, blank=True, null=True)
     middle_name = models.CharField(max_length=100, blank=True, null=True)
     date_of_birth = models.DateField(blank=True, null=True)
     address = models.TextField(blank=True, null=True)
@@ -106,7 +110,7 @@ class TeacherProfile(models.Model):
     GENDER_CHOICES = [('male', 'Male'), ('female', 'Female'), ('other', 'Other')]
 
     user = models.OneToOneField('portalaccount.User', on_delete=models.CASCADE, related_name='teacher_profile')
-    profile_picture = models.ImageField(upload_to='teacher_profile_pics/', blank=True, null=True)
+    profile_picture = models.ImageField(upload_to='teacher_profile_pics/', storage=media_storage, blank=True, null=True)
     gender = models.CharField(max_length=10, choices=GENDER_CHOICES, blank=True, null=True)
     date_of_birth = models.DateField(blank=True, null=True)
     address = models.TextField(blank=True, null=True)
@@ -129,7 +133,7 @@ class HeadTeacherProfile(models.Model):
     GENDER_CHOICES = [('male', 'Male'), ('female', 'Female'), ('other', 'Other')]
 
     user = models.OneToOneField('portalaccount.User', on_delete=models.CASCADE, related_name='headteacher_profile')
-    profile_picture = models.ImageField(upload_to='headteacher_profile_pics/', blank=True, null=True)
+    profile_picture = models.ImageField(upload_to='headteacher_profile_pics/', storage=media_storage, blank=True, null=True)
     gender = models.CharField(max_length=10, choices=GENDER_CHOICES, blank=True, null=True)
     address = models.TextField(blank=True, null=True)
     phone_number = models.CharField(max_length=15, blank=True, null=True)
@@ -150,7 +154,7 @@ class ParentProfile(models.Model):
     GENDER_CHOICES = [('male', 'Male'), ('female', 'Female'), ('other', 'Other')]
 
     user = models.OneToOneField('portalaccount.User', on_delete=models.CASCADE, related_name='parent_profile')
-    profile_picture = models.ImageField(upload_to='parent_profile_pics/', blank=True, null=True)
+    profile_picture = models.ImageField(upload_to='parent_profile_pics/', storage=media_storage, blank=True, null=True)
     gender = models.CharField(max_length=10, choices=GENDER_CHOICES, blank=True, null=True)
     address = models.TextField(blank=True, null=True)
     phone_number = models.CharField(max_length=15, blank=True, null=True)
@@ -171,7 +175,7 @@ class StaffProfile(models.Model):
     GENDER_CHOICES = [('male', 'Male'), ('female', 'Female'), ('other', 'Other')]
 
     user = models.OneToOneField('portalaccount.User', on_delete=models.CASCADE, related_name='staff_profile')
-    profile_picture = models.ImageField(upload_to='staff_profile_pics/', blank=True, null=True)
+    profile_picture = models.ImageField(upload_to='staff_profile_pics/', storage=media_storage, blank=True, null=True)
     gender = models.CharField(max_length=10, choices=GENDER_CHOICES, blank=True, null=True)
     address = models.TextField(blank=True, null=True)
     phone_number = models.CharField(max_length=15, blank=True, null=True)
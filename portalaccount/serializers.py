@@ -5,6 +5,7 @@ from .models import (
 )
 from academic.models import Classroom
 from rest_framework.authtoken.models import Token
+from mediastore.images import variant_urls
 
 
 # ===========================
@@ -27,11 +28,16 @@ class UserSerializer(serializers.ModelSerializer):
 # ===========================
 class BaseProfileSerializer(serializers.ModelSerializer):
     profile_picture = serializers.ImageField(required=False, allow_null=True)
+    # thumb / thumb_webp / medium / medium_webp – the original until rendered
+    profile_picture_variants = serializers.SerializerMethodField(read_only=True)
 
     class Meta:
         fields = "__all__"
         read_only_fields = ["user"]
 
+    def get_profile_picture_variants(self, obj):
+        return variant_urls(obj.profile_picture, self.context.get("request"))
+
     def create(self, validated_data):
         """
         Determine user to assign the profile to: